@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Rendimiento con muchas conexiones simultáneas: viewset DRF síncrono vs vista asíncrona.
+
+Uso:
+    python benchmarks/bench_async_reads.py [--concurrency 500] [--requests 2000]
+
+Lanza las peticiones contra el ASGIHandler de Django dentro de un solo proceso
+(AsyncClient), con `--concurrency` peticiones en vuelo a la vez, y compara
+/api/pets/ (DRF, pasa por sync_to_async) con /api/async/pets/ (ORM asíncrono).
+Usa la base de datos de los settings activos, que debe tener datos
+(p. ej. cargados con manage.py import_pets).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('DJANGO_SERVER_MODE', 'asgi')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import AsyncClient, override_settings  # noqa: E402
+
+
+async def run(path, concurrency, requests):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise SystemExit(f"{path} respondió {response.status_code}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--paths', nargs='+', default=['/api/pets/', '/api/async/pets/'])
+    args = parser.parse_args()
+
+    print(f"{args.requests} peticiones, {args.concurrency} simultáneas")
+    # Todas son anónimas y desde la misma IP: con el límite de pets_read responderían 429
+    with override_settings(THROTTLE_RATES={}):
+        for path in args.paths:
+            throughput, p50, p95 = asyncio.run(run(path, args.concurrency, args.requests))
+            print(f"  {path:<22} {throughput:8.1f} req/s  p50 {p50:8.1f} ms  p95 {p95:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
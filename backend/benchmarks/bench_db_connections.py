@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Latencia por petición con y sin conexiones persistentes.
+
+Uso:
+    python benchmarks/bench_db_connections.py [--path /api/shelters/] [--requests 500]
+
+Envía peticiones al WSGIHandler de Django en el mismo proceso (sin servidor
+HTTP), de modo que se ejecuta el ciclo completo request_started /
+request_finished que abre y cierra las conexiones. Usa la base de datos de
+los settings activos: MySQL con la configuración normal, o cualquier otra
+(p. ej. SQLite) con DJANGO_SETTINGS_MODULE apuntando a otros settings.
+Compara CONN_MAX_AGE=0 con el valor persistente indicado.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+
+def run(handler, path, requests, conn_max_age):
+    connection = connections['default']
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+    opened = []
+    connection_created.connect(lambda **kwargs: opened.append(1), weak=False, dispatch_uid='bench')
+    environ = RequestFactory(SERVER_NAME='localhost').get(path).environ
+    timings = []
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = handler(dict(environ), lambda status, headers: None)
+            b''.join(response)
+            response.close()  # dispara request_finished -> close_old_connections
+            timings.append(time.perf_counter() - start)
+            if not str(response.status_code).startswith('2'):
+                raise SystemExit(f"{path} respondió {response.status_code}")
+    finally:
+        connection_created.disconnect(dispatch_uid='bench')
+        connection.close()
+
+    timings.sort()
+    return {
+        'mean': statistics.mean(timings) * 1000,
+        'p50': timings[len(timings) // 2] * 1000,
+        'p95': timings[int(len(timings) * 0.95) - 1] * 1000,
+        'connections': len(opened),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/shelters/')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--conn-max-age', type=int, default=60)
+    args = parser.parse_args()
+
+    handler = WSGIHandler()
+    vendor = connections['default'].vendor
+    print(f"{args.requests} peticiones GET {args.path} contra {vendor}")
+    run(handler, args.path, 10, 0)  # calentamiento
+    for label, max_age in (('sin persistencia', 0), (f'CONN_MAX_AGE={args.conn_max_age}', args.conn_max_age)):
+        result = run(handler, args.path, args.requests, max_age)
+        print(f"  {label:<18} media {result['mean']:7.2f} ms  p50 {result['p50']:7.2f} ms  "
+              f"p95 {result['p95']:7.2f} ms  conexiones abiertas {result['connections']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Búsqueda de refugios cercanos: prefiltro por caja + índice vs recorrer toda la tabla.
+
+Uso:
+    python benchmarks/bench_geo.py [--shelters 50000] [--radius 25] [--repeat 50]
+
+Crea una base de datos de test desechable con `--shelters` refugios repartidos
+por México y compara shelters.geo.nearest_shelters() (caja lat/lng resuelta con
+shelter_lat_lng_idx y haversine sólo sobre los candidatos) con la versión
+ingenua que trae todas las coordenadas y calcula la distancia en Python.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from shelters.geo import haversine_km, nearest_shelters  # noqa: E402
+from shelters.models import Shelter  # noqa: E402
+from users.models import User  # noqa: E402
+
+LAT_RANGE = (14.5, 32.7)
+LNG_RANGE = (-117.1, -86.7)
+
+
+def seed(count, rng, batch_size=5000):
+    password = make_password('benchmark123')
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        users = User.objects.bulk_create([
+            User(username=f'geo_shelter_{start + i}', password=password, role='shelter') for i in range(size)
+        ])
+        Shelter.objects.bulk_create([
+            Shelter(user=user, name=f'Refugio {start + i}',
+                    latitude=rng.uniform(*LAT_RANGE), longitude=rng.uniform(*LNG_RANGE))
+            for i, user in enumerate(users)
+        ])
+
+
+def full_scan(lat, lng, radius_km, limit):
+    rows = Shelter.objects.filter(latitude__isnull=False).values_list('pk', 'latitude', 'longitude')
+    found = sorted(
+        (distance, pk)
+        for pk, s_lat, s_lng in rows
+        if (distance := haversine_km(lat, lng, s_lat, s_lng)) <= radius_km
+    )
+    return [pk for _, pk in found[:limit]]
+
+
+def indexed(lat, lng, radius_km, limit):
+    return [shelter.pk for _, shelter in nearest_shelters(lat, lng, radius_km, limit=limit)]
+
+
+def measure(func, points, radius, limit):
+    timings, results = [], []
+    for lat, lng in points:
+        start = time.perf_counter()
+        results.append(func(lat, lng, radius, limit))
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shelters', type=int, default=50000)
+    parser.add_argument('--radius', type=float, default=25)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        print(f"Creando {args.shelters} refugios en {connection.vendor}...")
+        seed(args.shelters, rng)
+        points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.repeat)]
+
+        scan_median, scan_max, scan_results = measure(full_scan, points, args.radius, args.limit)
+        box_median, box_max, box_results = measure(indexed, points, args.radius, args.limit)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    mismatches = sum(1 for a, b in zip(scan_results, box_results) if a != b)
+    print(f"{'método':<22}{'mediana ms':>12}{'máx ms':>10}")
+    print(f"{'tabla completa':<22}{scan_median:>12.2f}{scan_max:>10.2f}")
+    print(f"{'caja + índice':<22}{box_median:>12.2f}{box_max:>10.2f}")
+    print(f"Aceleración: {scan_median / box_median:.1f}x — resultados distintos: {mismatches}/{len(points)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Latencia de las lecturas durante una ráfaga de subidas de imágenes (pets/images.py).
+
+Uso:
+    python benchmarks/bench_images.py [--uploads 64] [--threads 16] [--reads 300]
+
+`--threads` hilos simulan peticiones que suben `--uploads` imágenes en total
+mientras otro hilo simula lecturas de la API (serializar un listado a JSON) y
+mide su latencia. Se compara normalizar en el propio hilo (como antes) con
+enviar la imagen a image_pool, que acota la cola con IMAGE_QUEUE_SIZE y
+rechaza (503) lo que no cabe en IMAGE_QUEUE_WAIT. No toca la base de datos.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from PIL import Image  # noqa: E402
+
+from pets.images import ImagePool, ImagePoolBusy, normalize_bytes  # noqa: E402
+
+PAGE = [{'id': i, 'name': f'Mascota {i}', 'pet_type': 'dog', 'photos': [{'id': i, 'order': 0}]} for i in range(200)]
+
+
+def sample_image():
+    output = BytesIO()
+    Image.effect_noise((2400, 1600), 64).convert('RGB').save(output, format='PNG')
+    return output.getvalue()
+
+
+def reader(stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        json.dumps(PAGE)
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+
+
+def run(upload, uploads, threads):
+    stop, latencies = threading.Event(), []
+    thread = threading.Thread(target=reader, args=(stop, latencies))
+    thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda _: upload(), range(uploads)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    latencies.sort()
+    return {
+        'elapsed_s': elapsed,
+        'processed': results.count(True),
+        'rejected': results.count(False),
+        'read_p50_ms': statistics.median(latencies),
+        'read_p99_ms': latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uploads', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--queue-size', type=int, default=None)
+    args = parser.parse_args()
+    data = sample_image()
+    queue_size = args.queue_size or args.workers * 4
+
+    def inline():
+        normalize_bytes(data)
+        return True
+
+    image_pool = ImagePool(workers=args.workers, queue_size=queue_size, queue_wait=2, task_timeout=60)
+    image_pool.process(normalize_bytes, data)  # arranque de los procesos fuera de la medida
+    image_pool.reset_stats()
+
+    def pooled():
+        try:
+            image_pool.process(normalize_bytes, data)
+            return True
+        except ImagePoolBusy:
+            return False
+
+    print(f"{args.uploads} subidas de {len(data) // 1024} KiB desde {args.threads} hilos, {args.workers} worker(s), cola {queue_size}")
+    for label, upload in (('en el hilo', inline), ('image_pool', pooled)):
+        result = run(upload, args.uploads, args.threads)
+        print(
+            f"{label:>12}: {result['elapsed_s']:6.2f} s, {result['processed']} procesadas, {result['rejected']} rechazadas, "
+            f"lectura p50 {result['read_p50_ms']:.2f} ms, p99 {result['read_p99_ms']:.2f} ms"
+        )
+    stats = image_pool.stats()
+    print(f"image_pool: espera media {stats['avg_wait_ms']:.0f} ms, proceso medio {stats['avg_run_ms']:.0f} ms, "
+          f"latencia máx. {stats['max_latency_ms']:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Altas y logins por segundo y por núcleo con cada hasher de contraseñas.
+
+Uso:
+    python benchmarks/bench_passwords.py [--rounds 5] [--api 20]
+
+1. Hash (alta) y verificación (login) directos con cada hasher de users/hashers.py
+   disponible, con el coste configurado en settings (PASSWORD_*): un solo hilo,
+   así que las cifras son por núcleo.
+2. Con `--api N`, N altas (POST /api/users/) y N logins (POST /api/login/) sobre
+   una base de datos de test con el hasher preferido (PASSWORD_HASHER), sin
+   límite de peticiones.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import get_hashers  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+PASSWORD = 'benchmark123'
+
+
+def timed(func, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench_hashers(rounds):
+    print(f"{'hasher':<16}{'ms/hash':>10}{'altas/s':>10}{'ms/verif.':>11}{'logins/s':>10}")
+    for hasher in get_hashers():
+        if not type(hasher).__module__.startswith('users.'):
+            continue
+        try:
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+        except ValueError as exc:  # argon2-cffi no instalado
+            print(f"{hasher.algorithm:<16}no disponible ({exc})")
+            continue
+        encode = timed(lambda: hasher.encode(PASSWORD, hasher.salt()), rounds)
+        verify = timed(lambda: hasher.verify(PASSWORD, encoded), rounds)
+        print(f"{hasher.algorithm:<16}{encode * 1000:>10.1f}{1 / encode:>10.1f}{verify * 1000:>11.1f}{1 / verify:>10.1f}")
+
+
+def bench_api(count):
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        client = APIClient()
+        with override_settings(THROTTLE_RATES={}):
+            start = time.perf_counter()
+            for i in range(count):
+                response = client.post('/api/users/', {
+                    'username': f'bench_{i}', 'email': f'bench{i}@bench.test', 'password': PASSWORD,
+                }, format='json')
+                assert response.status_code == 201, response.content
+            signup = (time.perf_counter() - start) / count
+            start = time.perf_counter()
+            for i in range(count):
+                response = client.post('/api/login/', {'username': f'bench_{i}', 'password': PASSWORD}, format='json')
+                assert response.status_code == 200, response.content
+            login = (time.perf_counter() - start) / count
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    print(f"API ({settings.PASSWORD_HASHER}, {connection.vendor}): "
+          f"alta {signup * 1000:.1f} ms ({1 / signup:.1f}/s), login {login * 1000:.1f} ms ({1 / login:.1f}/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--api', type=int, default=20, help='Altas/logins vía API (0 para omitir)')
+    args = parser.parse_args()
+
+    bench_hashers(args.rounds)
+    if args.api:
+        bench_api(args.api)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Búsqueda de fotos casi-duplicadas: bandas del dHash con índice vs comparar todos los hashes.
+
+Uso:
+    python benchmarks/bench_phash.py [--photos 200000] [--repeat 200]
+
+Crea una base de datos de test desechable con `--photos` fotos de hash
+aleatorio y compara PetPhotoQuerySet.near_duplicates() (igualdad en alguna de
+las 4 bandas de 16 bits, un índice por banda) con traer todos los hashes y
+calcular la distancia de Hamming en Python. La mitad de las consultas son
+variaciones (1-3 bits) de una foto existente y la otra mitad hashes nuevos.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from pets.models import Pet, PetPhoto  # noqa: E402
+from users.models import User  # noqa: E402
+
+DISTANCE = 3
+
+
+def seed(count, rng, batch_size=5000):
+    owner = User.objects.create_user(username='phash_owner', password='benchmark123', role='client')
+    pet = Pet.objects.create(name='Benchmark', pet_type='dog', owner=owner)
+    hashes = []
+    for start in range(0, count, batch_size):
+        photos = []
+        for i in range(min(batch_size, count - start)):
+            value = rng.getrandbits(64)
+            photo = PetPhoto(pet=pet, photo=f'pets/dog/bench_{start + i}.jpg')
+            photo.set_phash(value)
+            photos.append(photo)
+            hashes.append(value)
+        PetPhoto.objects.bulk_create(photos)
+    return hashes
+
+
+def full_scan(value):
+    matches = []
+    for pk, stored in PetPhoto.objects.values_list('pk', 'phash').iterator(chunk_size=10000):
+        if ((stored & ((1 << 64) - 1)) ^ value).bit_count() <= DISTANCE:
+            matches.append(pk)
+    return sorted(matches)
+
+
+def banded(value):
+    return sorted(photo.pk for photo in PetPhoto.objects.near_duplicates(value, DISTANCE))
+
+
+def measure(func, queries):
+    timings, results = [], []
+    for value in queries:
+        start = time.perf_counter()
+        results.append(func(value))
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photos', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--scan-repeat', type=int, default=5, help="Consultas con la tabla completa (lenta)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        print(f"Creando {args.photos} fotos en {connection.vendor}...")
+        hashes = seed(args.photos, rng)
+        queries = []
+        for i in range(args.repeat):
+            if i % 2:
+                queries.append(rng.getrandbits(64))
+            else:
+                value = rng.choice(hashes)
+                for bit in rng.sample(range(64), rng.randint(1, DISTANCE)):
+                    value ^= 1 << bit
+                queries.append(value)
+        band_median, band_max, band_results = measure(banded, queries)
+        scan_queries = queries[:args.scan_repeat]
+        scan_median, scan_max, scan_results = measure(full_scan, scan_queries)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    mismatches = sum(1 for a, b in zip(scan_results, band_results) if a != b)
+    found = sum(1 for result in band_results if result)
+    print(f"{'método':<22}{'mediana ms':>12}{'máx ms':>10}")
+    print(f"{'tabla completa':<22}{scan_median:>12.2f}{scan_max:>10.2f}")
+    print(f"{'bandas + índice':<22}{band_median:>12.3f}{band_max:>10.3f}")
+    print(f"Aceleración: {scan_median / band_median:.0f}x — duplicados encontrados: {found}/{len(queries)}, "
+          f"resultados distintos: {mismatches}/{len(scan_queries)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Compara el tiempo de render de JSONRenderer (DRF) y FastJSONRenderer.
+
+Uso:
+    python benchmarks/bench_renderers.py [--sizes 1000 10000] [--repeat 5]
+
+Genera listas con la forma de la respuesta de /api/pets/ (incluye datetime,
+Decimal y cadenas lazy) y no necesita base de datos.
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils.translation import gettext_lazy  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from config.renderers import FastJSONRenderer, orjson  # noqa: E402
+
+
+def make_pets(count):
+    now = datetime(2025, 11, 18, 17, 37, 12, 345678, tzinfo=timezone.utc)
+    pets = []
+    for i in range(count):
+        photos = [
+            {
+                'id': i * 3 + j,
+                'photo_url': f'http://127.0.0.1:8000/media/pets/dog/dog_pet-{i}_{j}.jpg',
+                'is_primary': j == 0,
+                'order': j,
+                'created_at': now - timedelta(minutes=i + j),
+            }
+            for j in range(i % 4)
+        ]
+        pets.append({
+            'id': i,
+            'photos': photos,
+            'primary_photo_url': photos[0]['photo_url'] if photos else None,
+            'age_display': gettext_lazy('%d años') % (i % 15),
+            'name': f'Mascota {i} — ñandú',
+            'pet_type': 'dog' if i % 2 else 'cat',
+            'breed': 'Mestizo',
+            'age': i % 15,
+            'age_unit': 'years',
+            'size': 'mediano',
+            'description': 'Muy cariñoso y juguetón. ' * 4,
+            'weight': Decimal('12.50'),
+            'status': 'available',
+            'shelter': i % 50,
+            'owner': None,
+        })
+    return pets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"orjson: {'sí (' + orjson.__version__ + ')' if orjson else 'no instalado, se usa json estándar'}")
+    renderers = [('JSONRenderer', JSONRenderer()), ('FastJSONRenderer', FastJSONRenderer())]
+    for size in args.sizes:
+        data = make_pets(size)
+        outputs = {name: renderer.render(data) for name, renderer in renderers}
+        assert outputs['JSONRenderer'] == outputs['FastJSONRenderer'], "Las salidas no coinciden"
+        baseline = None
+        for name, renderer in renderers:
+            best = min(timeit.repeat(lambda: renderer.render(data), number=1, repeat=args.repeat))
+            baseline = baseline or best
+            print(f"{size:>7} mascotas  {name:<18} {best * 1000:9.2f} ms  x{baseline / best:.1f}")
+
+
+if __name__ == '__main__':
+    main()
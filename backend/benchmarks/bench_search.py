@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Búsqueda del admin de mascotas: índice de tokens (pets/search.py) vs LIKE '%x%' sobre las tablas unidas.
+
+Uso:
+    python benchmarks/bench_search.py [--pets 200000] [--repeat 50]
+
+Crea una base de datos de test desechable con `--pets` mascotas de nombre,
+raza y descripción aleatorios repartidas entre refugios, construye el índice
+con rebuild() y compara la consulta que genera el admin de Django con
+search_fields (icontains en cada campo, OR entre campos, AND entre términos)
+con search(). Mide el COUNT(*) de la página de resultados, que es lo que
+recorre toda la selección, con palabras completas (pocas coincidencias) y con
+prefijos cortos que casan con buena parte de las mascotas.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from functools import reduce
+from operator import and_, or_
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from pets.models import Pet  # noqa: E402
+from pets.search import SEARCH_FIELDS, rebuild, search  # noqa: E402
+from shelters.models import Shelter  # noqa: E402
+from users.models import User  # noqa: E402
+
+NAMES = ['Luna', 'Max', 'Rocky', 'Nala', 'Simba', 'Coco', 'Toby', 'Kira', 'Bruno', 'Lola'] + [f'Nombre{i}' for i in range(500)]
+BREEDS = ['Labrador', 'Pastor Alemán', 'Chihuahua', 'Poodle', 'Beagle', 'Siamés', 'Persa', 'Mestizo']
+WORDS = ['juguetón', 'tranquilo', 'cariñoso', 'vacunado', 'esterilizado', 'niños', 'jardín', 'paseos', 'gatos',
+         'perros', 'tímido', 'activo', 'come', 'duerme', 'mucho', 'poco', 'casa', 'departamento'] + [f'palabra{i}' for i in range(2000)]
+
+
+def seed(count, shelters, rng, batch_size=5000):
+    shelter_ids = []
+    for i in range(shelters):
+        user = User.objects.create_user(username=f'refugio_bench_{i}', password='benchmark123', role='shelter')
+        shelter_ids.append(Shelter.objects.create(user=user, name=f'Refugio {rng.choice(WORDS).title()} {i}').pk)
+    for start in range(0, count, batch_size):
+        Pet.objects.bulk_create([
+            Pet(
+                name=rng.choice(NAMES), pet_type=rng.choice(('dog', 'cat')), breed=rng.choice(BREEDS),
+                description=' '.join(rng.choices(WORDS, k=12)), shelter_id=rng.choice(shelter_ids),
+            )
+            for _ in range(min(batch_size, count - start))
+        ])
+
+
+def like_search(term):
+    """El filtro que construye ModelAdmin.get_search_results con search_fields."""
+    fields = SEARCH_FIELDS['pet'][1]
+    return Pet.objects.filter(reduce(and_, (
+        reduce(or_, (Q(**{f'{field}__icontains': word}) for field in fields)) for word in term.split()
+    )))
+
+
+def measure(func, queries):
+    timings, counts = [], []
+    for term in queries:
+        start = time.perf_counter()
+        counts.append(func(term).count())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings), counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pets', type=int, default=200000)
+    parser.add_argument('--shelters', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--like-repeat', type=int, default=5, help="Consultas con LIKE (lentas)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        print(f"Creando {args.pets} mascotas en {connection.vendor}...")
+        seed(args.pets, args.shelters, rng)
+        start = time.perf_counter()
+        rebuild('pet', batch_size=5000)
+        build_s = time.perf_counter() - start
+        # Palabras completas (pocas coincidencias) y prefijos cortos que casan con muchas mascotas
+        selective = [
+            ' '.join([rng.choice(NAMES), rng.choice(WORDS)]) if i % 2 else rng.choice(WORDS)
+            for i in range(args.repeat)
+        ]
+        broad = [rng.choice(('lab', 'pas', 'va', 'refugio', 'lu')) for _ in range(args.repeat)]
+        results = {}
+        for label, queries in (('palabras', selective), ('prefijos', broad)):
+            results[label] = (
+                measure(lambda term: search('pet', Pet.objects.all(), term), queries),
+                measure(like_search, queries[:args.like_repeat]),
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print(f"Índice construido en {build_s:.1f} s")
+    print(f"{'consultas':<12}{'método':<18}{'mediana ms':>12}{'máx ms':>10}")
+    for label, ((token_median, token_max, token_counts), (like_median, like_max, like_counts)) in results.items():
+        print(f"{label:<12}{'LIKE %x%':<18}{like_median:>12.2f}{like_max:>10.2f}")
+        print(f"{'':<12}{'tokens + índice':<18}{token_median:>12.2f}{token_max:>10.2f}")
+        # LIKE también encuentra trozos del interior de una palabra: puede dar más resultados
+        wider = sum(1 for a, b in zip(like_counts, token_counts) if a != b)
+        print(f"{'':<12}aceleración {like_median / token_median:.1f}x, resultados distintos {wider}/{len(like_counts)}")
+
+if __name__ == '__main__':
+    main()
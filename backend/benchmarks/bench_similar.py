@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Índice de mascotas parecidas (pets/similar.py): reconstrucción, actualización y consulta.
+
+Uso:
+    python benchmarks/bench_similar.py [--pets 100000] [--queries 500] [--updates 1000]
+
+Construye el índice con `--pets` filas sintéticas (las mismas columnas que
+values_list(*FIELDS)) y mide la reconstrucción completa, la recodificación de
+`--updates` mascotas y `--queries` consultas top-10. No toca la base de datos.
+Con `--no-numpy` mide la versión en Python puro que se usa si NumPy no está
+instalado.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from pets import similar  # noqa: E402
+
+BREEDS = ['Labrador', 'Pastor Alemán', 'Chihuahua', 'Poodle', 'Beagle', 'Siamés', 'Persa', 'Mestizo'] + [
+    f'Raza {i}' for i in range(200)
+]
+SIZES = ['chico', 'mediano', 'grande', '']
+
+
+def synthetic_rows(count, rng, first_pk=1):
+    return [
+        (
+            pk, rng.choice(('dog', 'cat')), rng.choice(BREEDS), rng.choice(SIZES),
+            rng.choice((None, rng.randint(1, 180))),
+            rng.randint(1, 2000), 'available' if rng.random() < 0.8 else 'adopted',
+        )
+        for pk in range(first_pk, first_pk + count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pets', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-numpy', action='store_true')
+    args = parser.parse_args()
+
+    if args.no_numpy:
+        mock.patch.object(similar, 'np', None).start()
+    rng = random.Random(args.seed)
+    rows = synthetic_rows(args.pets, rng)
+    index = similar.SimilarPetsIndex()
+
+    start = time.perf_counter()
+    index.build(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    changed = [(pk, *row[1:]) for (pk, *_), row in zip(rng.sample(rows, args.updates), synthetic_rows(args.updates, rng))]
+    start = time.perf_counter()
+    index.upsert(changed)
+    update_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for pet_id in rng.sample(range(1, args.pets + 1), min(args.queries, args.pets)):
+        start = time.perf_counter()
+        index.similar(pet_id, args.limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    backend = 'Python puro' if similar.np is None else f'NumPy {similar.np.__version__}'
+    print(f"{args.pets} mascotas ({backend})")
+    print(f"reconstrucción completa: {build_ms:8.1f} ms")
+    print(f"{args.updates} actualizaciones:    {update_ms:8.1f} ms")
+    print(f"consulta top-{args.limit}: mediana {statistics.median(timings):.2f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)]:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
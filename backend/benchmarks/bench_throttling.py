@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Coste por petición del límite de peticiones (config/throttling.py).
+
+Uso:
+    python benchmarks/bench_throttling.py [--requests 100000] [--clients 1000]
+
+Llama directamente a allow_request() con peticiones anónimas de `--clients` IPs
+distintas y compara RoleRateThrottle (token bucket, una tupla por cliente) con
+AnonRateThrottle de DRF (ventana deslizante, lista de marcas de tiempo por
+cliente, en la caché por defecto). No toca la base de datos. Con `--cache ALIAS`
+los cubos se guardan en esa caché de Django en lugar de en memoria del proceso.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from rest_framework.settings import api_settings  # noqa: E402
+from rest_framework.throttling import AnonRateThrottle  # noqa: E402
+
+from config.throttling import RoleRateThrottle, local_buckets  # noqa: E402
+
+
+class View:
+    throttle_scope = 'bench'
+    action = 'list'
+
+
+def build_requests(clients):
+    factory = RequestFactory()
+    requests = []
+    for i in range(clients):
+        request = factory.get('/api/pets/', REMOTE_ADDR=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}')
+        request.user = AnonymousUser()
+        requests.append(request)
+    return requests
+
+
+def measure(throttle_class, requests, total):
+    view = View()
+    allowed = 0
+    start = time.perf_counter()
+    for i in range(total):
+        allowed += throttle_class().allow_request(requests[i % len(requests)], view)
+    elapsed = time.perf_counter() - start
+    return elapsed / total * 1e6, allowed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--rate', default='120/min', help='Ritmo por cliente, p. ej. 120/min')
+    parser.add_argument('--cache', default=None, help='Alias de CACHES para los cubos (THROTTLE_CACHE)')
+    args = parser.parse_args()
+
+    requests = build_requests(args.clients)
+    AnonRateThrottle.rate = args.rate
+    AnonRateThrottle.cache = caches['default']
+
+    print(f"{args.requests} peticiones de {args.clients} clientes, ritmo {args.rate}")
+    print(f"{'throttle':<22}{'µs/petición':>14}{'admitidas':>12}")
+    with override_settings(THROTTLE_RATES={'bench': {'anon': args.rate}}, THROTTLE_CACHE=args.cache):
+        for name, throttle_class in (('RoleRateThrottle', RoleRateThrottle), ('DRF AnonRateThrottle', AnonRateThrottle)):
+            local_buckets.clear()
+            caches['default'].clear()
+            micros, allowed = measure(throttle_class, requests, args.requests)
+            print(f"{name:<22}{micros:>14.2f}{allowed:>12}")
+    print(f"(NUM_PROXIES={api_settings.NUM_PROXIES}; la IP se toma de REMOTE_ADDR)")
+
+
+if __name__ == '__main__':
+    main()
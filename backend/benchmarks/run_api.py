@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Benchmark reproducible de los caminos críticos de la API y del admin.
+
+Uso:
+    python benchmarks/run_api.py                                # imprime la tabla
+    python benchmarks/run_api.py --save benchmarks/baseline.json
+    python benchmarks/run_api.py --compare benchmarks/baseline.json
+
+Crea una base de datos de test desechable (como `manage.py test`), la llena con
+seed_data.seed() y mide cada escenario con el cliente de test de Django:
+latencia p50/p95, número de consultas SQL por petición y pico de memoria
+(tracemalloc, en una pasada aparte para no distorsionar los tiempos).
+
+Con --compare termina con código 1 si algún escenario hace más consultas que
+en la línea base o si su p95 empeora más que --tolerance (por defecto 50 %,
+porque los tiempos dependen de la máquina; las consultas no).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+import seed_data  # noqa: E402
+
+
+class Context:
+    """Usuarios, tokens e ids que comparten los escenarios."""
+
+    def __init__(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from pets.models import AdoptionRequest, Pet
+        from users.models import User
+
+        self.admin = User.objects.filter(role='admin').order_by('pk').first()
+        self.shelter_user = User.objects.filter(role='shelter').order_by('pk').first()
+        self.client_user = User.objects.filter(role='client').order_by('pk').first()
+        self.tokens = {
+            user.pk: f'Bearer {RefreshToken.for_user(user).access_token}'
+            for user in (self.admin, self.shelter_user, self.client_user)
+        }
+        requested = AdoptionRequest.objects.filter(user=self.client_user).values('pet_id')
+        self.adoptable_pet_ids = list(
+            Pet.objects.filter(status='available').exclude(pk__in=requested).exclude(owner=self.client_user)
+            .values_list('pk', flat=True).order_by('pk')
+        )
+        self.pet_id = Pet.objects.order_by('-photo_count', 'pk').values_list('pk', flat=True).first()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.counter = 0
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': self.tokens[user.pk]}
+
+
+def _pets_create(ctx, client):
+    ctx.counter += 1
+    return client.post('/api/pets/', {'name': f'Nueva {ctx.counter}', 'pet_type': 'dog', 'age': 2},
+                       content_type='application/json', **ctx.auth(ctx.shelter_user))
+
+
+def _adoptions_create(ctx, client):
+    return client.post('/api/adoptions/', {'pet': ctx.adoptable_pet_ids.pop(), 'message': 'Hola'},
+                       content_type='application/json', **ctx.auth(ctx.client_user))
+
+
+def _login(ctx, client):
+    return client.post('/api/login/', {'username': ctx.client_user.username, 'password': seed_data.PASSWORD},
+                       content_type='application/json')
+
+
+# nombre -> (función que hace una petición, código esperado, iteraciones por defecto)
+SCENARIOS = {
+    'pets.list': (lambda ctx, client: client.get('/api/pets/'), 200, 10),
+    'pets.retrieve': (lambda ctx, client: client.get(f'/api/pets/{ctx.pet_id}/'), 200, 100),
+    'pets.create': (_pets_create, 201, 50),
+    'adoptions.create': (_adoptions_create, 201, 50),
+    'login': (_login, 200, 5),
+    'admin.pets': (lambda ctx, client: ctx.admin_client.get('/admin/pets/pet/'), 200, 20),
+    'admin.adoptions': (lambda ctx, client: ctx.admin_client.get('/admin/pets/adoptionrequest/'), 200, 20),
+    'admin.shelters': (lambda ctx, client: ctx.admin_client.get('/admin/shelters/shelter/'), 200, 20),
+    'admin.users': (lambda ctx, client: ctx.admin_client.get('/admin/users/user/'), 200, 20),
+}
+
+
+def measure(name, ctx, scale):
+    func, expected, iterations = SCENARIOS[name]
+    iterations = max(3, int(iterations * scale))
+    client = Client()
+
+    def call():
+        response = func(ctx, client)
+        if response.status_code != expected:
+            raise SystemExit(f"{name}: se esperaba {expected} y se obtuvo {response.status_code}: {response.content[:300]!r}")
+        return response
+
+    call()  # calentamiento
+    timings, queries = [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        queries.append(len(captured))
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(timings[max(0, int(len(timings) * 0.95) - 1)] * 1000, 2),
+        'queries': max(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, base in baseline['results'].items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(f"{name}: {current['queries']} consultas (línea base {base['queries']})")
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms (línea base {base['p95_ms']} ms)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pets', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--shelters', type=int, default=50)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplica las iteraciones de cada escenario')
+    parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), help='Ejecuta solo estos escenarios')
+    parser.add_argument('--save', help='Guarda los resultados como línea base JSON')
+    parser.add_argument('--compare', help='Compara contra una línea base JSON')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--keepdb', action='store_true', help='Reutiliza la base de datos de test')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=args.keepdb)
+    try:
+        totals = seed_data.seed(clients=args.clients, shelters=args.shelters, pets=args.pets)
+        print('Datos: ' + ', '.join(f'{count} {name}' for name, count in totals.items()))
+        ctx = Context()
+        results = {}
+        print(f"{'escenario':<18} {'p50 ms':>9} {'p95 ms':>9} {'consultas':>10} {'pico KiB':>10}")
+        # Sin límite de peticiones: cada escenario repite cientos de veces la misma petición
+        with override_settings(THROTTLE_RATES={}):
+            for name in args.only or SCENARIOS:
+                result = results[name] = measure(name, ctx, args.scale)
+                print(f"{name:<18} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['queries']:>10} {result['peak_kib']:>10}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+
+    report = {
+        'meta': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': totals,
+        },
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+            fh.write('\n')
+        print(f"Línea base guardada en {args.save}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        if regressions:
+            print('Regresiones:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+        print('Sin regresiones respecto a la línea base.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Generador de datos sintéticos para los benchmarks.
+
+Uso:
+    python benchmarks/seed_data.py --pets 5000 [--clients 2000] [--shelters 100] [--seed 42]
+
+Crea usuarios (admin/refugio/cliente), refugios, mascotas, fotos y solicitudes
+de adopción con distribuciones parecidas a las reales: pocos refugios
+concentran la mayoría de mascotas (Pareto), 80 % de las mascotas están en un
+refugio y el resto tienen dueño, el número de fotos y de solicitudes por
+mascota es sesgado hacia 0-2. Todo se inserta con bulk_create y los
+contadores desnormalizados se recalculan al final.
+
+Las fotos solo existen como filas (el archivo no se genera), lo que basta para
+serializar sus URLs. ¡Escribe en la base de datos de los settings activos!
+run_api.py lo usa sobre una base de datos de test desechable.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+if __name__ == '__main__':
+    django.setup()
+
+PASSWORD = 'benchmark123'
+BREEDS = {
+    'dog': ['Mestizo', 'Labrador', 'Pastor Alemán', 'Beagle', 'Chihuahua', 'Golden Retriever', 'Bulldog'],
+    'cat': ['Mestizo', 'Siamés', 'Persa', 'Maine Coon', 'Bengalí', 'Angora'],
+}
+SIZES = ['pequeño', 'mediano', 'grande']
+# Estados de las solicitudes de una mascota disponible; las de una adoptada se
+# reparten como tras pets/adoption.approve(): una aprobada o completada y el resto rechazadas
+REQUEST_STATUSES = ['pending'] * 6 + ['rejected'] * 2
+
+
+def _pareto_weights(count, rng, alpha=1.2):
+    return [rng.paretovariate(alpha) for _ in range(count)]
+
+
+def _geometric(rng, p, cap):
+    n = 0
+    while n < cap and rng.random() > p:
+        n += 1
+    return n
+
+
+def seed(clients=1000, shelters=50, pets=2000, admins=2, seed=42, batch_size=1000):
+    """Inserta el conjunto de datos y devuelve un dict con los totales creados."""
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+
+    from pets.counters import recount_pets, recount_shelters
+    from pets.models import AdoptionRequest, Pet, PetPhoto
+    from shelters.models import Shelter
+    from users.models import User
+
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        users = [
+            User(username=f'bench_admin_{i}', email=f'admin{i}@bench.test', password=password,
+                 role='admin', is_staff=True, is_superuser=True)
+            for i in range(admins)
+        ]
+        users += [
+            User(username=f'bench_shelter_{i}', email=f'shelter{i}@bench.test', password=password, role='shelter')
+            for i in range(shelters)
+        ]
+        users += [
+            User(username=f'bench_client_{i}', email=f'client{i}@bench.test', password=password, role='client',
+                 phone=f'{rng.randrange(10**9, 10**10)}')
+            for i in range(clients)
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        shelter_users = list(User.objects.filter(username__startswith='bench_shelter_').order_by('pk'))
+        client_ids = list(User.objects.filter(username__startswith='bench_client_').values_list('pk', flat=True))
+
+        Shelter.objects.bulk_create([
+            Shelter(user=user, name=f'Refugio {i}', address=f'Calle {rng.randrange(1, 300)} #{rng.randrange(1, 99)}',
+                    verified=rng.random() < 0.7)
+            for i, user in enumerate(shelter_users)
+        ], batch_size=batch_size)
+        shelter_ids = list(Shelter.objects.filter(user__in=shelter_users).values_list('pk', flat=True))
+        weights = _pareto_weights(len(shelter_ids), rng)
+
+        pet_rows = []
+        for i in range(pets):
+            pet_type = 'dog' if rng.random() < 0.6 else 'cat'
+            in_shelter = shelter_ids and (not client_ids or rng.random() < 0.8)
+            age_unit = 'months' if rng.random() < 0.3 else 'years'
+            pet_rows.append(Pet(
+                name=f'Mascota {i}',
+                pet_type=pet_type,
+                breed=rng.choice(BREEDS[pet_type]),
+                age=rng.randrange(1, 12) if age_unit == 'months' else rng.randrange(1, 16),
+                age_unit=age_unit,
+                size=rng.choice(SIZES),
+                description='Cariñoso, sociable y vacunado. ' * rng.randrange(1, 6),
+                shelter_id=rng.choices(shelter_ids, weights)[0] if in_shelter else None,
+                owner_id=None if in_shelter else rng.choice(client_ids),
+                status='adopted' if rng.random() < 0.1 else 'available',
+            ))
+        Pet.objects.bulk_create(pet_rows, batch_size=batch_size)
+        pet_list = list(Pet.objects.filter(name__startswith='Mascota ').values_list('pk', 'pet_type', 'name', 'status'))
+
+        photos = []
+        for pk, pet_type, name, _ in pet_list:
+            for order in range(_geometric(rng, 0.35, 5)):
+                photos.append(PetPhoto(
+                    pet_id=pk, photo=f'pets/{pet_type}/{pet_type}_{name.lower().replace(" ", "-")}_{order}.jpg',
+                    is_primary=order == 0, order=order,
+                ))
+        PetPhoto.objects.bulk_create(photos, batch_size=batch_size)
+
+        requests = []
+        for pk, _, _, status in pet_list:
+            count = _geometric(rng, 0.5, 8)
+            if status == 'adopted':
+                count = max(1, count)
+            for index, client_id in enumerate(rng.sample(client_ids, min(len(client_ids), count))):
+                if status == 'adopted':
+                    request_status = rng.choice(('approved', 'completed')) if index == 0 else 'rejected'
+                else:
+                    request_status = rng.choice(REQUEST_STATUSES)
+                requests.append(AdoptionRequest(
+                    pet_id=pk, user_id=client_id, message='Me encantaría adoptarla.', status=request_status,
+                ))
+        AdoptionRequest.objects.bulk_create(requests, batch_size=batch_size)
+
+        recount_pets()
+        recount_shelters()
+
+    return {
+        'users': len(users),
+        'shelters': len(shelter_ids),
+        'pets': len(pet_list),
+        'photos': len(photos),
+        'adoption_requests': len(requests),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--shelters', type=int, default=50)
+    parser.add_argument('--pets', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    totals = seed(clients=args.clients, shelters=args.shelters, pets=args.pets, seed=args.seed)
+    print(', '.join(f'{count} {name}' for name, count in totals.items()))
+
+
+if __name__ == '__main__':
+    main()
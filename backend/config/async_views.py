@@ -0,0 +1,85 @@
+"""Vistas de solo lectura nativamente asíncronas (ASGI).
+
+Sirven list/retrieve con el ORM asíncrono (``aiterator``/``aget``) y los mismos
+serializers DRF que los viewsets, sin ocupar un hilo por petición mientras se
+espera a la base de datos o a un cliente lento. El queryset debe precargar
+(select_related/prefetch_related) todo lo que use el serializer: en un
+contexto asíncrono una consulta perezosa lanzaría SynchronousOnlyOperation.
+
+El código, el cuerpo y el Content-Type son los del viewset equivalente, también
+con filtros, listas vacías y errores (los filtros van en ``get_queryset``). No
+hacen GET condicional: las respuestas no llevan ETag ni Last-Modified.
+
+El usuario se identifica como en los viewsets, con las
+``DEFAULT_AUTHENTICATION_CLASSES`` de DRF (el JWT de ``Authorization``), antes
+de los permisos y del límite de peticiones; sin token vale la sesión o anónimo.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, PermissionDenied, Throttled
+from rest_framework.permissions import AllowAny
+from rest_framework.settings import api_settings
+
+from .renderers import FastJSONRenderer
+
+
+class AsyncReadView(View):
+    queryset = None
+    serializer_class = None
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = (AllowAny,)
+    throttle_classes = ()
+    throttle_scope = None
+    chunk_size = 500
+    http_method_names = ['get', 'head', 'options']
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['context'] = {'request': self.request, 'view': self}
+        return self.serializer_class(*args, **kwargs)
+
+    def render(self, data, status=200):
+        return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+    async def authenticate(self, request):
+        """Usuario del primer autenticador que lo reconoce; si ninguno, el de la sesión (o anónimo)."""
+        for authentication_class in self.authentication_classes:
+            # Los autenticadores de DRF son síncronos (el JWT lee el usuario de la base de datos)
+            result = await sync_to_async(authentication_class().authenticate)(request)
+            if result is not None:
+                return result[0]
+        return await request.auser()
+
+    async def get(self, request, pk=None):
+        request.user = await self.authenticate(request)
+        for permission in self.permission_classes:
+            if not permission().has_permission(request, self):
+                return self.render({'detail': str(PermissionDenied.default_detail)}, status=403)
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                wait = math.ceil(throttle.wait() or 0)
+                response = self.render({'detail': str(Throttled(wait).detail)}, status=429)
+                response['Retry-After'] = str(wait)
+                return response
+        try:
+            # Filtros de la query string: lanzan ValidationError de DRF como en el viewset
+            queryset = self.get_queryset()
+        except APIException as exc:
+            return self.render(exc.detail, status=exc.status_code)
+        if pk is None:
+            objects = [obj async for obj in queryset.aiterator(chunk_size=self.chunk_size)]
+            return self.render(self.get_serializer(objects, many=True).data)
+        try:
+            obj = await queryset.aget(pk=pk)
+        except (ObjectDoesNotExist, ValueError, ValidationError):
+            # Mismo mensaje que get_object_or_404 en el viewset
+            detail = f"No {queryset.model._meta.object_name} matches the given query."
+            return self.render({'detail': detail}, status=404)
+        return self.render(self.get_serializer(obj).data)
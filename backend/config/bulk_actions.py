@@ -0,0 +1,170 @@
+"""Acciones masivas del admin por lotes de clave primaria.
+
+Un único ``queryset.update()`` sobre toda la selección del admin (o sobre
+"seleccionar todo" con 100k filas) mantiene bloqueadas todas esas filas hasta
+el final de la transacción. Las acciones de los ``ModelAdmin`` con
+``ChunkedActionsMixin`` llaman en su lugar a
+``self.run_chunked(request, queryset, apply, message)``: las pk seleccionadas se
+recorren en orden, ``BULK_ACTION_BATCH_SIZE`` cada vez, y ``apply(lote)``
+recibe el queryset de ese rango dentro de su propia transacción corta.
+``apply`` devuelve un entero (se acumula como ``count``) o un dict de
+contadores, que se suman entre lotes y rellenan ``message`` (``str.format_map``;
+un contador que no apareció vale 0).
+
+Si la selección supera ``BULK_ACTION_BACKGROUND_THRESHOLD`` filas la acción
+sigue en un hilo del proceso y el admin responde en el momento con un enlace a
+su progreso (``<app>/<modelo>/bulk-jobs/<id>/``, JSON). El progreso se guarda en
+la caché ``BULK_ACTION_CACHE`` (vacío = memoria del proceso: solo lo ve el
+worker que lanzó la acción). Si el worker se reinicia a mitad, los lotes ya
+terminados quedan aplicados; como las acciones solo cambian filas que siguen
+en el estado de origen, se puede volver a lanzar sobre la misma selección.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.http import Http404, JsonResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .throttling import LocalBucketStore
+
+JOB_TTL = 24 * 3600  # segundos que se conserva el progreso de una tarea
+
+logger = logging.getLogger('teadopto.bulk_actions')
+
+local_jobs = LocalBucketStore(max_entries=1000)
+
+
+def get_store():
+    alias = getattr(settings, 'BULK_ACTION_CACHE', None)
+    return caches[alias] if alias else local_jobs
+
+
+def iter_chunks(queryset, batch_size):
+    """(lote, filas): querysets de `queryset` por rangos de pk con como mucho batch_size filas.
+
+    Cada rango se calcula justo antes de devolverlo (paginación por pk, sin
+    OFFSET), así que los huecos en las pk no generan lotes vacíos.
+    """
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        ids = list((pks if last is None else pks.filter(pk__gt=last))[:batch_size])
+        if not ids:
+            return
+        last = ids[-1]
+        yield queryset.filter(pk__gte=ids[0], pk__lte=last).order_by(), len(ids)
+
+
+def run_in_chunks(queryset, apply, batch_size=None, progress=None):
+    """Llama a apply(lote) con una transacción por lote; devuelve los contadores sumados."""
+    totals = Counter()
+    for chunk, rows in iter_chunks(queryset, batch_size or settings.BULK_ACTION_BATCH_SIZE):
+        with transaction.atomic():
+            result = apply(chunk)
+        totals.update(result if isinstance(result, dict) else {'count': result or 0})
+        if progress is not None:
+            progress(rows, totals)
+    return totals
+
+
+class BulkJob:
+    """Progreso de una acción en segundo plano, guardado en get_store() bajo ``bulk_action:<id>``."""
+
+    def __init__(self, label, total):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.status = 'running'
+        self.message = ''
+        self.started_at = time.time()
+        self.finished_at = None
+        self.thread = None
+        self.save()
+
+    def as_dict(self):
+        return {
+            'id': self.id, 'label': self.label, 'status': self.status,
+            'done': self.done, 'total': self.total, 'message': self.message,
+            'started_at': self.started_at, 'finished_at': self.finished_at,
+        }
+
+    def save(self):
+        get_store().set(f'bulk_action:{self.id}', self.as_dict(), JOB_TTL)
+
+    def advance(self, rows, totals):
+        self.done += rows
+        self.save()
+
+    def finish(self, status, message):
+        self.status = status
+        self.message = message
+        self.finished_at = time.time()
+        self.save()
+
+
+def get_job(job_id):
+    """Progreso guardado de una tarea (dict de BulkJob.as_dict) o None."""
+    return get_store().get(f'bulk_action:{job_id}')
+
+
+def _run_job(job, queryset, apply, message, batch_size):
+    try:
+        totals = run_in_chunks(queryset, apply, batch_size, progress=job.advance)
+        job.finish('done', message.format_map(totals))
+    except Exception as exc:
+        logger.exception("Acción masiva '%s' (%s) interrumpida", job.label, job.id)
+        job.finish('failed', str(exc))
+    finally:
+        # Conexiones abiertas por este hilo: nadie más las cerraría
+        connections.close_all()
+
+
+def start_job(label, queryset, apply, message, total=None, batch_size=None):
+    """Ejecuta run_in_chunks() en un hilo y devuelve su BulkJob."""
+    job = BulkJob(label, queryset.count() if total is None else total)
+    job.thread = threading.Thread(
+        target=_run_job, args=(job, queryset, apply, message, batch_size),
+        name=f'bulk-action-{job.id}', daemon=True,
+    )
+    job.thread.start()
+    return job
+
+
+class ChunkedActionsMixin:
+    """ModelAdmin cuyas acciones masivas usan run_chunked() y exponen el progreso de las tareas."""
+
+    def run_chunked(self, request, queryset, apply, message, label=None):
+        """Aplica `apply` por lotes; en segundo plano si la selección supera el umbral."""
+        total = queryset.count()
+        if total > settings.BULK_ACTION_BACKGROUND_THRESHOLD:
+            job = start_job(label or self.opts.verbose_name_plural, queryset, apply, message, total=total)
+            url = reverse(
+                f'{self.admin_site.name}:{self.opts.app_label}_{self.opts.model_name}_bulk_job', args=[job.id],
+            )
+            self.message_user(request, format_html(
+                '{} fila(s) en proceso en segundo plano (tarea {}): <a href="{}">ver progreso</a>.', total, job.id, url,
+            ))
+            return None
+        totals = run_in_chunks(queryset, apply)
+        self.message_user(request, message.format_map(totals))
+        return totals
+
+    def get_urls(self):
+        name = f'{self.opts.app_label}_{self.opts.model_name}_bulk_job'
+        return [
+            path('bulk-jobs/<str:job_id>/', self.admin_site.admin_view(self.bulk_job_view), name=name),
+        ] + super().get_urls()
+
+    def bulk_job_view(self, request, job_id):
+        job = get_job(job_id)
+        if job is None or not self.has_change_permission(request):
+            raise Http404("Tarea desconocida o caducada.")
+        return JsonResponse(job)
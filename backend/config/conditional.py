@@ -0,0 +1,66 @@
+"""GET condicional (ETag / Last-Modified) para list y retrieve de viewsets DRF.
+
+Antes de cargar y serializar nada se hace una sola consulta barata sobre el
+queryset ya filtrado: ``updated_at`` del objeto en retrieve, ``MAX(updated_at)``
+y ``COUNT(*)`` en list (el recuento detecta borrados, que no mueven el máximo).
+Si el cliente manda ``If-None-Match``/``If-Modified-Since`` y nada cambió, se
+responde 304 sin ejecutar las consultas del listado ni el serializer.
+
+El listado solo lleva ETag: un borrado no cambia ``MAX(updated_at)``, así que
+``Last-Modified`` no serviría para revalidarlo. Pensado para acciones sin
+permisos por objeto (retrieve no llega a cargar la instancia en el caso 304).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(request, *parts):
+    user = request.user.pk if request.user.is_authenticated else ''
+    fmt = getattr(request, 'accepted_renderer', None)
+    key = '\n'.join(map(str, (request.get_full_path(), user, getattr(fmt, 'format', ''), *parts)))
+    return f'"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+class ConditionalGetMixin:
+    timestamp_field = 'updated_at'
+
+    def _conditional(self, request, etag, last_modified=None):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def _finish(self, response, etag, last_modified=None):
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        state = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            last=Max(self.timestamp_field), total=Count('pk'),
+        )
+        etag = make_etag(request, state['last'], state['total'])
+        not_modified = self._conditional(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return self._finish(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        try:
+            last_modified = (
+                self.filter_queryset(self.get_queryset()).filter(**lookup)
+                .values_list(self.timestamp_field, flat=True).first()
+            )
+        except (TypeError, ValueError):
+            last_modified = None
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)  # 404 como siempre
+        etag = make_etag(request, last_modified.isoformat())
+        not_modified = self._conditional(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        return self._finish(super().retrieve(request, *args, **kwargs), etag, last_modified)
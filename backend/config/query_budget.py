@@ -0,0 +1,114 @@
+"""Presupuesto de consultas SQL por acción de un viewset.
+
+Cada viewset declara el máximo de consultas por acción::
+
+    class PetViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+        query_budget = {'list': 3, 'retrieve': 3}
+
+Según ``settings.QUERY_BUDGET_MODE``:
+
+- ``'off'``: no se cuenta nada (sin coste).
+- ``'warn'``: se registra un warning en el logger ``teadopto.query_budget`` con
+  las consultas agrupadas por el punto del código del proyecto que las lanzó.
+- ``'raise'``: además se lanza ``QueryBudgetExceeded`` (pensado para los tests).
+
+Solo se cuentan las consultas hechas dentro de ``dispatch``; las de una
+respuesta en streaming ocurren después y no entran en el presupuesto.
+
+Lo registrado con ``transaction.on_commit`` (registro de cambios, índice de
+búsqueda) se ejecuta en producción dentro de ``dispatch``, al confirmar el
+autocommit, y cuenta. Dentro de un ``TestCase`` esos callbacks no llegan a
+ejecutarse y cada transacción aparece como SAVEPOINT, así que los tests de
+presupuesto (``PetQueryBudgetTests`` y ``AdoptionRequestQueryBudgetTests``) son
+``TransactionTestCase`` en autocommit: cuentan lo mismo que producción. En
+SQLite cada transacción suma un BEGIN; en MySQL no pasa por el cursor, así que
+allí los presupuestos son una cota superior.
+"""
+import logging
+import os
+import sys
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('teadopto.query_budget')
+
+_PROJECT_ROOT = str(settings.BASE_DIR) + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_DJANGO_DB = os.sep + os.path.join('django', 'db') + os.sep
+
+
+def _describe(frame, filename, root):
+    return f"{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+def _call_site():
+    """Punto de llamada de una consulta: el primer frame fuera del ORM y, si es de una
+    librería (DRF, admin...), también el primer frame del proyecto que llegó hasta él."""
+    frame = sys._getframe(2)
+    origin = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename != _THIS_FILE and _DJANGO_DB not in filename:
+            in_project = filename.startswith(_PROJECT_ROOT) and 'site-packages' not in filename
+            if in_project:
+                site = _describe(frame, filename, _PROJECT_ROOT)
+                return site if origin is None else f"{origin} <- {site}"
+            if origin is None:
+                origin = _describe(frame, filename, os.path.dirname(os.path.dirname(filename)))
+        frame = frame.f_back
+    return origin or '<desconocido>'
+
+
+class QueryRecorder:
+    """execute_wrapper que cuenta consultas y las agrupa por punto de llamada."""
+
+    def __init__(self):
+        self.count = 0
+        self.sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        site = self.sites.setdefault(_call_site(), {'count': 0, 'sql': sql})
+        site['count'] += 1
+        return execute(sql, params, many, context)
+
+    def report(self):
+        lines = sorted(self.sites.items(), key=lambda item: -item[1]['count'])
+        return '\n'.join(f"  {info['count']:>4}x {site}: {info['sql'][:200]}" for site, info in lines)
+
+
+class QueryBudgetMixin:
+    query_budget = {}
+
+    def get_query_budget(self):
+        return self.query_budget.get(getattr(self, 'action', None))
+
+    def dispatch(self, request, *args, **kwargs):
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        if mode == 'off' or not self.query_budget:
+            return super().dispatch(request, *args, **kwargs)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = super().dispatch(request, *args, **kwargs)
+
+        budget = self.get_query_budget()
+        if budget is not None and recorder.count > budget:
+            message = (
+                f"{type(self).__name__}.{self.action}: {recorder.count} consultas "
+                f"(presupuesto {budget}) en {request.method} {request.path}\n{recorder.report()}"
+            )
+            logger.warning(message)
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+        return response
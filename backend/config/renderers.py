@@ -0,0 +1,96 @@
+"""Renderer y parser JSON rápidos para DRF.
+
+Usan orjson cuando está instalado y, si no, se comportan exactamente como los
+``JSONRenderer``/``JSONParser`` de DRF (módulo ``json`` de la biblioteca
+estándar). Los tipos que orjson no conoce o que DRF formatea a su manera
+(datetime, Decimal, cadenas lazy, UUID, QuerySet...) se delegan en
+``rest_framework.utils.encoders.JSONEncoder``, por lo que la salida es la misma
+con y sin orjson. Diferencias conocidas con orjson:
+
+- ``NaN``/``Infinity`` se escriben como ``null``; DRF (``STRICT_JSON``) lanza
+  ``ValueError`` y la petición acaba en 500.
+- El parser rechaza con 400 números que desbordan un float (``1e400``) y
+  surrogates sueltos (``"\\ud800"``), que ``json`` acepta.
+
+Los cuerpos con números de 19 cifras o más se leen con ``json``: orjson
+convierte en float los enteros que no caben en 64 bits y perdería precisión.
+"""
+import json
+import re
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser, get_encoding
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+_LONG_NUMBER = re.compile(rb'\d{19}')
+
+
+def _escape_line_separators(ret):
+    # Igual que DRF: \u2028 y \u2029 siempre escapados para que sea JavaScript válido
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data):
+        """Serializa `data` a bytes JSON compactos, los mismos que el JSONRenderer de DRF."""
+        return _escape_line_separators(orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS))
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    def dumps(data):
+        """Serializa `data` a bytes JSON compactos, los mismos que el JSONRenderer de DRF."""
+        return _escape_line_separators(json.dumps(
+            data, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':')
+        ).encode())
+
+    def loads(data):
+        return json.loads(data, parse_constant=strict_constant)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer que usa orjson para las respuestas compactas (el caso normal de la API)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except TypeError:
+            # p. ej. enteros de más de 64 bits: los resuelve el encoder estándar
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser que decodifica con orjson cuando está disponible."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        encoding = get_encoding(parser_context or {})
+        try:
+            data = stream.read()
+            if _LONG_NUMBER.search(data):
+                return json.loads(data.decode(encoding), parse_constant=strict_constant)
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return loads(data)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
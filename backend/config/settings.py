@@ -68,17 +68,56 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 
 
+# Las instancias ASGI (config/asgi.py) definen DJANGO_SERVER_MODE=asgi antes de cargar los settings
+ASGI_MODE = os.getenv('DJANGO_SERVER_MODE') == 'asgi'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'teadopto',
-        'USER': 'django_user',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.mysql'),
+        'NAME': os.getenv('DB_NAME', 'teadopto'),
+        'USER': os.getenv('DB_USER', 'django_user'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '3306'),
+        # Conexiones persistentes: se reutilizan entre peticiones del mismo hilo.
+        # En ASGI cada petición síncrona puede caer en un hilo distinto, así que
+        # allí se desactivan por defecto y se recomienda el pool (DB_POOL=True).
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0' if ASGI_MODE else '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
     }
 }
 
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+if DB_POOL:
+    from django.core.exceptions import ImproperlyConfigured
+
+    _db = DATABASES['default']
+    _pool_size = int(os.getenv('DB_POOL_SIZE', '10'))
+    _pool_max_overflow = int(os.getenv('DB_POOL_MAX_OVERFLOW', '10'))
+    _pool_recycle = int(os.getenv('DB_POOL_RECYCLE', '300'))
+    # Con pool, la conexión se devuelve al pool al terminar cada petición
+    _db['CONN_MAX_AGE'] = 0
+    if _db['ENGINE'] == 'django.db.backends.mysql':
+        try:
+            import dj_db_conn_pool  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured("DB_POOL=True con MySQL requiere 'pip install django-db-connection-pool[mysql]'.")
+        _db['ENGINE'] = 'dj_db_conn_pool.backends.mysql'
+        _db['POOL_OPTIONS'] = {
+            'POOL_SIZE': _pool_size,
+            'MAX_OVERFLOW': _pool_max_overflow,
+            'RECYCLE': _pool_recycle,
+            'pre_ping': _db['CONN_HEALTH_CHECKS'],
+        }
+    elif _db['ENGINE'] == 'django.db.backends.postgresql':
+        _db.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': 1,
+            'max_size': _pool_size + _pool_max_overflow,
+            'max_lifetime': _pool_recycle,
+        }
+    else:
+        raise ImproperlyConfigured(f"DB_POOL no está soportado para {_db['ENGINE']}.")
+
 
 
 
@@ -88,6 +127,34 @@ try:
 except ImportError:
     pass
 
+# Hash de contraseñas (users/hashers.py): argon2 | scrypt | pbkdf2 | auto (argon2 si está
+# argon2-cffi, si no scrypt). Las contraseñas guardadas con otro hasher o con otro coste se
+# recalculan con el preferido en el siguiente login.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'auto')
+if PASSWORD_HASHER == 'auto':
+    try:
+        import argon2  # noqa: F401
+        PASSWORD_HASHER = 'argon2'
+    except ImportError:
+        import hashlib
+        PASSWORD_HASHER = 'scrypt' if hasattr(hashlib, 'scrypt') else 'pbkdf2'
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', '1000000'))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv('PASSWORD_SCRYPT_WORK_FACTOR', str(2 ** 14)))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', '2'))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', '102400'))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', '8'))
+_PASSWORD_HASHERS = {
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'users.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -119,6 +186,22 @@ STATIC_URL = "/static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Importación masiva de mascotas (manage.py import_pets y /api/pets/import/)
+PET_IMPORT_PHOTO_ROOT = Path(os.getenv('PET_IMPORT_PHOTO_ROOT', MEDIA_ROOT))
+PET_IMPORT_BATCH_SIZE = int(os.getenv('PET_IMPORT_BATCH_SIZE', '500'))
+PET_IMPORT_WORKERS = int(os.getenv('PET_IMPORT_WORKERS', str(os.cpu_count() or 2)))
+
+# Pool de procesos para normalizar imágenes (pets/images.py); IMAGE_WORKERS=0 procesa en el propio hilo.
+# Cada proceso web (worker de gunicorn/uvicorn) tiene su propio pool: por defecto los núcleos se
+# reparten entre los WEB_CONCURRENCY workers del host para no lanzar workers × núcleos procesos.
+WEB_CONCURRENCY = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', str(max(1, (os.cpu_count() or 2) // WEB_CONCURRENCY))))
+IMAGE_QUEUE_SIZE = int(os.getenv('IMAGE_QUEUE_SIZE', str(IMAGE_WORKERS * 4)))
+IMAGE_QUEUE_WAIT = float(os.getenv('IMAGE_QUEUE_WAIT', '2'))
+IMAGE_TASK_TIMEOUT = float(os.getenv('IMAGE_TASK_TIMEOUT', '30'))
+# Distancia de Hamming máxima entre dHash para considerar una foto duplicada (0-3, ver PetPhotoQuerySet)
+PHOTO_DUPLICATE_DISTANCE = min(3, int(os.getenv('PHOTO_DUPLICATE_DISTANCE', '3')))
+
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -129,8 +212,50 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # orjson si está instalado; si no, equivalen a los JSONRenderer/JSONParser de DRF
+    "DEFAULT_RENDERER_CLASSES": (
+        "config.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "config.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # Sólo limita las vistas que declaran throttle_scope (config/throttling.py)
+    "DEFAULT_THROTTLE_CLASSES": (
+        "config.throttling.RoleRateThrottle",
+    ),
 }
 
+# Límite de peticiones: {scope: {rol: 'N/periodo'}}; rol admin | shelter | client | anon.
+# THROTTLE_CACHE: alias de CACHES para compartir los cubos entre workers (vacío = memoria del proceso)
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE') or None
+THROTTLE_RATES = {
+    "register": {"anon": "10/hour", "client": "10/hour", "shelter": "10/hour"},
+    "login": {"anon": "10/min", "client": "10/min", "shelter": "10/min", "admin": "30/min"},
+    "pets_read": {"anon": "120/min", "client": "300/min", "shelter": "300/min"},
+}
+if os.getenv('THROTTLE_ENABLED', 'True').lower() != 'true':
+    THROTTLE_RATES = {}
+
+# Tiempo (s) durante el que un POST con la misma Idempotency-Key devuelve la respuesta guardada
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 3600)))
+
+# Feed incremental de mascotas (pets/changes.py): cambios por página y antigüedad (s) de las lápidas
+PET_CHANGES_PAGE_SIZE = int(os.getenv('PET_CHANGES_PAGE_SIZE', '500'))
+PET_CHANGES_RETENTION = int(os.getenv('PET_CHANGES_RETENTION', str(30 * 24 * 3600)))
+# Segundos entre comprobaciones del registro de cambios del índice de mascotas parecidas (pets/similar.py)
+SIMILAR_PETS_REFRESH = float(os.getenv('SIMILAR_PETS_REFRESH', '1'))
+
+# Acciones masivas del admin (config/bulk_actions.py): filas por transacción, selección a partir de la
+# cual siguen en segundo plano y alias de CACHES para su progreso (vacío = memoria del proceso)
+BULK_ACTION_BATCH_SIZE = int(os.getenv('BULK_ACTION_BATCH_SIZE', '1000'))
+BULK_ACTION_BACKGROUND_THRESHOLD = int(os.getenv('BULK_ACTION_BACKGROUND_THRESHOLD', '5000'))
+BULK_ACTION_CACHE = os.getenv('BULK_ACTION_CACHE') or None
+
+# Presupuesto de consultas por acción de los viewsets (config/query_budget.py): off | warn | raise
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off')
 
 from datetime import timedelta
 
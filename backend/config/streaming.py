@@ -0,0 +1,52 @@
+"""Modo de listado en streaming para viewsets DRF.
+
+Con ``?stream=json`` (array JSON) o ``?stream=ndjson`` (un objeto por línea),
+``list`` deja de construir la lista completa en memoria: recorre el queryset con
+``iterator(chunk_size=...)``, serializa cada bloque y lo envía en una
+``StreamingHttpResponse``. Sin el parámetro, el comportamiento no cambia, y con
+``?stream=json`` el cuerpo y el Content-Type son los mismos que sin él.
+"""
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+STREAM_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class StreamingListMixin:
+    stream_param = 'stream'
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        mode = request.query_params.get(self.stream_param)
+        if mode not in STREAM_CONTENT_TYPES:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Sin "; charset=": como el JSONRenderer de DRF (JSON siempre va en UTF-8)
+        return StreamingHttpResponse(self.stream_rows(queryset, mode), content_type=STREAM_CONTENT_TYPES[mode])
+
+    def iter_serialized(self, queryset):
+        """Genera los objetos serializados bloque a bloque."""
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                return
+            yield from self.get_serializer(chunk, many=True).data
+
+    def stream_rows(self, queryset, mode):
+        if mode == 'ndjson':
+            for item in self.iter_serialized(queryset):
+                yield dumps(item) + b'\n'
+            return
+        yield b'['
+        first = True
+        for item in self.iter_serialized(queryset):
+            yield dumps(item) if first else b',' + dumps(item)
+            first = False
+        yield b']'
@@ -0,0 +1,158 @@
+"""Límite de peticiones por rol y por endpoint con un token bucket.
+
+Cada vista declara ``throttle_scope``: un nombre o un dict por acción del viewset
+(como ``query_budget``). Los ritmos se configuran en ``settings.THROTTLE_RATES``
+como ``{scope: {rol: 'N/periodo'}}``, con rol ``admin``/``shelter``/``client`` o
+``anon`` para peticiones sin autenticar; un scope o rol sin ritmo no se limita.
+
+``'N/min'`` es un cubo de N fichas que se rellena a N por minuto: admite ráfagas
+de hasta N peticiones y después una cada periodo/N segundos. El estado de cada
+cubo es una tupla ``(fichas, instante)``, sin lista de marcas de tiempo como
+``SimpleRateThrottle`` de DRF. Por defecto vive en un dict del proceso
+(``LocalBucketStore``), así que con varios workers el límite efectivo es N por
+worker; ``THROTTLE_CACHE`` permite usar en su lugar una caché de Django
+compartida a cambio de unos microsegundos más por petición.
+
+En la caché compartida la lectura y escritura del cubo va protegida por un
+cerrojo entre workers: una clave ``<cubo>:lock`` creada con ``cache.add`` (atómico
+en memcached, Redis y la caché de base de datos) que caduca sola a los
+``LOCK_TIMEOUT`` segundos si el worker muere con él. Si no se consigue en
+``LOCK_WAIT`` segundos la petición se limita como si el cubo estuviera vacío.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+LOCK_TIMEOUT = 1  # segundos que vive el cerrojo de un cubo en la caché compartida
+LOCK_WAIT = 0.05  # segundos que se espera el cerrojo antes de limitar la petición
+
+_lock = threading.Lock()
+_parsed_rates = {}
+
+
+def parse_rate(rate):
+    """'20/min' -> (capacidad, fichas por segundo)"""
+    if rate not in _parsed_rates:
+        count, period = rate.split('/')
+        count = int(count)
+        _parsed_rates[rate] = (count, count / PERIODS[period])
+    return _parsed_rates[rate]
+
+
+def get_scope(view):
+    scope = getattr(view, 'throttle_scope', None)
+    if isinstance(scope, dict):
+        return scope.get(getattr(view, 'action', None))
+    return scope
+
+
+def get_role(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anon'
+    return getattr(user, 'role', None) or 'client'
+
+
+class LocalBucketStore:
+    """Cubos en memoria del proceso con la interfaz get/set de una caché."""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.entries = {}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    def set(self, key, value, timeout):
+        now = time.time()
+        if len(self.entries) >= self.max_entries and key not in self.entries:
+            # Los cubos caducados ya estarían llenos: se pueden olvidar sin cambiar nada
+            self.entries = {k: entry for k, entry in self.entries.items() if entry[1] >= now}
+            if len(self.entries) >= self.max_entries:
+                self.entries.clear()
+        self.entries[key] = (value, now + timeout)
+
+    def clear(self):
+        self.entries.clear()
+
+
+local_buckets = LocalBucketStore()
+
+
+def get_store():
+    alias = getattr(settings, 'THROTTLE_CACHE', None)
+    return caches[alias] if alias else local_buckets
+
+
+class TokenBucket:
+    """Cubo de fichas guardado en ``store`` (LocalBucketStore o caché de Django) bajo ``key``."""
+
+    def __init__(self, store, key, capacity, refill_rate):
+        self.store = store
+        self.key = key
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+    def consume(self, now=None):
+        """Gasta una ficha; devuelve 0 si había, o los segundos hasta la siguiente."""
+        if isinstance(self.store, LocalBucketStore):
+            with _lock:
+                return self._consume(now)
+        lock_key = f'{self.key}:lock'
+        deadline = time.monotonic() + LOCK_WAIT
+        while not self.store.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                # Demasiadas peticiones a la vez sobre el mismo cubo: se limita
+                return 1 / self.refill_rate
+            time.sleep(0.001)
+        try:
+            return self._consume(now)
+        finally:
+            self.store.delete(lock_key)
+
+    def _consume(self, now):
+        """Lectura y escritura del cubo; quien llama tiene el cerrojo."""
+        now = time.time() if now is None else now
+        tokens, updated = self.store.get(self.key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+        if tokens >= 1:
+            # Caduca cuando el cubo se habría vuelto a llenar: ausente == lleno
+            self.store.set(self.key, (tokens - 1, now), timeout=self.capacity / self.refill_rate)
+            return 0
+        return (1 - tokens) / self.refill_rate
+
+
+class RoleRateThrottle(BaseThrottle):
+    """Throttle de DRF: un cubo por (scope, rol, usuario o IP)."""
+
+    def __init__(self):
+        self.retry_after = None
+
+    def allow_request(self, request, view):
+        scope = get_scope(view)
+        if scope is None:
+            return True
+        rates = settings.THROTTLE_RATES.get(scope)
+        role = get_role(request)
+        rate = rates.get(role) if rates else None
+        if rate is None:
+            return True
+        ident = request.user.pk if role != 'anon' else self.get_ident(request)
+        capacity, refill_rate = parse_rate(rate)
+        bucket = TokenBucket(get_store(), f'throttle:{scope}:{role}:{ident}', capacity, refill_rate)
+        wait = bucket.consume()
+        if wait:
+            self.retry_after = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
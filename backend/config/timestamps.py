@@ -0,0 +1,18 @@
+"""``updated_at`` que también avanza con ``QuerySet.update()``.
+
+``auto_now`` solo actúa en ``save()``; los contadores (pets/counters.py), la
+máquina de estados (pets/adoption.py) y las acciones masivas del admin escriben
+con ``update()``. Con este QuerySet como manager, cualquier UPDATE que no fije
+``updated_at`` explícitamente lo pone a ``Now()`` en la misma sentencia, y las
+validaciones condicionales (config/conditional.py) ven el cambio.
+"""
+from django.db import models
+from django.db.models.functions import Now
+
+
+class TimestampedQuerySet(models.QuerySet):
+    timestamp_field = 'updated_at'
+
+    def update(self, **kwargs):
+        kwargs.setdefault(self.timestamp_field, Now())
+        return super().update(**kwargs)
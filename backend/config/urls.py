@@ -2,14 +2,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 from rest_framework import routers
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from users.views import UserViewSet
-from shelters.views import ShelterViewSet
-from pets.views import PetViewSet, AdoptionRequestViewSet
+from users.views import UserViewSet, LoginView
+from shelters.views import ShelterViewSet, ShelterAsyncReadView
+from pets.views import PetViewSet, AdoptionRequestViewSet, PetAsyncReadView
 
 router = routers.DefaultRouter()
 router.register(r"users", UserViewSet)
@@ -35,9 +32,15 @@ urlpatterns = [
     path("admin/", admin.site.urls),
 
     # JWT
-    path("api/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("api/login/", LoginView.as_view(), name="token_obtain_pair"),
     path("api/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 
+    # Lectura asíncrona (ASGI) con la misma salida que /api/pets/ y /api/shelters/
+    path("api/async/pets/", PetAsyncReadView.as_view(), name="pet-async-list"),
+    path("api/async/pets/<int:pk>/", PetAsyncReadView.as_view(), name="pet-async-detail"),
+    path("api/async/shelters/", ShelterAsyncReadView.as_view(), name="shelter-async-list"),
+    path("api/async/shelters/<int:pk>/", ShelterAsyncReadView.as_view(), name="shelter-async-detail"),
+
     # API CRUD
     path("api/", include(router.urls)),
 ]
@@ -1,12 +1,17 @@
-from django.contrib import admin
+from collections import Counter
+
+from django.contrib import admin, messages
 from django.utils.html import format_html
+from config.bulk_actions import ChunkedActionsMixin
 from .models import Pet, AdoptionRequest, PetPhoto
+from .search import SEARCH_FIELDS, IndexedSearchMixin
+from . import adoption
 
 class PetPhotoInline(admin.TabularInline):
     model = PetPhoto
     extra = 0
-    readonly_fields = ('photo_preview',)
-    fields = ('photo', 'photo_preview', 'is_primary', 'order')
+    readonly_fields = ('photo_preview', 'duplicate_of')
+    fields = ('photo', 'photo_preview', 'is_primary', 'order', 'duplicate_of')
     
     def photo_preview(self, obj):
         if obj.photo:
@@ -15,10 +20,12 @@ class PetPhotoInline(admin.TabularInline):
     photo_preview.short_description = 'Vista previa'
 
 @admin.register(Pet)
-class PetAdmin(admin.ModelAdmin):
-    list_display = ('name', 'pet_type', 'breed', 'age', 'size', 'owner_or_shelter', 'status_badge', 'pet_id')
+class PetAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ('name', 'pet_type', 'breed', 'age', 'size', 'owner_or_shelter', 'status_badge', 'pending_request_count', 'pet_id')
     list_filter = ('pet_type', 'size', 'shelter', 'owner')
-    search_fields = ('name', 'breed', 'description', 'shelter__name', 'owner__username')
+    # Búsqueda con el índice de tokens (pets/search.py); search_fields queda para términos sin palabras
+    search_index = 'pet'
+    search_fields = SEARCH_FIELDS['pet'][1]
     readonly_fields = ('primary_photo_preview', 'pet_id')
     inlines = [PetPhotoInline]
     fieldsets = (
@@ -46,9 +53,8 @@ class PetAdmin(admin.ModelAdmin):
     owner_or_shelter.short_description = 'Propietario'
     
     def status_badge(self, obj):
-        # Verificar si tiene fotos
-        has_photos = obj.photos.exists()
-        if has_photos:
+        # Verificar si tiene fotos (contador desnormalizado, sin consulta extra)
+        if obj.photo_count:
             return format_html('<span style="color: green;">✓ Con fotos</span>')
         return format_html('<span style="color: orange;">⚠ Sin fotos</span>')
     status_badge.short_description = 'Estado'
@@ -68,10 +74,11 @@ class PetAdmin(admin.ModelAdmin):
     pet_id.short_description = 'ID'
 
 @admin.register(AdoptionRequest)
-class AdoptionRequestAdmin(admin.ModelAdmin):
+class AdoptionRequestAdmin(IndexedSearchMixin, ChunkedActionsMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'pet_name', 'status_badge', 'request_id_display')
     list_filter = ('status', 'pet__pet_type')
-    search_fields = ('user__username', 'user__email', 'pet__name', 'message')
+    search_index = 'adoption'
+    search_fields = SEARCH_FIELDS['adoption'][1]
     readonly_fields = ('request_id',)
     fieldsets = (
         ('Información de la solicitud', {
@@ -85,6 +92,16 @@ class AdoptionRequestAdmin(admin.ModelAdmin):
     
     actions = ['approve_requests', 'reject_requests', 'pending_requests']
     
+    def save_model(self, request, obj, form, change):
+        """Los cambios de estado pasan por la máquina de estados (pets/adoption.py)"""
+        if change and 'status' in form.changed_data:
+            status, obj.status = obj.status, form.initial['status']
+            try:
+                adoption.transition(obj, status)
+            except adoption.TransitionError as exc:
+                self.message_user(request, f'No se cambió el estado: {exc}', level=messages.ERROR)
+        super().save_model(request, obj, form, change)
+    
     def pet_name(self, obj):
         if obj.pet:
             return format_html('<strong>{}</strong> ({})', obj.pet.name, obj.pet.get_pet_type_display())
@@ -121,19 +138,29 @@ class AdoptionRequestAdmin(admin.ModelAdmin):
     request_id_display.short_description = 'ID'
     
     def approve_requests(self, request, queryset):
-        """Aprobar solicitudes seleccionadas"""
-        count = queryset.update(status='approved')
-        self.message_user(request, f'{count} solicitud(es) aprobada(s).')
+        """Aprobar solicitudes seleccionadas (la mascota pasa a adoptada y se rechazan las demás)"""
+        def apply(chunk):
+            totals = Counter()
+            for adoption_request in chunk.filter(status='pending').order_by('pk'):
+                try:
+                    totals['rejected'] += adoption.approve(adoption_request)
+                    totals['approved'] += 1
+                except adoption.TransitionError:
+                    totals['skipped'] += 1
+            return totals
+        self.run_chunked(
+            request, queryset, apply,
+            '{approved} solicitud(es) aprobada(s), {rejected} rechazada(s) automáticamente, '
+            '{skipped} omitida(s) porque la mascota ya no estaba disponible.',
+        )
     approve_requests.short_description = "Aprobar solicitudes"
     
     def reject_requests(self, request, queryset):
-        """Rechazar solicitudes seleccionadas"""
-        count = queryset.update(status='rejected')
-        self.message_user(request, f'{count} solicitud(es) rechazada(s).')
+        """Rechazar solicitudes pendientes seleccionadas"""
+        self.run_chunked(request, queryset, adoption.reject, '{count} solicitud(es) rechazada(s).')
     reject_requests.short_description = "Rechazar solicitudes"
     
     def pending_requests(self, request, queryset):
-        """Marcar solicitudes como pendientes"""
-        count = queryset.update(status='pending')
-        self.message_user(request, f'{count} solicitud(es) marcada(s) como pendiente(s).')
+        """Volver a marcar como pendientes las solicitudes rechazadas (si la mascota sigue disponible)"""
+        self.run_chunked(request, queryset, adoption.reopen, '{count} solicitud(es) marcada(s) como pendiente(s).')
     pending_requests.short_description = "Marcar como pendientes"
@@ -0,0 +1,114 @@
+"""Máquina de estados de las adopciones.
+
+Cada transición es un ``UPDATE ... WHERE status=<origen>``: si otra petición ya
+cambió la fila, el UPDATE afecta a 0 filas y la transición falla en lugar de
+pisar el cambio (sin leer-modificar-escribir). Los contadores desnormalizados se
+ajustan con F() en la misma transacción, porque ``QuerySet.update`` no dispara
+las señales de pets/signals.py.
+
+Al aprobar se actualiza primero la mascota: su fila bloqueada serializa las
+aprobaciones concurrentes de la misma mascota (la segunda espera y después no
+encuentra ``status='available'``) y evita interbloqueos con el rechazo masivo
+de las demás solicitudes.
+"""
+from django.db import transaction
+
+from .changes import record_pet_changes
+from .counters import adjust_pet_counters, adjust_shelter_counters, recount_pets
+from .models import AdoptionRequest, Pet
+from .signals import _remember
+
+# Estados de una solicitud a los que se puede pasar desde cada estado
+REQUEST_TRANSITIONS = {
+    'pending': {'approved', 'rejected'},
+    'approved': {'completed', 'pending'},
+    'rejected': {'pending'},
+    'completed': set(),
+}
+
+
+class TransitionError(Exception):
+    pass
+
+
+def _set_pet_status(pet_id, source, target):
+    """Cambia el estado de la mascota solo si sigue en `source`; devuelve si lo hizo."""
+    shelter_id = Pet.objects.filter(pk=pet_id).values_list('shelter_id', flat=True).first()
+    if not Pet.objects.filter(pk=pet_id, status=source).update(status=target):
+        return False
+    adjust_shelter_counters(shelter_id, available_pet_count=1 if target == 'available' else -1)
+    record_pet_changes([pet_id])
+    return True
+
+
+def _set_status(adoption_request, status):
+    adoption_request.status = status
+    _remember(adoption_request, 'status')
+
+
+@transaction.atomic
+def approve(adoption_request):
+    """pending -> approved: la mascota pasa a adoptada y se rechazan las demás solicitudes pendientes."""
+    pet_id = adoption_request.pet_id
+    if not _set_pet_status(pet_id, 'available', 'adopted'):
+        raise TransitionError("La mascota ya no está disponible.")
+    if not AdoptionRequest.objects.filter(pk=adoption_request.pk, status='pending').update(status='approved'):
+        raise TransitionError("La solicitud ya no está pendiente.")
+    rejected = AdoptionRequest.objects.filter(pet_id=pet_id, status='pending').update(status='rejected')
+    adjust_pet_counters(pet_id, pending_request_count=-(1 + rejected))
+    _set_status(adoption_request, 'approved')
+    return rejected
+
+
+@transaction.atomic
+def revert_approval(adoption_request):
+    """approved -> pending: la mascota vuelve a estar disponible (las rechazadas siguen rechazadas)."""
+    if not AdoptionRequest.objects.filter(pk=adoption_request.pk, status='approved').update(status='pending'):
+        raise TransitionError("La solicitud ya no está aprobada.")
+    _set_pet_status(adoption_request.pet_id, 'adopted', 'available')
+    adjust_pet_counters(adoption_request.pet_id, pending_request_count=1)
+    _set_status(adoption_request, 'pending')
+
+
+@transaction.atomic
+def reject(queryset):
+    """pending -> rejected para todas las solicitudes del queryset; devuelve cuántas cambiaron."""
+    pet_ids = set(queryset.values_list('pet_id', flat=True))
+    count = queryset.filter(status='pending').update(status='rejected')
+    recount_pets(Pet.objects.filter(pk__in=pet_ids))
+    record_pet_changes(pet_ids)
+    return count
+
+
+@transaction.atomic
+def reopen(queryset):
+    """rejected -> pending, solo si la mascota sigue disponible."""
+    pet_ids = set(queryset.values_list('pet_id', flat=True))
+    count = queryset.filter(status='rejected', pet__status='available').update(status='pending')
+    recount_pets(Pet.objects.filter(pk__in=pet_ids))
+    record_pet_changes(pet_ids)
+    return count
+
+
+def complete(queryset):
+    """approved -> completed (la mascota ya estaba marcada como adoptada)."""
+    return queryset.filter(status='approved').update(status='completed')
+
+
+def transition(adoption_request, status):
+    """Lleva una solicitud a `status` aplicando la transición que corresponda."""
+    source = adoption_request.status
+    if status == source:
+        return
+    if status not in REQUEST_TRANSITIONS.get(source, ()):
+        raise TransitionError(f"No se puede pasar una solicitud de '{source}' a '{status}'.")
+    if (source, status) == ('pending', 'approved'):
+        approve(adoption_request)
+        return
+    if (source, status) == ('approved', 'pending'):
+        revert_approval(adoption_request)
+        return
+    bulk = {'rejected': reject, 'completed': complete}.get(status, reopen)
+    if not bulk(AdoptionRequest.objects.filter(pk=adoption_request.pk)):
+        raise TransitionError("La solicitud cambió de estado mientras tanto o la mascota ya no está disponible.")
+    _set_status(adoption_request, status)
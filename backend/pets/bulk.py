@@ -0,0 +1,320 @@
+"""Importación y exportación masiva de mascotas en CSV / NDJSON.
+
+La importación procesa el archivo en lotes: valida cada lote con unas pocas
+consultas (no una por fila), inserta con bulk_create dentro de una
+transacción y procesa las fotos en paralelo (hilos que leen los archivos y
+los envían a pets.images.image_pool con prioridad baja). La
+exportación recorre el catálogo con iterator() y genera el archivo fila a
+fila, sin cargarlo entero en memoria.
+
+Las mascotas importadas entran disponibles: una fila con ``status='adopted'``
+se rechaza, porque una mascota solo pasa a adoptada al aprobarse una solicitud
+(pets/adoption.py).
+"""
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Max, Prefetch
+
+from shelters.models import Shelter
+from .models import Pet, PetPhoto, age_in_months
+from .images import BULK, image_pool, normalize_bytes_with_hash
+from .changes import record_pet_changes
+from .counters import recount_pets, recount_shelters
+from .search import index_later
+
+FORMATS = ('csv', 'ndjson')
+FIELDS = ['id', 'name', 'pet_type', 'breed', 'age', 'age_unit', 'size', 'description', 'shelter', 'owner', 'status', 'photos']
+PHOTO_SEPARATOR = ';'
+
+PET_TYPES = {value for value, _ in Pet.TYPE_CHOICES}
+AGE_UNITS = {value for value, _ in Pet.AGE_UNIT_CHOICES}
+STATUSES = {value for value, _ in Pet.STATUS_CHOICES}
+
+
+def read_rows(lines, fmt):
+    """Genera (número de fila, dict, error) a partir de un iterable de líneas de texto."""
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=2):
+            photos = row.get('photos') or ''
+            row['photos'] = [path.strip() for path in photos.split(PHOTO_SEPARATOR) if path.strip()]
+            yield number, row, None
+    elif fmt == 'ndjson':
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, None, f"JSON inválido: {exc}"
+                continue
+            if not isinstance(row, dict):
+                yield number, None, "Cada línea debe ser un objeto JSON."
+                continue
+            yield number, row, None
+    else:
+        raise ValueError(f"Formato no soportado: {fmt}. Usa uno de {', '.join(FORMATS)}.")
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _optional_int(value):
+    if value in (None, ''):
+        return None
+    return int(value)
+
+
+def _text(row, field):
+    """Valor de texto de `field`; ValueError si no cabe en la columna (no se recorta en silencio)."""
+    value = row.get(field) or ''
+    if not isinstance(value, str):
+        raise ValueError(f"{field} debe ser texto.")
+    max_length = Pet._meta.get_field(field).max_length
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{field} admite como mucho {max_length} caracteres (tiene {len(value)}).")
+    return value
+
+
+def _build_pet(row):
+    """Construye un Pet sin guardar a partir de una fila; lanza ValueError si algún campo es inválido."""
+    name = _text(row, 'name').strip()
+    if not name:
+        raise ValueError("El nombre es requerido.")
+    pet_type = row.get('pet_type')
+    if pet_type not in PET_TYPES:
+        raise ValueError(f"Tipo de mascota inválido: {pet_type!r}.")
+    age_unit = row.get('age_unit') or 'years'
+    if age_unit not in AGE_UNITS:
+        raise ValueError(f"Unidad de edad inválida: {age_unit!r}.")
+    status = row.get('status') or 'available'
+    if status not in STATUSES:
+        raise ValueError(f"Estado inválido: {status!r}.")
+    if status != 'available':
+        raise ValueError(f"Estado {status!r} no permitido: una mascota nueva entra disponible.")
+    try:
+        age = _optional_int(row.get('age'))
+        shelter_id = _optional_int(row.get('shelter'))
+        owner_id = _optional_int(row.get('owner'))
+    except (TypeError, ValueError):
+        raise ValueError("age, shelter y owner deben ser números enteros.")
+    return Pet(
+        name=name,
+        pet_type=pet_type,
+        breed=_text(row, 'breed'),
+        age=age,
+        age_unit=age_unit,
+        # Se calcula aquí porque ni bulk_create() ni _insert_one() pasan por Pet.save()
+        age_in_months=age_in_months(age, age_unit),
+        size=_text(row, 'size'),
+        description=_text(row, 'description'),
+        shelter_id=shelter_id,
+        owner_id=owner_id,
+        status=status,
+    )
+
+
+def validate_batch(batch):
+    """Valida un lote completo con una consulta por tabla relacionada.
+
+    Devuelve (válidas, errores) donde válidas es una lista de (número, Pet, fotos).
+    Aplica el mismo invariante que Pet.clean: exactamente uno de owner o shelter.
+    """
+    parsed, errors = [], []
+    for number, row, error in batch:
+        if error:
+            errors.append({'row': number, 'error': error})
+            continue
+        try:
+            pet = _build_pet(row)
+        except ValueError as exc:
+            errors.append({'row': number, 'error': str(exc)})
+            continue
+        photos = row.get('photos') or []
+        if isinstance(photos, str):
+            photos = [path for path in photos.split(PHOTO_SEPARATOR) if path]
+        parsed.append((number, pet, photos))
+
+    shelter_ids = {pet.shelter_id for _, pet, _ in parsed if pet.shelter_id}
+    owner_ids = {pet.owner_id for _, pet, _ in parsed if pet.owner_id}
+    existing_shelters = set(Shelter.objects.filter(pk__in=shelter_ids).values_list('pk', flat=True))
+    existing_owners = set(get_user_model().objects.filter(pk__in=owner_ids).values_list('pk', flat=True))
+
+    valid = []
+    for number, pet, photos in parsed:
+        if not pet.owner_id and not pet.shelter_id:
+            errors.append({'row': number, 'error': "La mascota debe tener un dueño (cliente) o un refugio asociado."})
+        elif pet.owner_id and pet.shelter_id:
+            errors.append({'row': number, 'error': "Una mascota no puede tener tanto un dueño (cliente) como un refugio al mismo tiempo. Debe ser uno u otro."})
+        elif pet.shelter_id and pet.shelter_id not in existing_shelters:
+            errors.append({'row': number, 'error': f"El refugio {pet.shelter_id} no existe."})
+        elif pet.owner_id and pet.owner_id not in existing_owners:
+            errors.append({'row': number, 'error': f"El usuario {pet.owner_id} no existe."})
+        else:
+            valid.append((number, pet, photos))
+    return valid, errors
+
+
+def resolve_photo_path(path, photo_root):
+    """Ruta absoluta de una foto a importar, siempre dentro de photo_root."""
+    root = os.path.realpath(photo_root)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root:
+        raise ValueError(f"La foto {path!r} está fuera del directorio permitido.")
+    return full_path
+
+
+def _load_photo(path, photo_root):
+    full_path = resolve_photo_path(path, photo_root)
+    with open(full_path, 'rb') as fh:
+        data = fh.read()
+    # Prioridad baja y espera sin límite: la importación cede el pool a las subidas interactivas
+    return image_pool.process(normalize_bytes_with_hash, data, BULK, block=True)
+
+
+def _process_photos(valid, pool, photo_root):
+    """Procesa en paralelo las fotos del lote; las filas con alguna foto inválida se descartan."""
+    futures = [
+        (number, pet, [(path, pool.submit(_load_photo, path, photo_root)) for path in photos])
+        for number, pet, photos in valid
+    ]
+    ready, errors = [], []
+    for number, pet, photo_futures in futures:
+        images = []
+        for path, future in photo_futures:
+            try:
+                images.append((path, future.result()))
+            except Exception as exc:
+                errors.append({'row': number, 'error': f"No se pudo procesar la foto {path!r}: {exc}"})
+                images = None
+                break
+        if images is not None:
+            ready.append((pet, images))
+    return ready, errors
+
+
+def _insert_one(pet):
+    """INSERT de `pet` que rellena su id, sin Pet.save() ni señales (como bulk_create)."""
+    using = Pet.objects.db
+    pet._save_table(cls=Pet, force_insert=True, using=using)
+    pet._state.adding = False
+    pet._state.db = using
+
+
+def _insert_batch(ready):
+    pets = [pet for pet, _ in ready]
+    connection = connections[Pet.objects.db]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Pet.objects.bulk_create(pets)
+        record_pet_changes([pet.pk for pet in pets])
+        index_later('pet', [pet.pk for pet in pets], created=True)
+    else:
+        # Las insertadas sin id se localizan por encima del mayor id previo (algún
+        # cambio de más de otra importación concurrente no hace daño al feed).
+        last_pk = Pet.objects.aggregate(last=Max('pk'))['last'] or 0
+        # Sin RETURNING (MySQL) las mascotas con fotos necesitan su id: se insertan una a
+        # una, también sin señales, para que los cambios y contadores se apunten una sola vez.
+        Pet.objects.bulk_create([pet for pet, images in ready if not images])
+        for pet, images in ready:
+            if images:
+                _insert_one(pet)
+        new_pks = Pet.objects.filter(pk__gt=last_pk).values_list('pk', flat=True)
+        new_pks = {pet.pk for pet in pets if pet.pk} | set(new_pks)
+        record_pet_changes(new_pks)
+        index_later('pet', new_pks)
+
+    photos = []
+    for pet, images in ready:
+        for index, (path, (data, value)) in enumerate(images):
+            photo = PetPhoto(pet=pet, is_primary=(index == 0), order=index)
+            photo.set_phash(value)  # Los duplicados se marcan después con hash_photos --flag
+            photo.photo.save(os.path.basename(path), ContentFile(data), save=False)
+            photos.append(photo)
+    PetPhoto.objects.bulk_create(photos)
+
+    # bulk_create no envía señales: los contadores se recalculan para las filas afectadas.
+    shelter_ids = {pet.shelter_id for pet in pets if pet.shelter_id}
+    if shelter_ids:
+        recount_shelters(Shelter.objects.filter(pk__in=shelter_ids))
+    photo_pet_ids = [pet.pk for pet, images in ready if images]
+    if photo_pet_ids:
+        recount_pets(Pet.objects.filter(pk__in=photo_pet_ids))
+
+
+def import_pets(lines, fmt, batch_size=None, workers=None, photo_root=None):
+    """Importa mascotas desde un iterable de líneas. Devuelve {'created': n, 'errors': [...]}."""
+    batch_size = batch_size or settings.PET_IMPORT_BATCH_SIZE
+    workers = workers or settings.PET_IMPORT_WORKERS
+    photo_root = photo_root or settings.PET_IMPORT_PHOTO_ROOT
+    created, errors = 0, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in _chunks(read_rows(lines, fmt), batch_size):
+            valid, batch_errors = validate_batch(batch)
+            ready, photo_errors = _process_photos(valid, pool, photo_root)
+            errors.extend(batch_errors)
+            errors.extend(photo_errors)
+            if ready:
+                with transaction.atomic():
+                    _insert_batch(ready)
+                created += len(ready)
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'errors': errors}
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """Genera un dict por mascota recorriendo la base de datos en bloques."""
+    if queryset is None:
+        queryset = Pet.objects.all()
+    queryset = queryset.order_by('pk').prefetch_related(
+        Prefetch('photos', queryset=PetPhoto.objects.only('id', 'pet_id', 'photo').order_by('order', 'id'))
+    )
+    for pet in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': pet.pk,
+            'name': pet.name,
+            'pet_type': pet.pet_type,
+            'breed': pet.breed,
+            'age': pet.age,
+            'age_unit': pet.age_unit,
+            'size': pet.size,
+            'description': pet.description,
+            'shelter': pet.shelter_id,
+            'owner': pet.owner_id,
+            'status': pet.status,
+            'photos': [photo.photo.name for photo in pet.photos.all()],
+        }
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla."""
+    def write(self, value):
+        return value
+
+
+def render_rows(rows, fmt):
+    """Serializa las filas de export_rows() como fragmentos de texto CSV o NDJSON."""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            row = dict(row, photos=PHOTO_SEPARATOR.join(row['photos']))
+            yield writer.writerow(['' if row[field] is None else row[field] for field in FIELDS])
+    elif fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+    else:
+        raise ValueError(f"Formato no soportado: {fmt}. Usa uno de {', '.join(FORMATS)}.")
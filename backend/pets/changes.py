@@ -0,0 +1,106 @@
+"""Registro de cambios de mascotas para la sincronización incremental.
+
+Cada escritura que cambia la representación de una mascota (la propia fila,
+sus fotos o sus contadores) añade una fila a ``PetChange``; el borrado añade
+una lápida. El cliente guarda el cursor de la última respuesta y en la
+siguiente pide solo lo posterior, en lugar de volver a descargar el catálogo.
+
+Las filas se insertan con ``transaction.on_commit``: no quedan cambios de
+transacciones revertidas y los ids se asignan casi en orden de commit, así que
+un cliente no salta cambios que aún no eran visibles cuando leyó.
+
+``compact()`` (comando ``compact_pet_changes``) deja una sola fila por mascota
+sin perder nada para ningún cursor y borra las lápidas más antiguas que
+``PET_CHANGES_RETENTION``. El cursor lleva la fecha del último cambio leído:
+si es anterior a la retención, el cliente pudo perder lápidas y debe empezar
+de cero (``reset``).
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import PetChange
+
+
+def record_pet_changes(pet_ids, deleted=False):
+    """Apunta un cambio (o lápida) para cada mascota al confirmar la transacción."""
+    pet_ids = [pet_id for pet_id in pet_ids if pet_id is not None]
+    if pet_ids:
+        transaction.on_commit(
+            lambda: PetChange.objects.bulk_create([PetChange(pet_id=pet_id, deleted=deleted) for pet_id in pet_ids])
+        )
+
+
+def parse_cursor(value):
+    """'<id>.<timestamp>' -> (id, timestamp); None o '' es el principio del registro."""
+    if not value:
+        return 0, None
+    change_id, _, timestamp = value.partition('.')
+    return int(change_id), int(timestamp)
+
+
+def make_cursor(change_id, timestamp):
+    return f'{change_id}.{int(timestamp)}'
+
+
+def read_changes(cursor, limit):
+    """Cambios posteriores a `cursor`, el último por mascota.
+
+    Devuelve ``(changes, next_cursor, more, reset)`` con ``changes`` como
+    ``{pet_id: deleted}`` en orden de cambio.
+    """
+    last_id, timestamp = parse_cursor(cursor)
+    reset = timestamp is not None and timestamp < time.time() - settings.PET_CHANGES_RETENTION
+    if reset:
+        last_id = 0
+    rows = list(
+        PetChange.objects.filter(id__gt=last_id).order_by('id')
+        .values_list('id', 'pet_id', 'deleted', 'created_at')[:limit]
+    )
+    changes = {}
+    for _, pet_id, deleted, _ in rows:
+        changes.pop(pet_id, None)
+        changes[pet_id] = deleted
+    more = len(rows) == limit
+    if rows:
+        # Página incompleta: al día hasta ahora; si no, hasta el último cambio devuelto
+        next_cursor = make_cursor(rows[-1][0], rows[-1][3].timestamp() if more else time.time())
+    else:
+        next_cursor = make_cursor(last_id, time.time())
+    return changes, next_cursor, more, reset
+
+
+def compact(batch_size=10000):
+    """Borra los cambios superados por otro posterior de la misma mascota y las lápidas caducadas.
+
+    Devuelve ``(superados, lápidas)``. Recorre la tabla por rangos de id con
+    DELETE cortos para no bloquearla.
+    """
+    latest = dict(PetChange.objects.order_by().values('pet_id').annotate(last=Max('id')).values_list('pet_id', 'last'))
+    horizon = max(latest.values(), default=0)
+    superseded, last_id = 0, 0
+    while last_id < horizon:
+        rows = list(
+            PetChange.objects.filter(id__gt=last_id, id__lte=horizon).order_by('id')
+            .values_list('id', 'pet_id')[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        stale = [change_id for change_id, pet_id in rows if change_id < latest.get(pet_id, change_id)]
+        if stale:
+            superseded += PetChange.objects.filter(pk__in=stale).delete()[0]
+
+    cutoff = timezone.now() - timedelta(seconds=settings.PET_CHANGES_RETENTION)
+    expired = PetChange.objects.filter(deleted=True, created_at__lt=cutoff)
+    tombstones = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        tombstones += PetChange.objects.filter(pk__in=pks).delete()[0]
+    return superseded, tombstones
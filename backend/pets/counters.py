@@ -0,0 +1,65 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from shelters.models import Shelter
+from .models import Pet, PetPhoto, AdoptionRequest
+from .changes import record_pet_changes
+
+
+def _count_subquery(queryset, field):
+    """Subconsulta correlacionada que cuenta filas de `queryset` agrupadas por `field`."""
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def adjust_pet_counters(pet_id, **deltas):
+    """Suma/resta atómicamente a los contadores de una mascota (photo_count=1, ...)."""
+    if pet_id is None:
+        return
+    updates = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    if updates:
+        Pet.objects.filter(pk=pet_id).update(**updates)
+        record_pet_changes([pet_id])
+
+
+def touch_pets(*pet_ids):
+    """Avanza updated_at de las mascotas (cambio en un hijo que no mueve ningún contador)."""
+    pet_ids = [pet_id for pet_id in pet_ids if pet_id is not None]
+    if pet_ids:
+        Pet.objects.filter(pk__in=pet_ids).update()
+        record_pet_changes(pet_ids)
+
+
+def adjust_shelter_counters(shelter_id, **deltas):
+    """Suma/resta atómicamente a los contadores de un refugio (pet_count=1, ...)."""
+    if shelter_id is None:
+        return
+    updates = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    if updates:
+        Shelter.objects.filter(pk=shelter_id).update(**updates)
+
+
+def recount_pets(queryset=None):
+    """Recalcula photo_count y pending_request_count con un único UPDATE."""
+    if queryset is None:
+        queryset = Pet.objects.all()
+    return queryset.order_by().update(
+        photo_count=_count_subquery(PetPhoto.objects.all(), 'pet'),
+        pending_request_count=_count_subquery(AdoptionRequest.objects.filter(status='pending'), 'pet'),
+    )
+
+
+def recount_shelters(queryset=None):
+    """Recalcula pet_count y available_pet_count con un único UPDATE."""
+    if queryset is None:
+        queryset = Shelter.objects.all()
+    return queryset.order_by().update(
+        pet_count=_count_subquery(Pet.objects.all(), 'shelter'),
+        available_pet_count=_count_subquery(Pet.objects.filter(status='available'), 'shelter'),
+    )
@@ -0,0 +1,256 @@
+"""Normalización de imágenes y pool de procesos para hacerla fuera del worker web.
+
+``normalize_upload()`` (usado por ``PetPhoto.save`` y ``Shelter.save``) envía
+la conversión a ``image_pool``: un ``ProcessPoolExecutor`` de
+``IMAGE_WORKERS`` procesos alimentado desde una cola con prioridad. Solo hay
+tantas tareas en los procesos como workers; el resto espera en la cola,
+ordenado por prioridad (subidas interactivas antes que importaciones masivas)
+y, dentro de cada prioridad, las imágenes más pequeñas primero.
+
+Cada proceso web tiene su propio pool, así que ``IMAGE_WORKERS`` vale por
+defecto los núcleos del host entre ``WEB_CONCURRENCY`` (los workers de
+gunicorn/uvicorn): en total, tantos procesos de imágenes como núcleos y no
+workers × núcleos compitiendo con los propios workers web.
+
+La cola admite como máximo ``IMAGE_QUEUE_SIZE`` tareas. Si está llena y no se
+libera un hueco en ``IMAGE_QUEUE_WAIT`` segundos, o si la tarea tarda más de
+``IMAGE_TASK_TIMEOUT``, se lanza ``ImagePoolBusy`` (503 con Retry-After en la
+API): una ráfaga de subidas se rechaza en lugar de acaparar la CPU que
+necesitan las lecturas. ``IMAGE_WORKERS=0`` procesa en el propio hilo.
+
+Una tarea que supera el timeout sigue ejecutándose en su proceso hasta acabar
+(``ProcessPoolExecutor`` no puede interrumpirla) y ocupa su worker mientras
+tanto. ``image_pool.stats()`` da la profundidad de la cola y las latencias.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from io import BytesIO
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from rest_framework.exceptions import APIException
+
+MAX_WIDTH = 1200
+JPEG_QUALITY = 85
+
+# Prioridades de la cola (menor = antes)
+INTERACTIVE = 0
+BULK = 1
+
+logger = logging.getLogger('teadopto.images')
+
+
+def _normalized(source):
+    """Imagen RGB de como máximo MAX_WIDTH px de ancho."""
+    img = Image.open(source)
+
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if img.width > MAX_WIDTH:
+        ratio = MAX_WIDTH / img.width
+        new_height = int(img.height * ratio)
+        img = img.resize((MAX_WIDTH, new_height), Image.Resampling.LANCZOS)
+    return img
+
+
+def _jpeg(img):
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def normalize_image(source):
+    """Convierte una imagen a JPEG RGB de como máximo MAX_WIDTH px de ancho y devuelve los bytes."""
+    return _jpeg(_normalized(source))
+
+
+def dhash(img):
+    """Hash perceptual por diferencias (dHash) de 64 bits.
+
+    Reduce la imagen a 9x8 en gris y pone un bit por cada píxel más claro que su
+    vecino de la derecha: cambios de tamaño, recompresión o ligeros retoques
+    apenas mueven unos pocos bits (distancia de Hamming pequeña).
+    """
+    pixels = list(img.convert('L').resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def normalize_bytes(data):
+    """normalize_image() sobre bytes: lo que se envía a los procesos del pool."""
+    return normalize_image(BytesIO(data))
+
+
+def normalize_bytes_with_hash(data):
+    """Como normalize_bytes() pero devuelve también el dHash de la imagen normalizada."""
+    img = _normalized(BytesIO(data))
+    return _jpeg(img), dhash(img)
+
+
+def hash_bytes(data):
+    """dHash de una imagen ya guardada (fotos anteriores a los hashes)."""
+    return dhash(Image.open(BytesIO(data)))
+
+
+def as_uploaded_jpeg(data, name):
+    """Envuelve los bytes de normalize_image() para asignarlos a un ImageField."""
+    output = BytesIO(data)
+    return InMemoryUploadedFile(
+        output, 'ImageField',
+        f"{os.path.splitext(name)[0]}.jpg",
+        'image/jpeg', sys.getsizeof(output), None
+    )
+
+
+class ImagePoolBusy(APIException):
+    status_code = 503
+    default_detail = "El servidor está procesando demasiadas imágenes. Inténtalo de nuevo en unos segundos."
+    default_code = 'image_pool_busy'
+
+    def __init__(self, detail=None, wait=None):
+        super().__init__(detail)
+        self.wait = wait  # DRF lo devuelve como Retry-After
+
+
+class ImagePool:
+    """Pool de procesos con cola acotada y prioridades para el trabajo con imágenes."""
+
+    def __init__(self, workers=None, queue_size=None, queue_wait=None, task_timeout=None):
+        self._options = (workers, queue_size, queue_wait, task_timeout)
+        self._lock = threading.Lock()
+        self._started = False
+        self._sequence = itertools.count()
+        self._queue = queue.PriorityQueue()
+        self.reset_stats()
+
+    def _configure(self):
+        workers, queue_size, queue_wait, task_timeout = self._options
+        self.workers = settings.IMAGE_WORKERS if workers is None else workers
+        self.queue_size = settings.IMAGE_QUEUE_SIZE if queue_size is None else queue_size
+        self.queue_wait = settings.IMAGE_QUEUE_WAIT if queue_wait is None else queue_wait
+        self.task_timeout = settings.IMAGE_TASK_TIMEOUT if task_timeout is None else task_timeout
+
+    def _make_executor(self):
+        # spawn: los procesos no heredan hilos ni conexiones abiertas del worker web
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._configure()
+            self._slots = threading.BoundedSemaphore(self.queue_size) if self.queue_size else None
+            if self.workers:
+                self._executor = self._make_executor()
+                for number in range(self.workers):
+                    threading.Thread(target=self._dispatch, name=f'image-pool-{number}', daemon=True).start()
+            self._started = True
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = dict.fromkeys(
+                ('submitted', 'completed', 'failed', 'rejected', 'timed_out', 'running', 'wait_ms', 'run_ms', 'max_latency_ms'), 0,
+            )
+
+    def stats(self):
+        """Contadores y latencias medias/máximas (en ms) desde el arranque o el último reset_stats()."""
+        with self._lock:
+            stats = dict(self._stats)
+        finished = stats['completed'] + stats['failed'] or 1
+        stats['queued'] = self._queue.qsize()
+        stats['avg_wait_ms'] = stats.pop('wait_ms') / finished
+        stats['avg_run_ms'] = stats.pop('run_ms') / finished
+        return stats
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def _dispatch(self):
+        while True:
+            _, _, _, func, data, future, queued_at = self._queue.get()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue  # El solicitante ya se rindió por timeout
+                started = time.monotonic()
+                self._count(running=1)
+                try:
+                    future.set_result(self._executor.submit(func, data).result())
+                    self._count(completed=1)
+                except Exception as exc:
+                    future.set_exception(exc)
+                    self._count(failed=1)
+                finished = time.monotonic()
+                with self._lock:
+                    self._stats['running'] -= 1
+                    self._stats['wait_ms'] += (started - queued_at) * 1000
+                    self._stats['run_ms'] += (finished - started) * 1000
+                    self._stats['max_latency_ms'] = max(self._stats['max_latency_ms'], (finished - queued_at) * 1000)
+            finally:
+                if self._slots:
+                    self._slots.release()
+
+    def submit(self, func, data, priority=INTERACTIVE, block=False):
+        """Encola func(data) y devuelve un Future; ImagePoolBusy si la cola sigue llena tras queue_wait.
+
+        Con ``block=True`` espera el hueco sin límite (importaciones masivas).
+        """
+        self._start()
+        future = Future()
+        if not self.workers:
+            future.set_result(func(data))
+            return future
+        if self._slots and not self._slots.acquire(timeout=None if block else self.queue_wait):
+            self._count(rejected=1)
+            logger.warning("Cola de imágenes llena (%s tareas): se rechaza la subida", self.queue_size)
+            raise ImagePoolBusy(wait=max(1, round(self.queue_wait)))
+        self._count(submitted=1)
+        self._queue.put((priority, len(data), next(self._sequence), func, data, future, time.monotonic()))
+        return future
+
+    def process(self, func, data, priority=INTERACTIVE, block=False):
+        """submit() y espera el resultado como mucho task_timeout segundos."""
+        future = self.submit(func, data, priority, block)
+        try:
+            return future.result(timeout=self.task_timeout or None)
+        except TimeoutError:
+            future.cancel()
+            self._count(timed_out=1)
+            logger.warning("Procesado de imagen cancelado tras %ss", self.task_timeout)
+            raise ImagePoolBusy(wait=max(1, round(self.task_timeout)))
+
+
+image_pool = ImagePool()
+
+
+def normalize_upload(file, priority=INTERACTIVE):
+    """Normaliza en el pool una imagen subida y la devuelve lista para asignar al ImageField."""
+    file.seek(0)
+    data = image_pool.process(normalize_bytes, file.read(), priority)
+    return as_uploaded_jpeg(data, file.name)
+
+
+def normalize_upload_with_hash(file, priority=INTERACTIVE):
+    """normalize_upload() que devuelve también el dHash: ``(archivo, hash)``."""
+    file.seek(0)
+    data, value = image_pool.process(normalize_bytes_with_hash, file.read(), priority)
+    return as_uploaded_jpeg(data, file.name), value
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from pets.changes import compact
+
+
+class Command(BaseCommand):
+    help = "Compacta el registro de cambios de mascotas: una fila por mascota y sin lápidas más antiguas que PET_CHANGES_RETENTION"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000, help="Filas por DELETE")
+
+    def handle(self, *args, **options):
+        superseded, tombstones = compact(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{superseded} cambio(s) superado(s) y {tombstones} lápida(s) caducada(s) borrados."
+        ))
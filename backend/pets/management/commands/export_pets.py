@@ -0,0 +1,22 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from pets.bulk import FORMATS, export_rows, render_rows
+
+
+class Command(BaseCommand):
+    help = "Exporta el catálogo de mascotas en CSV o NDJSON sin cargarlo entero en memoria"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument("--output", "-o", default="-", help="Archivo de salida o '-' para stdout")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunks = render_rows(export_rows(chunk_size=options["chunk_size"]), options["format"])
+        if options["output"] == "-":
+            sys.stdout.writelines(chunks)
+        else:
+            with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+                fh.writelines(chunks)
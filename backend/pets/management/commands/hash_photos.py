@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pets.images import BULK, hash_bytes, image_pool
+from pets.models import PHASH_BANDS, PetPhoto
+
+
+def _hash_photo(photo):
+    try:
+        with photo.photo.open('rb') as fh:
+            data = fh.read()
+        return image_pool.process(hash_bytes, data, BULK, block=True)
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = "Calcula el hash perceptual de las fotos que no lo tienen y, con --flag, marca los casi-duplicados"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Fotos por lote")
+        parser.add_argument(
+            "--flag", action="store_true",
+            help="Marca cada foto sin duplicate_of como duplicado de la foto más antigua parecida",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        hashed, missing = self._hash_missing(batch_size)
+        self.stdout.write(f"{hashed} foto(s) con hash nuevo, {missing} sin archivo legible.")
+        if options["flag"]:
+            flagged = self._flag_duplicates(batch_size)
+            self.stdout.write(f"{flagged} foto(s) marcada(s) como duplicado.")
+        self.stdout.write(self.style.SUCCESS("Hashes de fotos actualizados."))
+
+    def _hash_missing(self, batch_size):
+        hashed = missing = last_pk = 0
+        fields = ['phash'] + [f'phash_band{band}' for band in range(PHASH_BANDS)]
+        with ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS or 1) as pool:
+            while True:
+                photos = list(PetPhoto.objects.filter(pk__gt=last_pk, phash__isnull=True).order_by('pk').only('id', 'photo')[:batch_size])
+                if not photos:
+                    return hashed, missing
+                last_pk = photos[-1].pk
+                done = []
+                for photo, value in zip(photos, pool.map(_hash_photo, photos)):
+                    if value is None:
+                        missing += 1
+                    else:
+                        photo.set_phash(value)
+                        done.append(photo)
+                PetPhoto.objects.bulk_update(done, fields)
+                hashed += len(done)
+
+    def _flag_duplicates(self, batch_size):
+        flagged = last_pk = 0
+        pending = PetPhoto.objects.filter(phash__isnull=False, duplicate_of__isnull=True).order_by('pk')
+        while True:
+            photos = list(pending.filter(pk__gt=last_pk).only('id', 'phash')[:batch_size])
+            if not photos:
+                return flagged
+            last_pk = photos[-1].pk
+            for photo in photos:
+                duplicates = PetPhoto.objects.filter(pk__lt=photo.pk).near_duplicates(photo.phash_value)
+                if duplicates:
+                    flagged += PetPhoto.objects.filter(pk=photo.pk).update(duplicate_of=min(duplicates, key=lambda d: d.pk))
@@ -0,0 +1,45 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pets.bulk import FORMATS, import_pets
+
+
+class Command(BaseCommand):
+    help = "Importa mascotas desde un archivo CSV o NDJSON (usa '-' para leer de stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Archivo a importar o '-' para stdin")
+        parser.add_argument("--format", choices=FORMATS, help="Por defecto se deduce de la extensión")
+        parser.add_argument("--batch-size", type=int, default=settings.PET_IMPORT_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=settings.PET_IMPORT_WORKERS,
+                            help="Hilos para procesar fotos")
+        parser.add_argument("--photo-root", default=str(settings.PET_IMPORT_PHOTO_ROOT),
+                            help="Directorio base de las rutas de fotos")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+        if path == "-":
+            result = self._import(sys.stdin, fmt, options)
+        else:
+            try:
+                with open(path, encoding="utf-8-sig", newline="") as fh:
+                    result = self._import(fh, fmt, options)
+            except OSError as exc:
+                raise CommandError(f"No se pudo abrir {path}: {exc}")
+
+        for error in result["errors"]:
+            self.stderr.write(f"Fila {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} mascota(s) importada(s), {len(result['errors'])} fila(s) con errores."
+        ))
+
+    def _import(self, lines, fmt, options):
+        return import_pets(
+            lines, fmt,
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            photo_root=options["photo_root"],
+        )
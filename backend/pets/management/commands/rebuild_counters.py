@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from shelters.models import Shelter
+from pets.models import Pet
+from pets.counters import recount_pets, recount_shelters
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores desnormalizados de mascotas y refugios"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=10000,
+            help="Filas por UPDATE (rangos de clave primaria)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pets = self._in_batches(Pet.objects.all(), recount_pets, batch_size)
+        self.stdout.write(f"{pets} mascota(s) recalculada(s).")
+        shelters = self._in_batches(Shelter.objects.all(), recount_shelters, batch_size)
+        self.stdout.write(self.style.SUCCESS(f"{shelters} refugio(s) recalculado(s)."))
+
+    def _in_batches(self, queryset, recount, batch_size):
+        bounds = queryset.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            return 0
+        total = 0
+        start = bounds["low"]
+        while start <= bounds["high"]:
+            end = start + batch_size
+            with transaction.atomic():
+                total += recount(queryset.filter(pk__gte=start, pk__lt=end))
+            start = end
+        return total
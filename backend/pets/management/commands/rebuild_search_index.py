@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pets.search import BATCH_SIZE, SEARCH_FIELDS, rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los tokens de búsqueda del admin (pets/search.py) por lotes de clave primaria"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kinds", nargs="*", help="pet y/o adoption (por defecto, ambos)")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Objetos por transacción")
+
+    def handle(self, *args, **options):
+        unknown = set(options["kinds"]) - set(SEARCH_FIELDS)
+        if unknown:
+            raise CommandError(f"Tipo desconocido: {', '.join(sorted(unknown))} (válidos: {', '.join(SEARCH_FIELDS)})")
+        for kind in options["kinds"] or SEARCH_FIELDS:
+            indexed = rebuild(kind, batch_size=options["batch_size"])
+            self.stdout.write(f"{kind}: {indexed} objeto(s) indexado(s).")
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda reconstruido."))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:10
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Pet = apps.get_model('pets', 'Pet')
+    PetPhoto = apps.get_model('pets', 'PetPhoto')
+    AdoptionRequest = apps.get_model('pets', 'AdoptionRequest')
+    Shelter = apps.get_model('shelters', 'Shelter')
+    Pet.objects.update(
+        photo_count=_count_subquery(PetPhoto.objects.all(), 'pet'),
+        pending_request_count=_count_subquery(AdoptionRequest.objects.filter(status='pending'), 'pet'),
+    )
+    Shelter.objects.update(
+        pet_count=_count_subquery(Pet.objects.all(), 'shelter'),
+        available_pet_count=_count_subquery(Pet.objects.filter(status='available'), 'shelter'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0007_pet_age_unit_alter_pet_age'),
+        ('shelters', '0004_shelter_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='pending_request_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
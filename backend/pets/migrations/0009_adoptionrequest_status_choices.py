@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0008_pet_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adoptionrequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('approved', 'Aprobada'), ('rejected', 'Rechazada'), ('completed', 'Completada')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def normalize_pet_status(apps, schema_editor):
+    """Mascotas con una solicitud aprobada/completada -> adopted; valores libres desconocidos -> available.
+
+    Las que ya estaban como ``adopted`` (marcadas a mano por el refugio) lo siguen estando.
+    """
+    Pet = apps.get_model('pets', 'Pet')
+    AdoptionRequest = apps.get_model('pets', 'AdoptionRequest')
+    Shelter = apps.get_model('shelters', 'Shelter')
+    adopted = Exists(AdoptionRequest.objects.filter(pet=OuterRef('pk'), status__in=['approved', 'completed']))
+    Pet.objects.filter(adopted).exclude(status='adopted').update(status='adopted')
+    Pet.objects.exclude(status__in=['available', 'adopted']).update(status='available')
+    available = (
+        Pet.objects.filter(shelter=OuterRef('pk'), status='available')
+        .order_by().values('shelter').annotate(total=Count('pk')).values('total')
+    )
+    Shelter.objects.update(available_pet_count=Coalesce(Subquery(available, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0009_adoptionrequest_status_choices'),
+        ('shelters', '0005_shelter_location'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pet',
+            name='status',
+            field=models.CharField(choices=[('available', 'Disponible'), ('adopted', 'Adoptada')], default='available', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='adoptionrequest',
+            index=models.Index(fields=['pet', 'status'], name='adoption_pet_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['shelter', 'status'], name='pet_shelter_status_idx'),
+        ),
+        migrations.RunPython(normalize_pet_status, migrations.RunPython.noop),
+    ]
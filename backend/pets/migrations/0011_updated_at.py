@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0010_pet_status_state_machine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adoptionrequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='petphoto',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+def seed_pet_changes(apps, schema_editor):
+    """Un cambio por mascota existente: el feed desde el cursor 0 es el catálogo completo."""
+    Pet = apps.get_model('pets', 'Pet')
+    PetChange = apps.get_model('pets', 'PetChange')
+    last_pk = 0
+    while True:
+        pks = list(Pet.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:5000])
+        if not pks:
+            break
+        PetChange.objects.bulk_create([PetChange(pet_id=pk) for pk in pks])
+        last_pk = pks[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('pet_id', models.IntegerField(db_index=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(seed_pet_changes, migrations.RunPython.noop),
+    ]
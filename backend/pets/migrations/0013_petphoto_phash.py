@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0012_pet_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='petphoto',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='pets.petphoto'),
+        ),
+        migrations.AddField(
+            model_name='petphoto',
+            name='phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='petphoto',
+            name='phash_band0',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='petphoto',
+            name='phash_band1',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='petphoto',
+            name='phash_band2',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='petphoto',
+            name='phash_band3',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='petphoto',
+            index=models.Index(fields=['phash_band0'], name='petphoto_phash_band0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='petphoto',
+            index=models.Index(fields=['phash_band1'], name='petphoto_phash_band1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='petphoto',
+            index=models.Index(fields=['phash_band2'], name='petphoto_phash_band2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='petphoto',
+            index=models.Index(fields=['phash_band3'], name='petphoto_phash_band3_idx'),
+        ),
+    ]
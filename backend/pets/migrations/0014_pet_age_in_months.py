@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:32
+
+from django.db import migrations, models
+from django.db.models import Case, F, Max, Min, When
+
+BATCH_SIZE = 10000
+
+
+def backfill_age_in_months(apps, schema_editor):
+    """Rellena age_in_months por rangos de clave primaria: UPDATE cortos, cada uno en su transacción."""
+    Pet = apps.get_model('pets', 'Pet')
+    bounds = Pet.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    months = Case(When(age_unit='months', then=F('age')), default=F('age') * 12)
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        Pet.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE, age__isnull=False).update(age_in_months=months)
+
+
+class Migration(migrations.Migration):
+    # Sin transacción global: cada lote se confirma por separado y no bloquea la tabla entera
+    atomic = False
+
+    dependencies = [
+        ('pets', '0013_petphoto_phash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='age_in_months',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_age_in_months, migrations.RunPython.noop),
+        # El índice se crea después del relleno: una sola construcción en lugar de mantenerlo en cada lote
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['age_in_months'], name='pet_age_in_months_idx'),
+        ),
+    ]
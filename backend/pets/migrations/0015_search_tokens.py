@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:05
+
+import re
+import unicodedata
+
+from django.db import migrations, models, transaction
+
+# Copia de pets/search.py tal como era al crear la tabla: la migración no debe
+# cambiar si más adelante cambian los campos indexados o la normalización
+# (para eso está ``manage.py rebuild_search_index``).
+SEARCH_FIELDS = {
+    'pet': ('Pet', ('name', 'breed', 'description', 'shelter__name', 'owner__username')),
+    'adoption': ('AdoptionRequest', ('user__username', 'user__email', 'pet__name', 'message')),
+}
+MAX_TOKEN_LENGTH = 32
+BATCH_SIZE = 1000
+
+_WORD = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    if not text:
+        return set()
+    decomposed = unicodedata.normalize('NFKD', text)
+    normalized = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return {word[:MAX_TOKEN_LENGTH] for word in _WORD.findall(normalized)}
+
+
+def build_search_index(apps, schema_editor):
+    """Tokens de las mascotas y solicitudes existentes, por lotes de clave primaria, cada uno en su transacción."""
+    SearchToken = apps.get_model('pets', 'SearchToken')
+    for kind, (model_name, fields) in SEARCH_FIELDS.items():
+        objects = apps.get_model('pets', model_name).objects.order_by('pk')
+        last_pk = 0
+        while True:
+            rows = list(objects.filter(pk__gt=last_pk).values_list('pk', *fields)[:BATCH_SIZE])
+            if not rows:
+                break
+            with transaction.atomic():
+                SearchToken.objects.bulk_create([
+                    SearchToken(kind=kind, object_id=pk, token=token)
+                    for pk, *values in rows
+                    for token in sorted(set().union(*(tokenize(value) for value in values)))
+                ], batch_size=BATCH_SIZE)
+            last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Sin transacción global: cada lote se confirma por separado (como 0014)
+    atomic = False
+
+    dependencies = [
+        ('pets', '0014_pet_age_in_months'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('pet', 'Mascota'), ('adoption', 'Solicitud de adopción')], max_length=10)),
+                ('object_id', models.IntegerField()),
+                ('token', models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+        # Los índices se crean después del relleno: una sola construcción en lugar de mantenerlos en cada lote
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['kind', 'object_id'], name='search_kind_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['kind', 'token', 'object_id'], name='search_kind_token_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0015_search_tokens'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='petchange',
+            name='pet_id',
+            field=models.BigIntegerField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0016_petchange_pet_id_bigint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchtoken',
+            name='object_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
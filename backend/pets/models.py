@@ -1,11 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 import os
 from django.utils.text import slugify
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
+from .images import normalize_upload_with_hash
+from config.timestamps import TimestampedQuerySet
 
 def pet_photo_upload_path(instance, filename):
     ext = 'jpg'
@@ -24,6 +22,22 @@ def shelter_photo_upload_path(instance, filename):
     filename = f"{slug_name}_{timestamp}.{ext}"
     return os.path.join('shelters', filename)
 
+def age_in_months(age, age_unit):
+    """Edad normalizada a meses (None si no se conoce)."""
+    if age is None:
+        return None
+    return age if age_unit == "months" else age * 12
+
+
+class PetQuerySet(TimestampedQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create no llama a save(): age_in_months se calcula aquí
+        objs = list(objs)
+        for obj in objs:
+            obj.age_in_months = age_in_months(obj.age, obj.age_unit)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Pet(models.Model):
     TYPE_CHOICES = (("dog","Perro"),("cat","Gato"))
 
@@ -36,12 +50,42 @@ class Pet(models.Model):
         ("years", "Años"),
     )
     age_unit = models.CharField(max_length=10, choices=AGE_UNIT_CHOICES, default="years", blank=True, help_text="Unidad de edad (meses o años)")
+    # age/age_unit en meses, mantenida por save() y bulk_create(); indexada para filtrar y ordenar por edad
+    age_in_months = models.IntegerField(null=True, blank=True, editable=False)
     size = models.CharField(max_length=50, blank=True)
     description = models.TextField(blank=True)
     shelter = models.ForeignKey("shelters.Shelter", on_delete=models.CASCADE, related_name="pets", null=True, blank=True)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="owned_pets", null=True, blank=True)
     photo = models.ImageField(upload_to=pet_photo_upload_path, null=True, blank=True)
-    status = models.CharField(max_length=20, default="available")
+    STATUS_CHOICES = (
+        ("available", "Disponible"),
+        ("adopted", "Adoptada"),
+    )
+    # Solo cambia por las transiciones de pets/adoption.py al aprobar/revertir una solicitud
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="available")
+    photo_count = models.PositiveIntegerField(default=0, editable=False)
+    pending_request_count = models.PositiveIntegerField(default=0, editable=False)
+    # Avanza también con QuerySet.update() y con cambios de fotos/solicitudes (pets/signals.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = PetQuerySet.as_manager()
+
+    # Contadores desnormalizados: solo se modifican con F() (ver pets/signals.py)
+    COUNTER_FIELDS = ('photo_count', 'pending_request_count')
+    # Solo lo escriben las transiciones de pets/adoption.py: save() no lo incluye en su UPDATE
+    STATE_FIELDS = ('status',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shelter', 'status'], name='pet_shelter_status_idx'),
+            models.Index(fields=['age_in_months'], name='pet_age_in_months_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -52,29 +96,106 @@ class Pet(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()  
-        super().save(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        if not {'age', 'age_unit'} & deferred:
+            self.age_in_months = age_in_months(self.age, self.age_unit)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and {'age', 'age_unit'} & set(update_fields):
+                kwargs['update_fields'] = {*update_fields, 'age_in_months'}
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS + self.STATE_FIELDS
+                and f.attname not in deferred
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.name} ({self.pet_type})"
     
     @property
     def primary_photo(self):
-        photos = self.photos.all().order_by('id')
-        if photos.exists():
-            return photos.first()
+        if self.photo_count == 0:
+            return self if self.photo else None
+        if 'photos' in getattr(self, '_prefetched_objects_cache', {}):
+            # Fotos ya cargadas con prefetch_related: sin consultas extra
+            photos = self.photos.all()
+            if photos:
+                return min(photos, key=lambda photo: photo.id)
+        else:
+            first_photo = self.photos.order_by('id').first()
+            if first_photo:
+                return first_photo
         if self.photo:
             return self
         return None
 
+PHASH_BANDS = 4
+PHASH_BAND_BITS = 16
+
+
+def phash_bands(value):
+    """Trozos de 16 bits del dHash: dos hashes a distancia <= 3 comparten al menos uno entero."""
+    mask = (1 << PHASH_BAND_BITS) - 1
+    return [(value >> (PHASH_BAND_BITS * band)) & mask for band in range(PHASH_BANDS)]
+
+
+def _signed64(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class PetPhotoQuerySet(TimestampedQuerySet):
+    def near_duplicates(self, value, distance=None):
+        """Fotos cuyo dHash está a distancia de Hamming <= `distance`, de la más parecida a la menos.
+
+        Busca candidatas por igualdad en cualquiera de las 4 bandas (un índice
+        por banda, unas decenas de filas aunque haya millones de fotos) y filtra
+        la distancia exacta en Python.
+        """
+        distance = settings.PHOTO_DUPLICATE_DISTANCE if distance is None else distance
+        condition = models.Q()
+        for band, band_value in enumerate(phash_bands(value)):
+            condition |= models.Q(**{f'phash_band{band}': band_value})
+        matches = []
+        for photo in self.filter(condition).only('id', 'pet_id', 'photo', 'phash'):
+            photo_distance = (photo.phash_value ^ value).bit_count()
+            if photo_distance <= distance:
+                matches.append((photo_distance, photo.pk, photo))
+        return [photo for _, _, photo in sorted(matches, key=lambda match: match[:2])]
+
+
 class PetPhoto(models.Model):
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name="photos")
     photo = models.ImageField(upload_to=pet_photo_upload_path)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     order = models.IntegerField(default=0)  # Para ordenar las fotos
+    # dHash de 64 bits (con signo para caber en BIGINT) y sus bandas para buscar casi-duplicados
+    phash = models.BigIntegerField(null=True, blank=True, editable=False)
+    phash_band0 = models.IntegerField(null=True, blank=True, editable=False)
+    phash_band1 = models.IntegerField(null=True, blank=True, editable=False)
+    phash_band2 = models.IntegerField(null=True, blank=True, editable=False)
+    phash_band3 = models.IntegerField(null=True, blank=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="duplicates",
+    )
+
+    objects = PetPhotoQuerySet.as_manager()
 
     class Meta:
         ordering = ['is_primary', 'order', 'id']
+        indexes = [
+            models.Index(fields=[f'phash_band{band}'], name=f'petphoto_phash_band{band}_idx')
+            for band in range(PHASH_BANDS)
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def save(self, *args, **kwargs):
         if self.photo:
@@ -85,34 +206,55 @@ class PetPhoto(models.Model):
                 photo_changed = True
             
             if photo_changed:
-                img = Image.open(self.photo)
-                
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                max_width = 1200
-                if img.width > max_width:
-                    ratio = max_width / img.width
-                    new_height = int(img.height * ratio)
-                    img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                
-                output = BytesIO()
-                img.save(output, format='JPEG', quality=85, optimize=True)
-                output.seek(0)
-                
-                self.photo = InMemoryUploadedFile(
-                    output, 'ImageField', 
-                    f"{os.path.splitext(self.photo.name)[0]}.jpg",
-                    'image/jpeg', sys.getsizeof(output), None
-                )
+                normalized, value = self._normalized or normalize_upload_with_hash(self.photo)
+                self._normalized = None
+                self.set_phash(value)
+                duplicates = PetPhoto.objects.exclude(pk=self.pk).near_duplicates(value)
+                shared = self._same_owner(duplicates)
+                if shared is not None:
+                    # Casi-duplicado de la misma mascota, dueño o refugio: se reutiliza su archivo
+                    self.duplicate_of = shared
+                    self.photo = shared.photo.name
+                else:
+                    # De otro dueño solo se marca: cada uno conserva (y puede borrar) su propio archivo
+                    self.duplicate_of = duplicates[0] if duplicates else None
+                    self.photo = normalized
         
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    _normalized = None
+
+    def _same_owner(self, duplicates):
+        """El más parecido de `duplicates` cuya mascota es esta o tiene el mismo dueño o refugio (o None)."""
+        if not duplicates:
+            return None
+        pet_ids = {photo.pet_id for photo in duplicates} | {self.pet_id}
+        owners = {pk: (owner_id, shelter_id) for pk, owner_id, shelter_id in
+                  Pet.objects.filter(pk__in=pet_ids).values_list('pk', 'owner_id', 'shelter_id')}
+        owner_id, shelter_id = owners[self.pet_id]
+        for photo in duplicates:
+            other_owner_id, other_shelter_id = owners[photo.pet_id]
+            if (photo.pet_id == self.pet_id or (owner_id and owner_id == other_owner_id)
+                    or (shelter_id and shelter_id == other_shelter_id)):
+                return photo
+        return None
+
+    def set_normalized(self, normalized):
+        """Asigna una imagen ya procesada con normalize_upload_with_hash(): save() no la vuelve a procesar."""
+        self.photo = normalized[0]
+        self._normalized = normalized
+
+    @property
+    def phash_value(self):
+        """dHash como entero sin signo (o None)."""
+        return None if self.phash is None else self.phash & ((1 << 64) - 1)
+
+    def set_phash(self, value):
+        self.phash = None if value is None else _signed64(value)
+        bands = phash_bands(value) if value is not None else [None] * PHASH_BANDS
+        for band, band_value in enumerate(bands):
+            setattr(self, f'phash_band{band}', band_value)
 
     def __str__(self):
         return f"Foto de {self.pet.name}"
@@ -123,10 +265,78 @@ class AdoptionRequest(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     message = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    status = models.CharField(max_length=20, default="pending")
+    STATUS_CHOICES = (
+        ("pending", "Pendiente"),
+        ("approved", "Aprobada"),
+        ("rejected", "Rechazada"),
+        ("completed", "Completada"),
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TimestampedQuerySet.as_manager()
 
     class Meta:
         unique_together = [['pet', 'user']]
+        indexes = [
+            # Rechazo masivo de las solicitudes pendientes de una mascota al aprobar otra
+            models.Index(fields=['pet', 'status'], name='adoption_pet_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Request {self.id} - {self.pet.name}"
+
+
+class PetChange(models.Model):
+    """Registro de cambios de mascotas para el feed incremental (GET /api/pets/changes/).
+
+    El id autoincremental es el cursor. ``pet_id`` (entero grande, como ``Pet.id``) no
+    es ForeignKey para que la lápida (``deleted=True``) sobreviva al borrado de la
+    mascota.
+    """
+    id = models.BigAutoField(primary_key=True)
+    pet_id = models.BigIntegerField(db_index=True)
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Cambio {self.id} - mascota {self.pet_id}{' (borrada)' if self.deleted else ''}"
+
+
+class SearchToken(models.Model):
+    """Palabra normalizada de un objeto buscable en el admin (pets/search.py).
+
+    ``object_id`` no es ForeignKey: una fila sirve para mascotas y solicitudes
+    (``kind``) y los tokens de un objeto borrado no estorban hasta la siguiente
+    reconstrucción.
+    """
+    KIND_CHOICES = (
+        ('pet', 'Mascota'),
+        ('adoption', 'Solicitud de adopción'),
+    )
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    token = models.CharField(max_length=32)
+
+    class Meta:
+        indexes = [
+            # Búsqueda por prefijo: rango sobre token dentro de un kind; con object_id el
+            # índice cubre la subconsulta y no hace falta leer las filas
+            models.Index(fields=['kind', 'token', 'object_id'], name='search_kind_token_idx'),
+            # Reindexar un objeto borra sus tokens
+            models.Index(fields=['kind', 'object_id'], name='search_kind_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.token}"
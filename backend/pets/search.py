@@ -0,0 +1,152 @@
+"""Búsqueda del admin de mascotas y solicitudes con un índice de tokens.
+
+``search_fields`` con ``description``, ``shelter__name`` u ``owner__username``
+se traduce en ``LIKE '%x%'`` sobre varias tablas unidas: ningún índice sirve y
+cada búsqueda recorre todas las filas. En su lugar cada objeto guarda en
+``SearchToken`` las palabras normalizadas (minúsculas, sin acentos) de los
+campos de ``SEARCH_FIELDS``, incluidos los de las tablas relacionadas. Cada
+término buscado es un prefijo de palabra: un rango ``token >= 'lab' AND token <
+'lac'`` sobre el índice ``(kind, token)``, igual en MySQL que en SQLite. Todos
+los términos deben aparecer (como en el admin de Django), pero a diferencia de
+``icontains`` no encuentra trozos del interior de una palabra.
+
+No se usa FULLTEXT de MySQL porque los campos buscados están en tres tablas
+(mascota, refugio y usuario) y un índice FULLTEXT no puede cubrir una unión.
+
+Un término que es un número (``123`` o ``#123``) es una búsqueda por id: se
+resuelve con la clave primaria sin tocar el índice.
+
+Los tokens se recalculan al confirmar la transacción en la que cambia alguno de
+los campos (pets/signals.py, también al renombrar el refugio o el usuario) y
+en la importación masiva. Lo que se escriba con ``QuerySet.update`` no se
+reindexa: ``python manage.py rebuild_search_index`` reconstruye el índice por
+lotes y elimina los tokens de objetos borrados (que mientras tanto no
+aparecen en los resultados, porque se filtra sobre la tabla real).
+"""
+import re
+import unicodedata
+
+from django.apps import apps
+from django.db import transaction
+
+# kind -> (modelo, campos indexados); también son los search_fields del admin
+SEARCH_FIELDS = {
+    'pet': ('pets.Pet', ('name', 'breed', 'description', 'shelter__name', 'owner__username')),
+    'adoption': ('pets.AdoptionRequest', ('user__username', 'user__email', 'pet__name', 'message')),
+}
+MAX_TOKEN_LENGTH = 32
+BATCH_SIZE = 1000
+
+_WORD = re.compile(r'[^\W_]+')
+_ID = re.compile(r'#?(\d+)')
+
+
+def normalize(text):
+    """Minúsculas y sin acentos: 'Pastor Alemán' -> 'pastor aleman'."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text):
+    """Palabras distintas de `text`, normalizadas y recortadas a MAX_TOKEN_LENGTH."""
+    if not text:
+        return set()
+    return {word[:MAX_TOKEN_LENGTH] for word in _WORD.findall(normalize(text))}
+
+
+def _prefix_range(prefix):
+    """Cota superior exclusiva de las cadenas que empiezan por `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _model(kind):
+    return apps.get_model(SEARCH_FIELDS[kind][0])
+
+
+def _tokens(kind, rows, SearchToken):
+    """SearchToken de cada fila (pk, *campos) de values_list."""
+    return [
+        SearchToken(kind=kind, object_id=pk, token=token)
+        for pk, *values in rows
+        for token in sorted(set().union(*(tokenize(value) for value in values)))
+    ]
+
+
+def index_objects(kind, ids, created=False):
+    """Recalcula los tokens de los objetos `ids` de `kind` (``created``: no había tokens que borrar).
+
+    Se ejecuta al confirmar la petición que cambió los objetos y cuenta para su
+    presupuesto de consultas: un objeto nuevo cuesta una lectura y un INSERT,
+    sin transacción propia; uno cambiado, además el DELETE de sus tokens
+    anteriores en la misma transacción que el INSERT.
+    """
+    SearchToken = apps.get_model('pets', 'SearchToken')
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        rows = _model(kind).objects.filter(pk__in=batch).values_list('pk', *SEARCH_FIELDS[kind][1])
+        if created:
+            SearchToken.objects.bulk_create(_tokens(kind, rows, SearchToken), batch_size=BATCH_SIZE)
+            continue
+        rows = list(rows)
+        with transaction.atomic():
+            SearchToken.objects.filter(kind=kind, object_id__in=batch).delete()
+            SearchToken.objects.bulk_create(_tokens(kind, rows, SearchToken), batch_size=BATCH_SIZE)
+
+
+def index_later(kind, ids=None, queryset=None, created=False):
+    """index_objects() al confirmar la transacción; con `queryset` los ids se leen en ese momento."""
+    ids = [pk for pk in ids or () if pk is not None]
+    if not ids and queryset is None:
+        return
+
+    def run():
+        index_objects(kind, ids if queryset is None else queryset.values_list('pk', flat=True), created)
+    transaction.on_commit(run)
+
+
+def rebuild(kind, batch_size=BATCH_SIZE):
+    """Reconstruye los tokens de `kind` por rangos de pk, cada uno en su transacción; devuelve los objetos."""
+    SearchToken = apps.get_model('pets', 'SearchToken')
+    objects = _model(kind).objects.order_by('pk')
+    indexed = last_pk = 0
+    while True:
+        rows = list(objects.filter(pk__gt=last_pk).values_list('pk', *SEARCH_FIELDS[kind][1])[:batch_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            # Todo el rango, no solo los ids leídos: se van también los tokens de objetos borrados
+            SearchToken.objects.filter(kind=kind, object_id__gt=last_pk, object_id__lte=rows[-1][0]).delete()
+            SearchToken.objects.bulk_create(_tokens(kind, rows, SearchToken), batch_size=batch_size)
+        indexed += len({row[0] for row in rows})
+        last_pk = rows[-1][0]
+    SearchToken.objects.filter(kind=kind, object_id__gt=last_pk).delete()
+    return indexed
+
+
+def search(kind, queryset, search_term):
+    """Filtra `queryset` por `search_term`; None si no hay nada que buscar."""
+    term = search_term.strip()
+    match = _ID.fullmatch(term)
+    if match:
+        return queryset.filter(pk=int(match.group(1)))
+    SearchToken = apps.get_model('pets', 'SearchToken')
+    prefixes = tokenize(term)
+    if not prefixes:
+        return None
+    for prefix in sorted(prefixes):
+        queryset = queryset.filter(pk__in=SearchToken.objects.filter(
+            kind=kind, token__gte=prefix, token__lt=_prefix_range(prefix),
+        ).values('object_id'))
+    return queryset
+
+
+class IndexedSearchMixin:
+    """ModelAdmin cuya caja de búsqueda usa el índice de tokens de `search_index`."""
+    search_index = None
+
+    def get_search_results(self, request, queryset, search_term):
+        results = search(self.search_index, queryset, search_term) if self.search_index else None
+        if results is None:
+            return super().get_search_results(request, queryset, search_term)
+        return results, False
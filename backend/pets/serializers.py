@@ -34,6 +34,8 @@ class PetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pet
         fields = "__all__"
+        # El estado solo cambia con las transiciones de pets/adoption.py
+        read_only_fields = ['status']
     
     def get_age_display(self, obj):
         """Retorna la edad formateada con su unidad"""
@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from shelters.models import Shelter
+from .models import Pet, PetPhoto, AdoptionRequest
+from .counters import adjust_pet_counters, adjust_shelter_counters, touch_pets
+from .changes import record_pet_changes
+from .search import index_later
+
+# Campos que alimentan los tokens de búsqueda del admin (pets/search.py SEARCH_FIELDS)
+PET_SEARCH_ATTNAMES = ('name', 'breed', 'description', 'shelter_id', 'owner_id')
+REQUEST_SEARCH_ATTNAMES = ('message', 'user_id', 'pet_id')
+
+
+def _loaded(instance, attname):
+    """Valor que tenía el campo al cargarse de la base de datos (None si es nuevo)."""
+    return getattr(instance, '_loaded_values', {}).get(attname)
+
+
+def _remember(instance, *attnames):
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        loaded = instance._loaded_values = {}
+    for attname in attnames:
+        loaded[attname] = getattr(instance, attname)
+
+
+def _changed(instance, attnames):
+    """Campos de `attnames` (no diferidos) cuyo valor ya no es el cargado."""
+    deferred = instance.get_deferred_fields()
+    return {
+        attname for attname in attnames
+        if attname not in deferred and _loaded(instance, attname) != getattr(instance, attname)
+    }
+
+
+def _remember_loaded(instance, *attnames):
+    """_remember() sin leer de la base de datos los campos diferidos."""
+    deferred = instance.get_deferred_fields()
+    _remember(instance, *(attname for attname in attnames if attname not in deferred))
+
+
+def _shelter_deltas(status, sign):
+    return {
+        'pet_count': sign,
+        'available_pet_count': sign if status == 'available' else 0,
+    }
+
+
+@receiver(post_save, sender=Pet)
+def pet_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_shelter_counters(instance.shelter_id, **_shelter_deltas(instance.status, 1))
+        index_later('pet', [instance.pk], created=True)
+    else:
+        if hasattr(instance, '_loaded_values'):
+            old_shelter_id = _loaded(instance, 'shelter_id')
+            old_status = _loaded(instance, 'status')
+            # Pet.save() no escribe status salvo que se pida en update_fields (Pet.STATE_FIELDS)
+            new_status = instance.status if update_fields and 'status' in update_fields else old_status
+            if old_shelter_id != instance.shelter_id or old_status != new_status:
+                adjust_shelter_counters(old_shelter_id, **_shelter_deltas(old_status, -1))
+                adjust_shelter_counters(instance.shelter_id, **_shelter_deltas(new_status, 1))
+        changed = _changed(instance, PET_SEARCH_ATTNAMES)
+        if changed:
+            index_later('pet', [instance.pk])
+        if 'name' in changed:
+            index_later('adoption', queryset=AdoptionRequest.objects.filter(pet_id=instance.pk))
+    record_pet_changes([instance.pk])
+    _remember_loaded(instance, 'shelter_id', 'status', *PET_SEARCH_ATTNAMES)
+
+
+@receiver(post_delete, sender=Pet)
+def pet_deleted(sender, instance, **kwargs):
+    adjust_shelter_counters(instance.shelter_id, **_shelter_deltas(instance.status, -1))
+    record_pet_changes([instance.pk], deleted=True)
+
+
+@receiver(post_save, sender=PetPhoto)
+def pet_photo_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_pet_counters(instance.pet_id, photo_count=1)
+    elif hasattr(instance, '_loaded_values'):
+        old_pet_id = _loaded(instance, 'pet_id')
+        if old_pet_id != instance.pet_id:
+            adjust_pet_counters(old_pet_id, photo_count=-1)
+            adjust_pet_counters(instance.pet_id, photo_count=1)
+        else:
+            # La foto forma parte de la representación de la mascota (ETag / Last-Modified)
+            touch_pets(instance.pet_id)
+    else:
+        touch_pets(instance.pet_id)
+    _remember(instance, 'pet_id')
+
+
+@receiver(post_delete, sender=PetPhoto)
+def pet_photo_deleted(sender, instance, **kwargs):
+    adjust_pet_counters(instance.pet_id, photo_count=-1)
+
+
+@receiver(post_save, sender=AdoptionRequest)
+def adoption_request_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if instance.status == 'pending':
+            adjust_pet_counters(instance.pet_id, pending_request_count=1)
+        index_later('adoption', [instance.pk], created=True)
+    else:
+        if hasattr(instance, '_loaded_values'):
+            old_pet_id = _loaded(instance, 'pet_id')
+            old_status = _loaded(instance, 'status')
+            if old_pet_id != instance.pet_id or old_status != instance.status:
+                if old_status == 'pending':
+                    adjust_pet_counters(old_pet_id, pending_request_count=-1)
+                if instance.status == 'pending':
+                    adjust_pet_counters(instance.pet_id, pending_request_count=1)
+        if _changed(instance, REQUEST_SEARCH_ATTNAMES):
+            index_later('adoption', [instance.pk])
+    _remember_loaded(instance, 'pet_id', 'status', *REQUEST_SEARCH_ATTNAMES)
+
+
+@receiver(post_delete, sender=AdoptionRequest)
+def adoption_request_deleted(sender, instance, **kwargs):
+    if instance.status == 'pending':
+        adjust_pet_counters(instance.pet_id, pending_request_count=-1)
+
+
+@receiver(post_save, sender=Shelter)
+def shelter_saved(sender, instance, created, raw=False, **kwargs):
+    """El nombre del refugio forma parte de los tokens de búsqueda de sus mascotas."""
+    if raw:
+        return
+    if not created and 'name' in _changed(instance, ('name',)):
+        index_later('pet', queryset=Pet.objects.filter(shelter_id=instance.pk))
+    _remember_loaded(instance, 'name')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    """username y email forman parte de los tokens de búsqueda de sus mascotas y solicitudes."""
+    if raw:
+        return
+    if not created:
+        changed = _changed(instance, ('username', 'email'))
+        if 'username' in changed:
+            index_later('pet', queryset=Pet.objects.filter(owner_id=instance.pk))
+        if changed:
+            index_later('adoption', queryset=AdoptionRequest.objects.filter(user_id=instance.pk))
+    _remember_loaded(instance, 'username', 'email')
@@ -0,0 +1,209 @@
+"""Índice en memoria de "mascotas parecidas" (GET /api/pets/{id}/similar/).
+
+Cada mascota se codifica como una fila de la matriz ``codes`` (tipo, raza, tamaño
+y refugio como enteros de un vocabulario por atributo, guardada por columnas)
+más su edad en meses. La
+similitud con otra mascota es la suma de ``WEIGHTS`` de las columnas en las que
+coinciden (equivale al producto escalar de los vectores one-hot, sin
+materializarlos) más un término que decrece con la diferencia de edad. Con
+NumPy se puntúan las 100k filas en una sola operación vectorizada y el top-k
+sale de ``argpartition``; sin NumPy se hace lo mismo en Python puro (mismo
+resultado, decenas de ms con 100k mascotas).
+
+El índice vive en cada proceso y se mantiene al día con el registro de cambios
+de pets/changes.py: como mucho cada ``SIMILAR_PETS_REFRESH`` segundos lee los
+cambios posteriores a su cursor y recodifica solo esas filas. Se reconstruye
+entero al arrancar o si su cursor caducó.
+"""
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+
+from .changes import read_changes
+from .models import Pet, PetChange
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNS = ('pet_type', 'breed', 'size', 'shelter_id')
+WEIGHTS = (8.0, 4.0, 2.0, 1.0)
+AGE_WEIGHT = 2.0
+AGE_SCALE = 24  # meses: a 2 años de diferencia el término de edad vale la mitad
+FIELDS = ('pk', 'pet_type', 'breed', 'size', 'age_in_months', 'shelter_id', 'status')
+CHANGES_PER_REFRESH = 10000
+
+
+def _normalize(column, value):
+    if column in ('breed', 'size') and value:
+        return value.strip().lower()
+    return value
+
+
+class SimilarPetsIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cursor = None
+        self._checked = 0
+        self.clear()
+
+    def clear(self):
+        self.vocabularies = [{} for _ in COLUMNS]
+        self.positions = {}
+        self.size = 0
+        # Una columna contigua por atributo: cada comparación recorre memoria seguida
+        if np is not None:
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.codes = [np.zeros(0, dtype=np.int32) for _ in COLUMNS]
+            self.ages = np.zeros(0, dtype=np.float32)
+            self.available = np.zeros(0, dtype=bool)
+        else:
+            self.ids, self.codes, self.ages, self.available = [], [[] for _ in COLUMNS], [], []
+
+    def _encode(self, row):
+        """Fila de values_list(*FIELDS) -> (códigos, edad, disponible). El código 0 es "sin dato"."""
+        pk, pet_type, breed, size, age, shelter_id, status = row
+        codes = []
+        for vocabulary, column, value in zip(self.vocabularies, COLUMNS, (pet_type, breed, size, shelter_id)):
+            value = _normalize(column, value)
+            codes.append(vocabulary.setdefault(value, len(vocabulary) + 1) if value else 0)
+        return codes, float('nan') if age is None else float(age), status == 'available'
+
+    def _reserve(self, count):
+        if np is None or self.size + count <= len(self.ids):
+            return
+        capacity = max(1024, (self.size + count) * 2)
+        self.ids = np.resize(self.ids, capacity)
+        self.codes = [np.resize(column, capacity) for column in self.codes]
+        self.ages = np.resize(self.ages, capacity)
+        self.available = np.resize(self.available, capacity)
+        self.available[self.size:] = False
+
+    def upsert(self, rows):
+        """Añade o recodifica las mascotas de `rows` (values_list(*FIELDS))."""
+        rows = list(rows)
+        self._reserve(len(rows))
+        for row in rows:
+            codes, age, available = self._encode(row)
+            position = self.positions.get(row[0])
+            if position is None:
+                position = self.positions[row[0]] = self.size
+                self.size += 1
+                if np is None:
+                    self.ids.append(row[0])
+                    for column, code in zip(self.codes, codes):
+                        column.append(code)
+                    self.ages.append(age)
+                    self.available.append(available)
+                    continue
+                self.ids[position] = row[0]
+            for column, code in zip(self.codes, codes):
+                column[position] = code
+            self.ages[position] = age
+            self.available[position] = available
+
+    def remove(self, pet_ids):
+        """Las mascotas borradas dejan de ser candidatas (su fila se libera en la siguiente reconstrucción)."""
+        for pet_id in pet_ids:
+            position = self.positions.get(pet_id)
+            if position is not None:
+                self.available[position] = False
+
+    def build(self, rows):
+        self.clear()
+        self.upsert(rows)
+
+    def invalidate(self):
+        """Fuerza una reconstrucción completa en el siguiente refresh()."""
+        with self._lock:
+            self._cursor = None
+
+    def similar(self, pet_id, limit):
+        """ids de las `limit` mascotas disponibles más parecidas a `pet_id` (None si no está indexada)."""
+        with self._lock:
+            position = self.positions.get(pet_id)
+            if position is None:
+                return None
+            if np is None:
+                return self._similar_python(position, limit)
+            return self._similar_numpy(position, limit)
+
+    def _similar_numpy(self, position, limit):
+        size = self.size
+        age = self.ages[position]
+        if np.isnan(age):
+            scores = np.zeros(size, dtype=np.float32)
+        else:
+            # AGE_WEIGHT / (1 + |Δedad| / AGE_SCALE) sin arrays intermedios; edad desconocida -> 0
+            scores = np.abs(self.ages[:size] - age)
+            scores /= AGE_SCALE
+            scores += 1
+            np.divide(AGE_WEIGHT, scores, out=scores)
+            np.nan_to_num(scores, copy=False, nan=0.0)
+        for weight, column in zip(WEIGHTS, self.codes):
+            wanted = column[position]
+            if wanted:
+                scores += np.float32(weight) * (column[:size] == wanted)
+        scores[~self.available[:size]] = -np.inf
+        scores[position] = -np.inf
+        candidates = min(limit, int(np.count_nonzero(np.isfinite(scores))))
+        if not candidates:
+            return []
+        top = np.argpartition(scores, size - candidates)[size - candidates:]
+        # Empates por id ascendente para que el orden sea estable
+        top = top[np.lexsort((self.ids[top], -scores[top]))]
+        return self.ids[top].tolist()
+
+    def _similar_python(self, position, limit):
+        target = [column[position] for column in self.codes]
+        age = self.ages[position]
+
+        def score(index):
+            total = sum(
+                weight for weight, column, wanted in zip(WEIGHTS, self.codes, target)
+                if wanted and column[index] == wanted
+            )
+            if age == age and self.ages[index] == self.ages[index]:  # ninguna es NaN
+                total += AGE_WEIGHT / (1 + abs(self.ages[index] - age) / AGE_SCALE)
+            return total
+
+        candidates = (
+            (score(index), -self.ids[index])
+            for index in range(self.size)
+            if index != position and self.available[index]
+        )
+        return [-negative_id for _, negative_id in heapq.nlargest(limit, candidates)]
+
+    def refresh(self, force=False):
+        """Aplica los cambios de mascotas pendientes (o reconstruye si hace falta)."""
+        now = time.monotonic()
+        if not force and self._cursor is not None and now - self._checked < settings.SIMILAR_PETS_REFRESH:
+            return
+        with self._lock:
+            if self._cursor is None:
+                self._rebuild()
+            else:
+                changes, cursor, more, reset = read_changes(self._cursor, CHANGES_PER_REFRESH)
+                if reset or more:
+                    # Demasiados cambios (o cursor caducado): sale más barato empezar de cero
+                    self._rebuild()
+                else:
+                    self.remove(pet_id for pet_id, deleted in changes.items() if deleted)
+                    updated = [pet_id for pet_id, deleted in changes.items() if not deleted]
+                    if updated:
+                        self.upsert(Pet.objects.filter(pk__in=updated).values_list(*FIELDS))
+                    self._cursor = cursor
+            self._checked = now
+
+    def _rebuild(self):
+        # Cursor antes de leer: los cambios que lleguen durante la carga se vuelven a aplicar después
+        last_change = PetChange.objects.aggregate(last=Max('id'))['last'] or 0
+        self.build(Pet.objects.order_by('pk').values_list(*FIELDS).iterator(chunk_size=10000))
+        self._cursor = f'{last_change}.{int(time.time())}'
+
+
+similar_pets = SimilarPetsIndex()
@@ -1,3 +1,1257 @@
-from django.test import TestCase
+import importlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from PIL import Image, ImageDraw
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.bulk_actions import get_job, iter_chunks, start_job
+from config.renderers import FastJSONParser, FastJSONRenderer
+from config.throttling import local_buckets
+from shelters.models import Shelter
+from users.permissions import pet_scope
+from users.models import User
+from . import adoption
+from .changes import compact, record_pet_changes
+from .search import search, tokenize
+from . import bulk
+from .bulk import export_rows, import_pets, render_rows
+from . import similar
+from .images import BULK, ImagePool, ImagePoolBusy, dhash, normalize_bytes
+from .counters import recount_pets
+from .models import Pet, PetPhoto, AdoptionRequest, PetChange, SearchToken
+from .views import PetViewSet
+
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def use_temporary_media(test):
+    """MEDIA_ROOT temporal durante `test` (devuelve su ruta): las fotos subidas no quedan en backend/media."""
+    media = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media, ignore_errors=True)
+    test.enterContext(override_settings(MEDIA_ROOT=media))
+    return media
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class PetQueryBudgetTests(APITransactionTestCase):
+    """Cada acción debe quedarse dentro de PetViewSet.query_budget sin importar cuántas filas haya.
+
+    En autocommit, como en producción: lo registrado con transaction.on_commit
+    (registro de cambios, índice de búsqueda) se ejecuta dentro de dispatch y cuenta.
+    """
+
+    def setUp(self):
+        self.shelter_user = User.objects.create_user(username='refugio', password='x', role='shelter')
+        self.shelter = Shelter.objects.create(user=self.shelter_user, name='Refugio')
+        self.client_user = User.objects.create_user(username='cliente', password='x', role='client')
+        self.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=self.shelter) for i in range(10)]
+        PetPhoto.objects.bulk_create([
+            PetPhoto(pet=pet, photo=f'pets/dog/mascota-{pet.pk}-{order}.jpg', order=order)
+            for pet in self.pets for order in range(3)
+        ])
+        recount_pets()
+
+    def test_list(self):
+        self.assertEqual(self.client.get('/api/pets/').status_code, 200)
+
+    def test_retrieve(self):
+        self.assertEqual(self.client.get(f'/api/pets/{self.pets[0].pk}/').status_code, 200)
+
+    def test_create(self):
+        response = self.client.post('/api/pets/', {'name': 'Nueva', 'pet_type': 'cat'}, format='json', **auth(self.shelter_user))
+        self.assertEqual(response.status_code, 201)
+
+    def test_partial_update(self):
+        response = self.client.patch(
+            f'/api/pets/{self.pets[0].pk}/', {'name': 'Otra', 'breed': 'Beagle'}, format='json', **auth(self.shelter_user),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        response = self.client.delete(f'/api/pets/{self.pets[0].pk}/', **auth(self.shelter_user))
+        self.assertEqual(response.status_code, 204)
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class AdoptionRequestQueryBudgetTests(APITransactionTestCase):
+    """Cada acción debe quedarse dentro de AdoptionRequestViewSet.query_budget (en autocommit, como PetQueryBudgetTests)"""
+
+    def setUp(self):
+        self.shelter_user = User.objects.create_user(username='refugio', password='x', role='shelter')
+        shelter = Shelter.objects.create(user=self.shelter_user, name='Refugio')
+        self.client_user = User.objects.create_user(username='cliente', password='x', role='client')
+        self.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='cat', shelter=shelter) for i in range(10)]
+        self.requests = [AdoptionRequest.objects.create(pet=pet, user=self.client_user) for pet in self.pets[:5]]
+
+    def test_list(self):
+        self.assertEqual(self.client.get('/api/adoptions/', **auth(self.client_user)).status_code, 200)
+
+    def test_retrieve(self):
+        response = self.client.get(f'/api/adoptions/{self.requests[0].pk}/', **auth(self.client_user))
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        response = self.client.post('/api/adoptions/', {'pet': self.pets[-1].pk, 'message': 'Hola'}, format='json', **auth(self.client_user))
+        self.assertEqual(response.status_code, 201)
+
+    def test_partial_update(self):
+        response = self.client.patch(f'/api/adoptions/{self.requests[0].pk}/', {'message': 'Adiós'}, format='json', **auth(self.client_user))
+        self.assertEqual(response.status_code, 200)
+
+    def test_approve(self):
+        response = self.client.patch(
+            f'/api/adoptions/{self.requests[0].pk}/', {'status': 'approved'}, format='json', **auth(self.shelter_user),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        response = self.client.delete(f'/api/adoptions/{self.requests[0].pk}/', **auth(self.client_user))
+        self.assertEqual(response.status_code, 204)
+
+
+class AdoptionStateMachineTests(APITestCase):
+    """Transiciones de pets/adoption.py: UPDATE condicionales y contadores coherentes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin')
+        shelter_user = User.objects.create_user(username='refugio', password='x', role='shelter')
+        cls.shelter = Shelter.objects.create(user=shelter_user, name='Refugio')
+        cls.pet = Pet.objects.create(name='Luna', pet_type='cat', shelter=cls.shelter)
+        cls.clients = [User.objects.create_user(username=f'cliente{i}', password='x') for i in range(3)]
+        cls.requests = [AdoptionRequest.objects.create(pet=cls.pet, user=user) for user in cls.clients]
+
+    def assertCounters(self, pending, available):
+        self.pet.refresh_from_db()
+        self.shelter.refresh_from_db()
+        self.assertEqual(self.pet.pending_request_count, pending)
+        self.assertEqual(self.shelter.available_pet_count, available)
+
+    def test_approve_adopts_pet_and_rejects_competitors(self):
+        self.assertEqual(adoption.approve(self.requests[0]), 2)
+        statuses = dict(AdoptionRequest.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {self.requests[0].pk: 'approved', self.requests[1].pk: 'rejected', self.requests[2].pk: 'rejected'})
+        self.assertEqual(Pet.objects.get(pk=self.pet.pk).status, 'adopted')
+        self.assertCounters(pending=0, available=0)
+
+    def test_second_approval_fails_without_changes(self):
+        adoption.approve(self.requests[0])
+        stale = AdoptionRequest.objects.get(pk=self.requests[1].pk)
+        stale.status = 'pending'  # copia desactualizada, como la de otra petición concurrente
+        with self.assertRaises(adoption.TransitionError):
+            adoption.approve(stale)
+        self.assertEqual(AdoptionRequest.objects.get(pk=stale.pk).status, 'rejected')
+
+    def test_revert_and_reopen(self):
+        adoption.approve(self.requests[0])
+        adoption.transition(self.requests[0], 'pending')
+        self.assertEqual(Pet.objects.get(pk=self.pet.pk).status, 'available')
+        self.assertEqual(adoption.reopen(AdoptionRequest.objects.all()), 2)
+        self.assertCounters(pending=3, available=1)
+
+    def test_request_for_adopted_pet_is_rejected(self):
+        adoption.approve(self.requests[0])
+        newcomer = User.objects.create_user(username='nuevo', password='x')
+        response = self.client.post('/api/adoptions/', {'pet': self.pet.pk, 'message': 'Hola'}, format='json', **auth(newcomer))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ya fue adoptada', str(response.json()))
+        self.assertFalse(AdoptionRequest.objects.filter(user=newcomer).exists())
+
+    def test_pet_status_is_read_only_in_api(self):
+        response = self.client.patch(f'/api/pets/{self.pet.pk}/', {'status': 'adopted'}, format='json', **auth(self.shelter.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'available')
+        self.assertEqual(Pet.objects.get(pk=self.pet.pk).status, 'available')
+        self.assertCounters(pending=3, available=1)
+
+    def test_stale_pet_save_keeps_status(self):
+        stale = Pet.objects.get(pk=self.pet.pk)
+        adoption.approve(self.requests[0])
+        stale.name = 'Luna II'
+        stale.save()
+        pet = Pet.objects.get(pk=self.pet.pk)
+        self.assertEqual((pet.name, pet.status), ('Luna II', 'adopted'))
+        self.assertCounters(pending=0, available=0)
+
+    def test_invalid_transition(self):
+        with self.assertRaises(adoption.TransitionError):
+            adoption.transition(self.requests[0], 'completed')
+
+    def test_api_status_change_uses_state_machine(self):
+        url = f'/api/adoptions/{self.requests[0].pk}/'
+        self.assertEqual(self.client.patch(url, {'status': 'approved'}, format='json', **auth(self.clients[0])).status_code, 403)
+        response = self.client.patch(url, {'status': 'approved'}, format='json', **auth(self.admin))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'approved')
+        self.assertEqual(AdoptionRequest.objects.filter(status='rejected').count(), 2)
+        self.assertCounters(pending=0, available=0)
+        response = self.client.patch(f'/api/adoptions/{self.requests[1].pk}/', {'status': 'approved'}, format='json', **auth(self.admin))
+        self.assertEqual(response.status_code, 400)
+
+    def test_status_migration_keeps_adopted_pets(self):
+        migration = importlib.import_module('pets.migrations.0010_pet_status_state_machine')
+        manual = Pet.objects.create(name='Marcada', pet_type='dog', shelter=self.shelter)
+        pending = Pet.objects.create(name='Libre', pet_type='dog', shelter=self.shelter)
+        AdoptionRequest.objects.filter(pk=self.requests[0].pk).update(status='approved')
+        Pet.objects.filter(pk=manual.pk).update(status='adopted')
+        Pet.objects.filter(pk=pending.pk).update(status='pending')
+        migration.normalize_pet_status(apps, None)
+        self.assertEqual(
+            dict(Pet.objects.values_list('name', 'status')),
+            {'Luna': 'adopted', 'Marcada': 'adopted', 'Libre': 'available'},
+        )
+        self.assertEqual(Shelter.objects.get(pk=self.shelter.pk).available_pet_count, 1)
+
+
+class CounterSignalTests(APITestCase):
+    """Contadores desnormalizados: señales de pets/signals.py y manage.py rebuild_counters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelters = [
+            Shelter.objects.create(user=User.objects.create_user(username=f'refugio{i}', password='x', role='shelter'), name=f'Refugio {i}')
+            for i in range(2)
+        ]
+        cls.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=cls.shelters[0]) for i in range(2)]
+        cls.clients = [User.objects.create_user(username=f'cliente{i}', password='x') for i in range(2)]
+
+    def setUp(self):
+        use_temporary_media(self)
+
+    def counters(self):
+        return (
+            dict(Pet.objects.values_list('pk', 'photo_count')),
+            dict(Pet.objects.values_list('pk', 'pending_request_count')),
+            dict(Shelter.objects.values_list('pk', 'pet_count')),
+            dict(Shelter.objects.values_list('pk', 'available_pet_count')),
+        )
+
+    def assertCounters(self, photos, pending, pets, available):
+        self.assertEqual(self.counters(), (
+            dict(zip([pet.pk for pet in self.pets], photos)),
+            dict(zip([pet.pk for pet in self.pets], pending)),
+            dict(zip([shelter.pk for shelter in self.shelters], pets)),
+            dict(zip([shelter.pk for shelter in self.shelters], available)),
+        ))
+
+    def test_photos(self):
+        photos = [
+            PetPhoto.objects.create(pet=self.pets[0], photo=SimpleUploadedFile(f'{i}.png', drawing(variant=i)))
+            for i in range(2)
+        ]
+        self.assertCounters(photos=[2, 0], pending=[0, 0], pets=[2, 0], available=[2, 0])
+        photos[1].pet = self.pets[1]
+        photos[1].save()
+        self.assertCounters(photos=[1, 1], pending=[0, 0], pets=[2, 0], available=[2, 0])
+        photos[0].delete()
+        self.assertCounters(photos=[0, 1], pending=[0, 0], pets=[2, 0], available=[2, 0])
+
+    def test_requests(self):
+        first = AdoptionRequest.objects.create(pet=self.pets[0], user=self.clients[0])
+        second = AdoptionRequest.objects.create(pet=self.pets[0], user=self.clients[1])
+        AdoptionRequest.objects.create(pet=self.pets[1], user=self.clients[0], status='rejected')
+        self.assertCounters(photos=[0, 0], pending=[2, 0], pets=[2, 0], available=[2, 0])
+        second.pet = self.pets[1]
+        second.save()
+        self.assertCounters(photos=[0, 0], pending=[1, 1], pets=[2, 0], available=[2, 0])
+        adoption.reject(AdoptionRequest.objects.filter(pk=second.pk))
+        self.assertCounters(photos=[0, 0], pending=[1, 0], pets=[2, 0], available=[2, 0])
+        first.delete()
+        self.assertCounters(photos=[0, 0], pending=[0, 0], pets=[2, 0], available=[2, 0])
+
+    def test_pet_status_and_shelter(self):
+        request = AdoptionRequest.objects.create(pet=self.pets[0], user=self.clients[0])
+        adoption.approve(request)
+        self.assertCounters(photos=[0, 0], pending=[0, 0], pets=[2, 0], available=[1, 0])
+        pet = Pet.objects.get(pk=self.pets[0].pk)
+        pet.shelter = self.shelters[1]
+        pet.save()
+        self.assertCounters(photos=[0, 0], pending=[0, 0], pets=[1, 1], available=[1, 0])
+        adoption.revert_approval(AdoptionRequest.objects.get(pk=request.pk))
+        self.assertCounters(photos=[0, 0], pending=[1, 0], pets=[1, 1], available=[1, 1])
+        Pet.objects.get(pk=self.pets[1].pk).delete()
+        self.pets = self.pets[:1]
+        self.assertCounters(photos=[0], pending=[1], pets=[0, 1], available=[0, 1])
+
+    def test_rebuild_counters_fixes_drift(self):
+        PetPhoto.objects.create(pet=self.pets[0], photo=SimpleUploadedFile('foto.png', drawing()))
+        AdoptionRequest.objects.create(pet=self.pets[1], user=self.clients[0])
+        adoption.approve(AdoptionRequest.objects.create(pet=self.pets[0], user=self.clients[1]))
+        expected = self.counters()
+        # QuerySet.update no envía señales: los contadores se desvían
+        Pet.objects.update(photo_count=7, pending_request_count=3)
+        Shelter.objects.update(pet_count=0, available_pet_count=9)
+        call_command('rebuild_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.counters(), expected)
+        self.assertCounters(photos=[1, 0], pending=[0, 1], pets=[2, 0], available=[1, 0])
+
+
+class AdminBulkActionTests(APITestCase):
+    """Las acciones masivas del admin recorren la selección por lotes de pk (config/bulk_actions.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin', is_staff=True, is_superuser=True)
+        shelter_user = User.objects.create_user(username='refugio', password='x', role='shelter')
+        cls.shelter = Shelter.objects.create(user=shelter_user, name='Refugio')
+        cls.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=cls.shelter) for i in range(3)]
+        cls.clients = [User.objects.create_user(username=f'cliente{i}', password='x') for i in range(2)]
+        cls.requests = [AdoptionRequest.objects.create(pet=pet, user=user) for pet in cls.pets for user in cls.clients]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def run_action(self, action, requests):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('admin:pets_adoptionrequest_changelist'),
+                {'action': action, '_selected_action': [r.pk for r in requests]}, follow=True,
+            )
+
+    def test_iter_chunks_follows_pk_gaps(self):
+        queryset = AdoptionRequest.objects.filter(pk__in=[r.pk for r in self.requests[::2]])
+        chunks = list(iter_chunks(queryset, 2))
+        self.assertEqual([rows for _, rows in chunks], [2, 1])
+        self.assertEqual(
+            [sorted(chunk.values_list('pk', flat=True)) for chunk, _ in chunks],
+            [[self.requests[0].pk, self.requests[2].pk], [self.requests[4].pk]],
+        )
+
+    @override_settings(BULK_ACTION_BATCH_SIZE=2)
+    def test_approve_in_chunks_adopts_pets(self):
+        # La primera solicitud de cada mascota y una competidora de la primera
+        response = self.run_action('approve_requests', self.requests[:3] + self.requests[4:5])
+        self.assertContains(response, '3 solicitud(es) aprobada(s), 3 rechazada(s) automáticamente, 1 omitida(s)')
+        self.assertEqual(set(Pet.objects.values_list('status', flat=True)), {'adopted'})
+        self.assertFalse(Pet.objects.exclude(pending_request_count=0).exists())
+        self.shelter.refresh_from_db()
+        self.assertEqual(self.shelter.available_pet_count, 0)
+        self.assertEqual(set(PetChange.objects.values_list('pet_id', flat=True)), {pet.pk for pet in self.pets})
+
+    @override_settings(BULK_ACTION_BATCH_SIZE=4)
+    def test_reject_and_reopen_recount_pets(self):
+        response = self.run_action('reject_requests', self.requests)
+        self.assertContains(response, '6 solicitud(es) rechazada(s).')
+        self.assertFalse(Pet.objects.exclude(pending_request_count=0).exists())
+        response = self.run_action('pending_requests', self.requests[:3])
+        self.assertContains(response, '3 solicitud(es) marcada(s) como pendiente(s).')
+        self.assertEqual(
+            dict(Pet.objects.values_list('pk', 'pending_request_count')),
+            {self.pets[0].pk: 2, self.pets[1].pk: 1, self.pets[2].pk: 0},
+        )
+
+    @override_settings(BULK_ACTION_BACKGROUND_THRESHOLD=2)
+    def test_large_selection_runs_in_background(self):
+        with mock.patch('config.bulk_actions.start_job') as start:
+            start.return_value.id = 'abc123'
+            response = self.run_action('reject_requests', self.requests)
+        self.assertContains(response, 'tarea abc123')
+        self.assertContains(response, reverse('admin:pets_adoptionrequest_bulk_job', args=['abc123']))
+        self.assertEqual(start.call_args.kwargs['total'], 6)
+        self.assertFalse(AdoptionRequest.objects.filter(status='rejected').exists())
+
+
+class AdminBulkJobTests(TransactionTestCase):
+    """Una tarea en segundo plano usa su propia conexión y deja el progreso consultable"""
+
+    def test_job_progress(self):
+        admin = User.objects.create_user(username='admin', password='x', role='admin', is_staff=True, is_superuser=True)
+        user = User.objects.create_user(username='cliente', password='x')
+        pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='cat', owner=admin) for i in range(5)]
+        AdoptionRequest.objects.bulk_create(AdoptionRequest(pet=pet, user=user) for pet in pets)
+
+        job = start_job('solicitudes', AdoptionRequest.objects.all(), adoption.reject, '{count} rechazada(s)', batch_size=2)
+        job.thread.join(timeout=10)
+        self.assertEqual(
+            {key: get_job(job.id)[key] for key in ('status', 'done', 'total', 'message')},
+            {'status': 'done', 'done': 5, 'total': 5, 'message': '5 rechazada(s)'},
+        )
+        self.assertFalse(AdoptionRequest.objects.filter(status='pending').exists())
+
+        self.client.force_login(admin)
+        url = reverse('admin:pets_adoptionrequest_bulk_job', args=[job.id])
+        self.assertEqual(self.client.get(url).json()['status'], 'done')
+        self.assertEqual(self.client.get(reverse('admin:pets_adoptionrequest_bulk_job', args=['nope'])).status_code, 404)
+
+
+class ScopedPermissionTests(APITestCase):
+    """Lo que cada rol puede editar se resuelve con filtros SQL (users/permissions.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter_users = [User.objects.create_user(username=f'refugio{i}', password='x', role='shelter') for i in range(2)]
+        shelters = [Shelter.objects.create(user=user, name=f'Refugio {i}') for i, user in enumerate(cls.shelter_users)]
+        cls.client_user = User.objects.create_user(username='cliente', password='x')
+        cls.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=shelter) for i, shelter in enumerate(shelters)]
+        cls.own_pet = Pet.objects.create(name='Propia', pet_type='cat', owner=cls.client_user)
+        cls.requests = [AdoptionRequest.objects.create(pet=pet, user=cls.client_user) for pet in cls.pets]
+
+    def test_pet_scope_filters_in_one_query(self):
+        with self.assertNumQueries(1):
+            editable = set(Pet.objects.filter(pet_scope(self.shelter_users[0])).values_list('pk', flat=True))
+        self.assertEqual(editable, {self.pets[0].pk})
+        self.assertEqual(set(Pet.objects.filter(pet_scope(self.client_user)).values_list('pk', flat=True)), {self.own_pet.pk})
+
+    def test_shelter_cannot_edit_other_shelters_pet(self):
+        url = f'/api/pets/{self.pets[1].pk}/'
+        self.assertEqual(self.client.patch(url, {'name': 'X'}, format='json', **auth(self.shelter_users[0])).status_code, 404)
+        self.assertEqual(self.client.patch(url, {'name': 'X'}, format='json', **auth(self.shelter_users[1])).status_code, 200)
+
+    def test_shelter_sees_requests_for_its_pets(self):
+        response = self.client.get('/api/adoptions/', **auth(self.shelter_users[0]))
+        self.assertEqual([item['id'] for item in response.json()], [self.requests[0].pk])
+        response = self.client.patch(f'/api/adoptions/{self.requests[0].pk}/', {'status': 'approved'}, format='json', **auth(self.shelter_users[0]))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(f'/api/adoptions/{self.requests[1].pk}/', {'status': 'approved'}, format='json', **auth(self.shelter_users[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class MyPetsTests(APITestCase):
+    """GET /api/pets/mine/: solo el inventario del usuario, con la misma precarga que el listado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter_user = User.objects.create_user(username='refugio', password='x', role='shelter')
+        shelter = Shelter.objects.create(user=cls.shelter_user, name='Refugio')
+        other = Shelter.objects.create(user=User.objects.create_user(username='otro', password='x', role='shelter'), name='Otro')
+        cls.client_user = User.objects.create_user(username='cliente', password='x')
+        cls.shelter_pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=shelter) for i in range(5)]
+        Pet.objects.create(name='Ajena', pet_type='dog', shelter=other)
+        cls.client_pet = Pet.objects.create(name='Propia', pet_type='cat', owner=cls.client_user)
+
+    def ids(self, user):
+        response = self.client.get('/api/pets/mine/', **auth(user))
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.json()}
+
+    def test_shelter(self):
+        self.assertEqual(self.ids(self.shelter_user), {pet.pk for pet in self.shelter_pets})
+
+    def test_client(self):
+        self.assertEqual(self.ids(self.client_user), {self.client_pet.pk})
+
+    def test_anonymous(self):
+        self.assertEqual(self.client.get('/api/pets/mine/').status_code, 401)
+
+
+class ConditionalGetTests(APITestCase):
+    """ETag / Last-Modified: 304 con una sola consulta y revalidación tras cambios en hijos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        shelter = Shelter.objects.create(user=User.objects.create_user(username='refugio', password='x', role='shelter'), name='Refugio')
+        cls.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=shelter) for i in range(3)]
+        PetPhoto.objects.bulk_create([PetPhoto(pet=cls.pets[0], photo='pets/dog/mascota.jpg')])
+
+    def setUp(self):
+        self.addCleanup(local_buckets.clear)
+
+    def test_list_not_modified(self):
+        first = self.client.get('/api/pets/')
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/pets/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+
+    def test_list_changes_on_delete(self):
+        etag = self.client.get('/api/pets/')['ETag']
+        Pet.objects.filter(pk=self.pets[2].pk).delete()
+        self.assertEqual(self.client.get('/api/pets/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_photo_change_touches_pet(self):
+        url = f'/api/pets/{self.pets[0].pk}/'
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        photo = PetPhoto.objects.get(pet=self.pets[0])
+        photo.order = 1
+        photo.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_bulk_update_touches_rows(self):
+        before = Pet.objects.get(pk=self.pets[1].pk).updated_at
+        Pet.objects.filter(pk=self.pets[1].pk).update(name='Otro nombre')
+        self.assertGreater(Pet.objects.get(pk=self.pets[1].pk).updated_at, before)
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class StreamingListTests(APITestCase):
+    """?stream=json|ndjson de config/streaming.py: mismo contenido que el listado normal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin')
+        cls.shelter = Shelter.objects.create(user=User.objects.create_user(username='refugio', password='x', role='shelter'), name='Refugio')
+        cls.client_user = User.objects.create_user(username='cliente', password='x', role='client')
+        cls.pets = [
+            Pet.objects.create(name=f'Mascota «{i}»', pet_type='dog', age=i, description='Línea\u2028nueva', shelter=cls.shelter)
+            for i in range(1, 6)
+        ]
+        for pet in cls.pets[:3]:
+            AdoptionRequest.objects.create(pet=pet, user=cls.client_user, message='¡Hola!')
+
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+
+    def assertStreamsMatch(self, url, params, user):
+        headers = auth(user) if user else {}
+        expected = self.client.get(url, params, **headers)
+        self.assertEqual(expected.status_code, 200)
+        for mode in ('json', 'ndjson'):
+            with self.subTest(url=url, params=params, mode=mode):
+                response = self.client.get(url, dict(params, stream=mode), **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.streaming)
+                body = b''.join(response.streaming_content)
+                if mode == 'json':
+                    self.assertEqual(body, expected.content)
+                    self.assertEqual(response['Content-Type'], expected['Content-Type'])
+                else:
+                    self.assertEqual([json.loads(line) for line in body.splitlines()], expected.json())
+                    self.assertTrue(body == b'' or body.endswith(b'\n'))
+                    self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+                self.assertEqual(response['Vary'], expected['Vary'])
+                self.assertEqual(response['Allow'], expected['Allow'])
+
+    def test_pets(self):
+        self.assertStreamsMatch('/api/pets/', {}, None)
+        self.assertStreamsMatch('/api/pets/', {'min_age_months': 24, 'max_age_months': 48, 'ordering': '-age'}, None)
+        self.assertStreamsMatch('/api/pets/', {'min_age_months': 1000}, None)
+        self.assertStreamsMatch('/api/pets/mine/', {}, self.client_user)
+
+    def test_adoptions_and_users(self):
+        self.assertStreamsMatch('/api/adoptions/', {}, self.client_user)
+        self.assertStreamsMatch('/api/adoptions/', {}, self.shelter.user)
+        self.assertStreamsMatch('/api/users/', {}, self.admin)
+
+    def test_chunks_and_invalid_filters(self):
+        with mock.patch.object(PetViewSet, 'stream_chunk_size', 2):
+            self.assertStreamsMatch('/api/pets/', {'ordering': 'age'}, None)
+        self.assertEqual(self.client.get('/api/pets/', {'stream': 'json', 'ordering': 'name'}).status_code, 400)
+        # Un modo desconocido es el listado normal
+        response = self.client.get('/api/pets/', {'stream': 'xml'})
+        self.assertFalse(response.streaming)
+
+
+class FastJSONTests(APITestCase):
+    """config/renderers.py: misma salida y mismos datos leídos con orjson que con el json de DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = Shelter.objects.create(user=User.objects.create_user(username='refugio', password='x', role='shelter'), name='Refugio «Ñandú»')
+        cls.client_user = User.objects.create_user(username='cliente', password='x', role='client')
+        cls.pets = [
+            Pet.objects.create(name=f'Mascota {i}', pet_type='cat', age=i, description='Línea\u2028nueva 🐱', shelter=cls.shelter)
+            for i in range(1, 4)
+        ]
+        AdoptionRequest.objects.create(pet=cls.pets[0], user=cls.client_user, message='¡Hola!')
+
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+
+    def without_orjson(self):
+        return mock.patch('config.renderers.orjson', None)
+
+    def test_api_responses_match_stdlib(self):
+        requests = [
+            ('/api/pets/', {}, {}),
+            ('/api/pets/', {'min_age_months': 24, 'ordering': '-age'}, {}),
+            ('/api/pets/', {'max_age_months': 0}, {}),
+            (f'/api/pets/{self.pets[0].pk}/', {}, {}),
+            ('/api/pets/', {'ordering': 'name'}, {}),
+            ('/api/pets/999999/', {}, {}),
+            ('/api/adoptions/', {}, auth(self.client_user)),
+            ('/api/shelters/', {}, {}),
+        ]
+        for url, params, headers in requests:
+            with self.subTest(url=url, params=params):
+                fast = self.client.get(url, params, **headers)
+                with self.without_orjson():
+                    standard = self.client.get(url, params, **headers)
+                self.assertEqual(fast.content, standard.content)
+                for header in ('Content-Type', 'Content-Length', 'ETag', 'Vary', 'Allow'):
+                    self.assertEqual(fast.get(header), standard.get(header), header)
+
+    def test_render_values(self):
+        values = {
+            'fecha': timezone.now(), 'dia': timezone.now().date(), 'hora': timezone.now().time(),
+            'decimal': Decimal('1.10'), 'uuid': uuid.UUID(int=5), 'lazy': gettext_lazy('Mascota'),
+            'grande': 2 ** 70, 'claves': {1: 'a', None: 'b'}, 'tupla': (1, 2), 'texto': 'a\u2029b «ñ»',
+            'lista': [], 'vacio': {}, 'nulo': None,
+        }
+        self.assertEqual(FastJSONRenderer().render(values), JSONRenderer().render(values))
+        self.assertEqual(FastJSONRenderer().render([]), JSONRenderer().render([]))
+        self.assertEqual(FastJSONRenderer().render(None), JSONRenderer().render(None))
+
+    def test_parse_matches_stdlib(self):
+        bodies = [
+            '{"name": "Luna «ñ»", "age": 2, "tags": [], "extra": null}'.encode(),
+            b'[]', b'{"id": 12345678901234567890123}', b'{"a": 1, "a": 2}',
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                parsed = FastJSONParser().parse(BytesIO(body))
+                self.assertEqual(parsed, JSONParser().parse(BytesIO(body)))
+        self.assertIsInstance(FastJSONParser().parse(BytesIO(bodies[2]))['id'], int)
+        for body in (b'{"a": NaN}', b'[1, 2', '"ñ"'.encode('latin-1')):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(BytesIO(body))
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(BytesIO(body))
+
+    def test_posted_json_matches_stdlib(self):
+        data = {'name': 'Luna «ñ»', 'pet_type': 'dog', 'age': 2, 'description': 'a\u2028b'}
+        fast = self.client.post('/api/pets/', data, format='json', **auth(self.client_user))
+        with self.without_orjson():
+            standard = self.client.post('/api/pets/', data, format='json', **auth(self.client_user))
+        self.assertEqual(fast.status_code, 201)
+        ignored = ('id', 'created_at', 'updated_at')
+        self.assertEqual(
+            {key: value for key, value in fast.json().items() if key not in ignored},
+            {key: value for key, value in standard.json().items() if key not in ignored},
+        )
+
+
+class AsyncReadViewTests(APITestCase):
+    """/api/async/pets/: mismo código, cuerpo y Content-Type que PetViewSet list/retrieve"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = Shelter.objects.create(user=User.objects.create_user(username='refugio', password='x', role='shelter'), name='Refugio')
+        cls.pets = [
+            Pet.objects.create(name=f'Mascota {i}', pet_type='dog', age=i, age_unit='months', shelter=cls.shelter)
+            for i in (2, 30, 12)
+        ]
+        PetPhoto.objects.bulk_create([
+            PetPhoto(pet=cls.pets[0], photo=f'pets/dog/mascota-{order}.jpg', order=order, is_primary=not order)
+            for order in range(2)
+        ])
+        recount_pets()
+
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+
+    async def assertSameResponse(self, path, params=None):
+        expected = await sync_to_async(self.client.get)(f'/api/pets/{path}', params)
+        response = await self.async_client.get(f'/api/async/pets/{path}', params)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        for header in ('Content-Type', 'Content-Length'):
+            self.assertEqual(response[header], expected[header], header)
+
+    async def test_list(self):
+        await self.assertSameResponse('')
+        await self.assertSameResponse('', {'min_age_months': 6, 'ordering': '-age'})
+        await self.assertSameResponse('', {'max_age_months': 1})
+        await self.assertSameResponse('', {'ordering': 'name'})
+        await self.assertSameResponse('', {'min_age_months': 'seis'})
+
+    async def test_retrieve(self):
+        await self.assertSameResponse(f'{self.pets[0].pk}/')
+        await self.assertSameResponse(f'{self.pets[1].pk}/', {'ordering': 'name'})
+        await self.assertSameResponse('999999/')
+
+    async def test_empty(self):
+        await Pet.objects.all().adelete()
+        await self.assertSameResponse('')
+
+    @override_settings(THROTTLE_RATES={'pets_read': {'anon': '1/min', 'client': '3/min'}})
+    async def test_jwt_caller_gets_its_role_rate(self):
+        client = await User.objects.acreate_user(username='cliente', password='x', role='client')
+        headers = {'Authorization': auth(client)['HTTP_AUTHORIZATION']}
+        statuses = [(await self.async_client.get('/api/async/pets/', headers=headers)).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        # Un token inválido cuenta como anónimo
+        bad = {'Authorization': 'Bearer no-es-un-token'}
+        statuses = [(await self.async_client.get('/api/async/pets/', headers=bad)).status_code for _ in range(2)]
+        self.assertEqual(statuses, [200, 429])
+
+
+class PetChangesFeedTests(APITestCase):
+    """GET /api/pets/changes/: cambios desde un cursor, lápidas y compactación"""
+
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+        self.shelter_user = User.objects.create_user(username='refugio', password='x', role='shelter')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shelter = Shelter.objects.create(user=self.shelter_user, name='Refugio')
+            self.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=self.shelter) for i in range(3)]
+
+    def changes(self, cursor=None):
+        response = self.client.get('/api/pets/changes/', {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_delta_since_cursor(self):
+        first = self.changes()
+        self.assertEqual([pet['id'] for pet in first['updated']], [pet.pk for pet in self.pets])
+        self.assertFalse(first['more'])
+        self.assertEqual(self.changes(first['cursor'])['updated'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/pets/{self.pets[0].pk}/', {'name': 'Renombrada'}, **auth(self.shelter_user))
+            self.client.delete(f'/api/pets/{self.pets[1].pk}/', **auth(self.shelter_user))
+        delta = self.changes(first['cursor'])
+        self.assertEqual([(pet['id'], pet['name']) for pet in delta['updated']], [(self.pets[0].pk, 'Renombrada')])
+        self.assertEqual(delta['deleted'], [self.pets[1].pk])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        cursor = self.changes()['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Pet.objects.filter(pk=self.pets[0].pk).get().save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.changes(cursor)['updated'], [])
+
+    @override_settings(PET_CHANGES_PAGE_SIZE=2)
+    def test_pages(self):
+        page = self.changes()
+        self.assertTrue(page['more'])
+        self.assertEqual(len(page['updated']), 2)
+        page = self.changes(page['cursor'])
+        self.assertFalse(page['more'])
+        self.assertEqual([pet['id'] for pet in page['updated']], [self.pets[2].pk])
+
+    def test_compaction_keeps_latest_change_per_pet(self):
+        cursor = self.changes()['cursor']
+        deleted_pk = self.pets[2].pk
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.pets[0].save()
+            self.pets[2].delete()
+        self.assertEqual(compact(), (4, 0))
+        self.assertEqual(PetChange.objects.count(), 3)
+        delta = self.changes(cursor)
+        self.assertEqual([pet['id'] for pet in delta['updated']], [self.pets[0].pk])
+        self.assertEqual(delta['deleted'], [deleted_pk])
+
+    def test_expired_cursor_resets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pets[2].delete()
+        cursor = self.changes()['cursor']
+        PetChange.objects.update(created_at=timezone.now() - timedelta(days=365))
+        self.assertEqual(compact(), (1, 1))
+        with mock.patch('pets.changes.time.time', return_value=time.time() + 365 * 86400):
+            delta = self.changes(cursor)
+        self.assertTrue(delta['reset'])
+        self.assertEqual([pet['id'] for pet in delta['updated']], [pet.pk for pet in self.pets[:2]])
+
+
+class ThreadImagePool(ImagePool):
+    """Mismo reparto y cola que ImagePool pero con hilos, para controlar las tareas desde el test"""
+
+    def _make_executor(self):
+        return ThreadPoolExecutor(self.workers)
+
+
+def png_bytes(width=1600, height=400):
+    output = BytesIO()
+    Image.new('RGBA', (width, height), (200, 100, 50, 128)).save(output, format='PNG')
+    return output.getvalue()
+
+
+class ImagePoolTests(SimpleTestCase):
+    """Pool de imágenes: procesos reales, prioridades, cola acotada y timeouts"""
+
+    def setUp(self):
+        self.gate = threading.Event()
+        self.addCleanup(self.gate.set)
+        self.order = []
+
+    def blocked_task(self, data):
+        self.gate.wait(5)
+        self.order.append(data)
+        return data
+
+    def wait_running(self, pool):
+        deadline = time.monotonic() + 5
+        while pool.stats()['running'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_normalizes_in_worker_process(self):
+        pool = ImagePool(workers=1, queue_size=2, queue_wait=1, task_timeout=60)
+        self.addCleanup(lambda: pool._executor.shutdown(wait=False))
+        image = Image.open(BytesIO(pool.process(normalize_bytes, png_bytes())))
+        self.assertEqual((image.format, image.mode, image.width), ('JPEG', 'RGB', 1200))
+        self.assertEqual(pool.stats()['completed'], 1)
+
+    def test_priority_and_bounded_queue(self):
+        pool = ThreadImagePool(workers=1, queue_size=4, queue_wait=0.05, task_timeout=5)
+        futures = [pool.submit(self.blocked_task, b'first')]
+        self.wait_running(pool)
+        futures += [
+            pool.submit(self.blocked_task, b'bulk', BULK),
+            pool.submit(self.blocked_task, b'large upload'),
+            pool.submit(self.blocked_task, b'small'),
+        ]
+        with self.assertRaises(ImagePoolBusy):
+            pool.submit(self.blocked_task, b'rejected')
+        self.assertEqual(pool.stats()['queued'], 3)
+        self.gate.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(self.order, [b'first', b'small', b'large upload', b'bulk'])
+        stats = pool.stats()
+        self.assertEqual((stats['completed'], stats['rejected'], stats['queued']), (4, 1, 0))
+
+    def test_task_timeout(self):
+        pool = ThreadImagePool(workers=1, queue_size=2, queue_wait=0.05, task_timeout=0.05)
+        with self.assertRaises(ImagePoolBusy):
+            pool.process(self.blocked_task, b'slow')
+        self.assertEqual(pool.stats()['timed_out'], 1)
+
+
+class ImageUploadBackpressureTests(APITestCase):
+    def setUp(self):
+        use_temporary_media(self)
+
+    def test_busy_pool_returns_503(self):
+        user = User.objects.create_user(username='cliente', password='x', role='client')
+        upload = SimpleUploadedFile('foto.png', png_bytes(), content_type='image/png')
+        with mock.patch('pets.images.image_pool.submit', side_effect=ImagePoolBusy(wait=2)):
+            response = self.client.post(
+                '/api/pets/', {'name': 'Mascota', 'pet_type': 'dog', 'photos': [upload]}, format='multipart', **auth(user),
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertFalse(Pet.objects.exists())
+
+    def test_pet_and_photos_are_saved_together(self):
+        user = User.objects.create_user(username='cliente', password='x', role='client')
+        uploads = [SimpleUploadedFile(f'foto{i}.png', drawing(variant=i), content_type='image/png') for i in range(2)]
+        with mock.patch.object(PetPhoto, 'save', autospec=True, side_effect=[None, DatabaseError('sin espacio')]):
+            with self.assertRaises(DatabaseError):
+                self.client.post(
+                    '/api/pets/', {'name': 'Mascota', 'pet_type': 'dog', 'photos': uploads}, format='multipart', **auth(user),
+                )
+        self.assertFalse(Pet.objects.exists())
+        for upload in uploads:
+            upload.seek(0)
+        response = self.client.post(
+            '/api/pets/', {'name': 'Mascota', 'pet_type': 'dog', 'photos': uploads}, format='multipart', **auth(user),
+        )
+        self.assertEqual(response.status_code, 201)
+        photos = PetPhoto.objects.filter(pet_id=response.data['id'])
+        self.assertEqual(photos.count(), 2)
+        self.assertFalse(photos.filter(phash__isnull=True).exists())
+
+    def test_busy_pool_leaves_pet_unchanged(self):
+        user = User.objects.create_user(username='cliente', password='x', role='client')
+        pet = Pet.objects.create(name='Mascota', pet_type='dog', owner=user)
+        upload = SimpleUploadedFile('foto.png', png_bytes(), content_type='image/png')
+        with mock.patch('pets.images.image_pool.submit', side_effect=ImagePoolBusy(wait=2)):
+            response = self.client.patch(
+                f'/api/pets/{pet.pk}/', {'name': 'Otra', 'photos': [upload]}, format='multipart', **auth(user),
+            )
+        self.assertEqual(response.status_code, 503)
+        pet.refresh_from_db()
+        self.assertEqual(pet.name, 'Mascota')
+
+
+def drawing(width=800, height=600, variant=0, fmt='PNG', quality=95):
+    """Imagen con formas: el mismo `variant` a otro tamaño o calidad es un casi-duplicado"""
+    img = Image.new('RGB', (800, 600), (240, 230, 200))
+    draw = ImageDraw.Draw(img)
+    for i in range(6):
+        x = (i * 137 + variant * 251) % 700
+        y = (i * 89 + variant * 173) % 500
+        draw.ellipse((x, y, x + 120 + i * 10, y + 90), fill=((i * 40 + variant * 70) % 256, 80, 160 - i * 20))
+    img = img.resize((width, height))
+    output = BytesIO()
+    img.save(output, format=fmt, quality=quality)
+    return output.getvalue()
+
+
+@mock.patch('pets.images.image_pool', ImagePool(workers=0))
+class DuplicatePhotoTests(APITestCase):
+    """dHash en PetPhoto, búsqueda por bandas y reutilización de archivos duplicados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='cliente', password='x', role='client')
+        cls.pets = [Pet.objects.create(name=f'Mascota {i}', pet_type='cat', owner=owner) for i in range(3)]
+        cls.other_owner = User.objects.create_user(username='otro', password='x', role='client')
+        cls.shelters = [
+            Shelter.objects.create(user=User.objects.create_user(username=f'refugio{i}', password='x', role='shelter'), name=f'Refugio {i}')
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        use_temporary_media(self)
+
+    def upload(self, pet, data, name='foto.png'):
+        return PetPhoto.objects.create(pet=pet, photo=SimpleUploadedFile(name, data))
+
+    def test_dhash_tolerates_resize_and_recompression(self):
+        original = dhash(Image.open(BytesIO(drawing())))
+        resized = dhash(Image.open(BytesIO(drawing(400, 300, fmt='JPEG', quality=60))))
+        other = dhash(Image.open(BytesIO(drawing(variant=1))))
+        self.assertLessEqual((original ^ resized).bit_count(), 3)
+        self.assertGreater((original ^ other).bit_count(), 10)
+
+    def test_upload_reuses_near_duplicate(self):
+        first = self.upload(self.pets[0], drawing())
+        again = self.upload(self.pets[1], drawing(1600, 1200, fmt='JPEG', quality=70), 'otra.jpg')
+        different = self.upload(self.pets[2], drawing(variant=1))
+        self.assertIsNotNone(first.phash)
+        self.assertEqual(again.duplicate_of, first)
+        self.assertEqual(again.photo.name, first.photo.name)
+        self.assertIsNone(different.duplicate_of)
+        self.assertNotEqual(different.photo.name, first.photo.name)
+
+    def test_other_owners_duplicate_is_flagged_but_not_shared(self):
+        first = self.upload(self.pets[0], drawing())
+        sheltered = [Pet.objects.create(name=f'Refugiada {i}', pet_type='cat', shelter=shelter) for i, shelter in enumerate(self.shelters)]
+        other_pet = Pet.objects.create(name='Ajena', pet_type='cat', owner=self.other_owner)
+        in_shelter = self.upload(sheltered[0], drawing(1600, 1200, fmt='JPEG', quality=70), 'refugio.jpg')
+        for pet in (other_pet, sheltered[1]):
+            with self.subTest(pet=pet.name):
+                photo = self.upload(pet, drawing(1000, 750, fmt='JPEG', quality=80), 'ajena.jpg')
+                self.assertIsNotNone(photo.duplicate_of)
+                self.assertNotIn(photo.photo.name, (first.photo.name, in_shelter.photo.name))
+        self.assertEqual(in_shelter.duplicate_of, first)
+        self.assertNotEqual(in_shelter.photo.name, first.photo.name)
+        # Mismo refugio (otra mascota): se comparte el archivo
+        same_shelter = Pet.objects.create(name='Compañera', pet_type='cat', shelter=self.shelters[0])
+        shared = self.upload(same_shelter, drawing(800, 600, fmt='JPEG', quality=75), 'misma.jpg')
+        self.assertEqual(shared.duplicate_of, in_shelter)
+        self.assertEqual(shared.photo.name, in_shelter.photo.name)
+
+    def test_band_lookup_bounds_distance(self):
+        base = 0x0123456789ABCDEF
+        photos = []
+        for flipped_bits in (0, 3, 5):
+            photo = PetPhoto(pet=self.pets[0], photo=f'pets/cat/{flipped_bits}.jpg')
+            photo.set_phash(base ^ ((1 << flipped_bits) - 1))
+            photos.append(photo)
+        for name, value in (('lejana', base ^ (0xFF << 56)), ('alta', (base ^ 0xFFFF) | (1 << 63))):
+            photo = PetPhoto(pet=self.pets[0], photo=f'pets/cat/{name}.jpg')
+            photo.set_phash(value)
+            photos.append(photo)
+        PetPhoto.objects.bulk_create(photos)
+        with self.assertNumQueries(1):
+            matches = PetPhoto.objects.near_duplicates(base)
+        self.assertEqual([match.photo.name for match in matches], ['pets/cat/0.jpg', 'pets/cat/3.jpg'])
+        # Hash con el bit alto (BIGINT negativo en la base de datos)
+        high = (base ^ 0xFFFF) | (1 << 63)
+        self.assertEqual([match.phash_value for match in PetPhoto.objects.near_duplicates(high)], [high])
+
+    def test_hash_photos_command(self):
+        first = self.upload(self.pets[0], drawing())
+        second = self.upload(self.pets[1], drawing(variant=1))
+        third = PetPhoto.objects.create(pet=self.pets[2], photo=second.photo.name)
+        PetPhoto.objects.update(phash=None, phash_band0=None, phash_band1=None, phash_band2=None, phash_band3=None)
+        call_command('hash_photos', '--flag', stdout=StringIO())
+        self.assertEqual(PetPhoto.objects.filter(phash__isnull=True).count(), 0)
+        self.assertEqual(
+            dict(PetPhoto.objects.values_list('pk', 'duplicate_of')),
+            {first.pk: None, second.pk: None, third.pk: second.pk},
+        )
+
+
+@override_settings(QUERY_BUDGET_MODE='raise', SIMILAR_PETS_REFRESH=0)
+class SimilarPetsTests(APITestCase):
+    """GET /api/pets/{id}/similar/: ranking, NumPy vs Python puro y actualización incremental"""
+
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+        similar.similar_pets.invalidate()
+        self.addCleanup(similar.similar_pets.invalidate)
+        shelters = [
+            Shelter.objects.create(user=User.objects.create_user(username=f'refugio{i}', password='x', role='shelter'), name=f'Refugio {i}')
+            for i in range(2)
+        ]
+
+        def pet(name, pet_type='dog', breed='Labrador', size='mediano', age=2, age_unit='years', shelter=0, **extra):
+            return Pet.objects.create(
+                name=name, pet_type=pet_type, breed=breed, size=size, age=age, age_unit=age_unit, shelter=shelters[shelter], **extra,
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.target = pet('Objetivo')
+            self.twin = pet('Gemelo', breed=' labrador ', age=30, age_unit='months', shelter=1)
+            self.same_shelter = pet('Grande', size='grande')
+            self.other_breed = pet('Mestizo', breed='Mestizo', size='chico', age=8, shelter=1)
+            self.cat = pet('Gato', pet_type='cat', age=None)
+            self.adopted = pet('Adoptado', status='adopted')
+
+    def similar_ids(self, pet, limit=10):
+        response = self.client.get(f'/api/pets/{pet.pk}/similar/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_ranking(self):
+        expected = [self.twin.pk, self.same_shelter.pk, self.other_breed.pk, self.cat.pk]
+        self.assertEqual(self.similar_ids(self.target), expected)
+        self.assertEqual(self.similar_ids(self.target, limit=2), expected[:2])
+        self.assertEqual(self.client.get('/api/pets/999999/similar/').status_code, 404)
+        response = self.client.get('/api/pets/abc/similar/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('limit', response.json())
+        response = self.client.get(f'/api/pets/{self.target.pk}/similar/', {'limit': 'diez'})
+        self.assertEqual(response.json(), {'limit': 'Debe ser un número entero.'})
+
+    def test_python_fallback_matches_numpy(self):
+        rows = list(Pet.objects.order_by('pk').values_list(*similar.FIELDS))
+        with_numpy = similar.SimilarPetsIndex()
+        with_numpy.build(rows)
+        with mock.patch.object(similar, 'np', None):
+            pure_python = similar.SimilarPetsIndex()
+            pure_python.build(rows)
+            for pet_id, *_ in rows:
+                self.assertEqual(pure_python.similar(pet_id, 3), with_numpy.similar(pet_id, 3))
+
+    def test_incremental_refresh(self):
+        self.similar_ids(self.target)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_breed.breed = 'Labrador'
+            self.other_breed.size = 'mediano'
+            self.other_breed.age = 2
+            self.other_breed.shelter = self.target.shelter
+            self.other_breed.save()
+            self.twin.delete()
+            newcomer = Pet.objects.create(name='Nuevo', pet_type='cat', shelter=self.target.shelter)
+        with mock.patch.object(similar.SimilarPetsIndex, '_rebuild', side_effect=AssertionError('reconstrucción completa')):
+            self.assertEqual(self.similar_ids(self.target), [self.other_breed.pk, self.same_shelter.pk, self.cat.pk, newcomer.pk])
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class AgeInMonthsTests(APITestCase):
+    """age_in_months: mantenida en save()/bulk_create(), relleno por lotes y filtros/orden indexados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = Shelter.objects.create(user=User.objects.create_user(username='refugio', password='x', role='shelter'), name='Refugio')
+        cls.puppy = Pet.objects.create(name='Cachorro', pet_type='dog', age=4, age_unit='months', shelter=cls.shelter)
+        cls.young, cls.senior, cls.unknown = Pet.objects.bulk_create([
+            Pet(name='Joven', pet_type='dog', age=2, age_unit='years', shelter=cls.shelter),
+            Pet(name='Mayor', pet_type='cat', age=10, age_unit='years', shelter=cls.shelter),
+            Pet(name='Sin edad', pet_type='cat', shelter=cls.shelter),
+        ])
+
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+
+    def test_maintained_on_save_and_bulk_create(self):
+        self.assertEqual(
+            list(Pet.objects.order_by('pk').values_list('age_in_months', flat=True)), [4, 24, 120, None],
+        )
+        self.young.age = 3
+        self.young.save(update_fields=['age'])
+        self.young.refresh_from_db()
+        self.assertEqual(self.young.age_in_months, 36)
+
+    def test_backfill_migration(self):
+        migration = importlib.import_module('pets.migrations.0014_pet_age_in_months')
+        Pet.objects.update(age_in_months=None)
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            migration.backfill_age_in_months(apps, None)
+        self.assertEqual(
+            list(Pet.objects.order_by('pk').values_list('age_in_months', flat=True)), [4, 24, 120, None],
+        )
+
+    def test_filter_and_sort_by_age(self):
+        response = self.client.get('/api/pets/', {'min_age_months': 3, 'max_age_months': 60, 'ordering': '-age'})
+        self.assertEqual([pet['id'] for pet in response.data], [self.young.pk, self.puppy.pk])
+        response = self.client.get('/api/pets/', {'ordering': 'age', 'min_age_months': 0})
+        self.assertEqual([pet['id'] for pet in response.data], [self.puppy.pk, self.young.pk, self.senior.pk])
+        self.assertEqual(self.client.get('/api/pets/', {'max_age_months': 'dos'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/pets/', {'ordering': 'name'}).status_code, 400)
+
+    def test_range_uses_index(self):
+        plan = Pet.objects.filter(age_in_months__gte=12, age_in_months__lte=36).order_by('age_in_months', 'pk').explain()
+        self.assertIn('pet_age_in_months_idx', plan)
+
+
+class AdminSearchTests(APITestCase):
+    """Búsqueda del admin con el índice de tokens de pets/search.py en lugar de LIKE '%x%'"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin = User.objects.create_user(username='admin', password='x', role='admin', is_staff=True, is_superuser=True)
+            shelter_user = User.objects.create_user(username='refugio', password='x', role='shelter')
+            self.shelter = Shelter.objects.create(user=shelter_user, name='Refugio Esperanza')
+            self.luna = Pet.objects.create(name='Luna', pet_type='dog', breed='Labrador', description='Muy juguetona', shelter=self.shelter)
+            self.max = Pet.objects.create(name='Max', pet_type='dog', breed='Pastor Alemán', shelter=self.shelter)
+            self.client_user = User.objects.create_user(username='juan_perez', password='x', email='juan@example.com')
+            self.request = AdoptionRequest.objects.create(pet=self.luna, user=self.client_user, message='Tengo jardín')
+
+    def search(self, kind, term):
+        model = Pet if kind == 'pet' else AdoptionRequest
+        return set(search(kind, model.objects.all(), term).values_list('pk', flat=True))
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Pastor Alemán, juan_perez'), {'pastor', 'aleman', 'juan', 'perez'})
+
+    def test_prefixes_across_related_fields(self):
+        self.assertEqual(self.search('pet', 'esper lab'), {self.luna.pk})
+        self.assertEqual(self.search('pet', 'ALEMÁN'), {self.max.pk})
+        self.assertEqual(self.search('pet', 'refugio'), {self.luna.pk, self.max.pk})
+        self.assertEqual(self.search('pet', 'brador'), set())
+        self.assertEqual(self.search('adoption', 'perez jardin luna'), {self.request.pk})
+        self.assertEqual(self.search('adoption', 'juan@example'), {self.request.pk})
+
+    def test_exact_id_short_circuit(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.search('pet', f'#{self.max.pk}'), {self.max.pk})
+
+    def test_renames_reindex_related_objects(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shelter.name = 'Patitas'
+            self.shelter.save()
+            self.luna.name = 'Lola'
+            self.luna.save()
+        self.assertEqual(self.search('pet', 'patitas'), {self.luna.pk, self.max.pk})
+        self.assertEqual(self.search('pet', 'esperanza'), set())
+        self.assertEqual(self.search('adoption', 'lola'), {self.request.pk})
+        self.assertEqual(self.search('adoption', 'luna'), set())
+
+    def test_admin_changelist_uses_index(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/pets/pet/', {'q': 'juguet'})
+        self.assertContains(response, 'Luna')
+        self.assertNotContains(response, 'Pastor Alemán')
+        self.assertFalse([q['sql'] for q in queries if 'LIKE' in q['sql']])
+        self.assertContains(self.client.get('/admin/pets/adoptionrequest/', {'q': str(self.request.pk)}), f'#{self.request.pk}')
+
+    def test_rebuild_command(self):
+        SearchToken.objects.all().delete()
+        SearchToken.objects.create(kind='pet', object_id=self.max.pk + 100, token='fantasma')
+        out = StringIO()
+        call_command('rebuild_search_index', '--batch-size', '1', stdout=out)
+        self.assertIn('pet: 2 objeto(s) indexado(s).', out.getvalue())
+        self.assertEqual(self.search('pet', 'luna'), {self.luna.pk})
+        self.assertFalse(SearchToken.objects.filter(token='fantasma').exists())
+
+
+class ImportPetsTests(APITestCase):
+    """Importación masiva de pets/bulk.py"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = Shelter.objects.create(user=User.objects.create_user(username='refugio', password='x', role='shelter'), name='Refugio')
+
+    def setUp(self):
+        self.photo_root = tempfile.mkdtemp(dir=use_temporary_media(self))
+        with open(f'{self.photo_root}/luna.png', 'wb') as fh:
+            fh.write(drawing(200, 150))
+
+    def ndjson(self, *rows):
+        return [json.dumps(dict({'pet_type': 'dog', 'shelter': self.shelter.pk}, **row)) for row in rows]
+
+    def test_insert_without_returning(self):
+        # Como MySQL: bulk_create no devuelve ids y las mascotas con fotos se insertan una a una
+        lines = self.ndjson(
+            {'name': 'Luna', 'age': 2, 'photos': ['luna.png']},
+            {'name': 'Sol', 'age': 5, 'age_unit': 'months'},
+        )
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                mock.patch('pets.signals.record_pet_changes', wraps=record_pet_changes) as signal_changes, \
+                self.captureOnCommitCallbacks(execute=True):
+            result = import_pets(lines, 'ndjson', workers=1, photo_root=self.photo_root)
+        self.assertEqual(result, {'created': 2, 'errors': []})
+        self.assertEqual(dict(Pet.objects.values_list('name', 'age_in_months')), {'Luna': 24, 'Sol': 5})
+        self.assertEqual(Pet.objects.get(name='Luna').photo_count, 1)
+        # Sin señales: un cambio por mascota y los contadores del recuento, no dos veces
+        signal_changes.assert_not_called()
+        self.assertEqual(sorted(PetChange.objects.values_list('pet_id', flat=True)), sorted(Pet.objects.values_list('pk', flat=True)))
+        shelter = Shelter.objects.get(pk=self.shelter.pk)
+        self.assertEqual((shelter.pet_count, shelter.available_pet_count), (2, 2))
+
+    def exported(self):
+        return [
+            dict(row, id=None, photos=len(row['photos']))
+            for row in export_rows()
+        ]
+
+    def test_export_import_round_trip(self):
+        owner = User.objects.create_user(username='cliente', password='x', role='client')
+        luna = Pet.objects.create(
+            name='Luna, "la rápida"', pet_type='dog', breed='Pastor Alemán', age=3, size='grande',
+            description='Vive con gatos;\nle gusta correr', shelter=self.shelter,
+        )
+        PetPhoto.objects.create(pet=luna, photo=SimpleUploadedFile('luna.png', drawing(200, 150)))
+        Pet.objects.create(name='Michi', pet_type='cat', age=8, age_unit='months', owner=owner)
+        before = self.exported()
+        for fmt in ('csv', 'ndjson'):
+            with self.subTest(fmt=fmt):
+                lines = ''.join(render_rows(export_rows(), fmt)).splitlines(keepends=True)
+                Pet.objects.filter(pk__in=[row['id'] for row in export_rows()]).delete()
+                result = import_pets(lines, fmt, workers=1, photo_root=settings.MEDIA_ROOT)
+                self.assertEqual(result, {'created': 2, 'errors': []})
+                self.assertEqual(self.exported(), before)
+
+    def test_bad_rows_are_reported_not_truncated(self):
+        lines = self.ndjson(
+            {'name': 'Buena'},
+            {'name': 'Estado', 'status': 'perdida'},
+            {'name': 'Adoptada', 'status': 'adopted'},
+            {'name': 'N' * 121},
+            {'name': 'Raza', 'breed': 'B' * 121},
+            {'name': 'Tamaño', 'size': 'S' * 51},
+            {'name': 'Tipo', 'pet_type': 'pez'},
+            {'name': ''},
+            {'name': 'Edad', 'age': 'dos'},
+            {'name': 'Sin refugio', 'shelter': 999999},
+        ) + ['{no es json']
+        result = import_pets(lines, 'ndjson', workers=1, photo_root=self.photo_root)
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], list(range(2, 12)))
+        self.assertIn('Estado inválido', result['errors'][0]['error'])
+        self.assertIn("Estado 'adopted' no permitido", result['errors'][1]['error'])
+        self.assertIn('name admite como mucho 120 caracteres', result['errors'][2]['error'])
+        self.assertIn('breed admite como mucho 120', result['errors'][3]['error'])
+        self.assertIn('size admite como mucho 50', result['errors'][4]['error'])
+        self.assertEqual(list(Pet.objects.values_list('name', flat=True)), ['Buena'])
+
+    def test_batches(self):
+        lines = self.ndjson(*({'name': f'Mascota {i}'} for i in range(4)), {'name': 'Mala', 'status': 'x'})
+        with mock.patch('pets.bulk.validate_batch', wraps=bulk.validate_batch) as validate, \
+                self.captureOnCommitCallbacks(execute=True):
+            result = import_pets(lines, 'ndjson', batch_size=2, workers=1, photo_root=self.photo_root)
+        self.assertEqual([len(call.args[0]) for call in validate.call_args_list], [2, 2, 1])
+        self.assertEqual(result['created'], 4)
+        self.assertEqual(result['errors'], [{'row': 5, 'error': "Estado inválido: 'x'."}])
+        self.assertEqual(Shelter.objects.get(pk=self.shelter.pk).pet_count, 4)
+        self.assertEqual(SearchToken.objects.filter(kind='pet', token='mascota').count(), 4)
+        self.assertEqual(PetChange.objects.count(), 4)
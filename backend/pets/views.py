@@ -2,89 +2,268 @@ from rest_framework import viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.http import StreamingHttpResponse
+import codecs
+from contextlib import nullcontext
+from config.streaming import StreamingListMixin
+from config.async_views import AsyncReadView
+from config.query_budget import QueryBudgetMixin
+from config.conditional import ConditionalGetMixin
+from config.throttling import RoleRateThrottle
 from .models import Pet, AdoptionRequest, PetPhoto
+from .images import normalize_upload_with_hash
 from .serializers import PetSerializer, AdoptionRequestSerializer, PetPhotoSerializer
-from users.permissions import IsShelter, IsClient, IsPetOwnerOrAdmin, IsShelterOrClient, IsAdoptionRequestOwnerOrAdmin
+from . import adoption
+from .changes import read_changes
+from .similar import similar_pets
+from .bulk import FORMATS, import_pets, export_rows, render_rows
+from shelters.geo import nearest_shelters, parse_location
+from django.core.exceptions import ObjectDoesNotExist
+from users.permissions import (
+    IsAdmin, IsClient, IsPetOwnerOrAdmin, IsShelterOrClient, IsAdoptionRequestOwnerOrAdmin,
+    pet_scope, adoption_request_scope,
+)
 
-class PetViewSet(viewsets.ModelViewSet):
-    queryset = Pet.objects.all()
+def filter_by_age(queryset, params):
+    """?min_age_months=&max_age_months= y ?ordering=age|-age sobre age_in_months (rango en pet_age_in_months_idx)"""
+    bounds = {}
+    for param, lookup in (('min_age_months', 'age_in_months__gte'), ('max_age_months', 'age_in_months__lte')):
+        if params.get(param):
+            try:
+                bounds[lookup] = int(params[param])
+            except ValueError:
+                raise ValidationError({param: "Debe ser un número entero de meses."})
+    if bounds:
+        queryset = queryset.filter(**bounds)
+    ordering = params.get('ordering')
+    if ordering in ('age', '-age'):
+        queryset = queryset.order_by(ordering.replace('age', 'age_in_months'), ordering.replace('age', 'pk'))
+    elif ordering:
+        raise ValidationError({"ordering": "Usa 'age' o '-age'."})
+    return queryset
+
+
+class PetViewSet(QueryBudgetMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    queryset = Pet.objects.prefetch_related('photos')
     serializer_class = PetSerializer
+    # list/retrieve/mine: +1 por la comprobación de config/conditional.py (una sola si responde 304)
+    # destroy: +1 por el SET NULL de PetPhoto.duplicate_of al borrar las fotos
+    # create/update/destroy: medidos en autocommit, con lo que se ejecuta al confirmar
+    # (transaction.on_commit): INSERT de PetChange (pets/changes.py) y reindexación de
+    # pets/search.py, cada uno con su BEGIN en SQLite. destroy: un PetChange por foto borrada
+    query_budget = {
+        'list': 3, 'retrieve': 3, 'create': 12,
+        'update': 15, 'partial_update': 15, 'destroy': 21,
+        'nearby': 3, 'mine': 4, 'changes': 3,
+        # similar: registro de cambios (o carga completa del índice) + filas cambiadas + mascotas + fotos
+        'similar': 4,
+    }
+    throttle_scope = {
+        'list': 'pets_read', 'retrieve': 'pets_read', 'nearby': 'pets_read', 'changes': 'pets_read', 'similar': 'pets_read',
+    }
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['update', 'partial_update', 'destroy']:
+            # Solo las editables por el usuario (un solo WHERE); el resto da 404
+            queryset = queryset.select_related('shelter').filter(pet_scope(self.request.user))
+        elif self.action == 'mine':
+            # Índices de shelter_id / owner_id: coste proporcional al inventario propio
+            queryset = queryset.filter(pet_scope(self.request.user))
+        if self.action in ['list', 'mine']:
+            queryset = filter_by_age(queryset, self.request.query_params)
+        return queryset
+
     def get_permissions(self):
-        if self.action == 'create':
+        if self.action in ['create', 'mine']:
             return [IsAuthenticated(), IsShelterOrClient()]
         if self.action in ['update', 'partial_update', 'destroy']:
             return [IsAuthenticated(), IsPetOwnerOrAdmin()]
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'nearby', 'changes', 'similar']:
             return [AllowAny()]
+        if self.action in ['bulk_import', 'export']:
+            return [IsAuthenticated(), IsAdmin()]
         return [IsAuthenticated()]
 
-    def perform_create(self, serializer):
-        user = self.request.user
-        if user.role == "shelter":
-            try:
-                shelter = user.shelter
-                pet = serializer.save(shelter=shelter, owner=None)
-            except:
-                from rest_framework.exceptions import ValidationError
-                raise ValidationError("Los usuarios con rol 'shelter' deben tener un refugio asociado. Contacta al administrador.")
-        elif user.role == "client":
-            pet = serializer.save(owner=user, shelter=None)
-        else:
-            pet = serializer.save()
-        
-        if not pet.owner and not pet.shelter:
-            from rest_framework.exceptions import ValidationError
-            raise ValidationError("La mascota debe tener un dueño (cliente) o un refugio asociado.")
-        
-        photos = self.request.FILES.getlist('photos')
+    @action(detail=False, methods=['get'])
+    def mine(self, request):
+        """Mascotas del refugio o cliente autenticado (admite ?stream= como el listado)"""
+        return self.list(request)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Mascotas disponibles en los refugios más cercanos a ?lat=&lng=, ordenadas por distancia"""
+        lat, lng, radius, limit = parse_location(request.query_params)
+        # Solo los refugios más cercanos que suman `limit` mascotas disponibles (contador desnormalizado)
+        distances, available = {}, 0
+        for distance, shelter in nearest_shelters(lat, lng, radius):
+            if available >= limit:
+                break
+            if shelter.available_pet_count:
+                distances[shelter.pk] = distance
+                available += shelter.available_pet_count
+        if not distances:
+            return Response([])
+        # Se ordena y recorta en SQL: orden del refugio por distancia (empates con el mismo), luego pk
+        ranks = {distance: rank for rank, distance in enumerate(sorted(set(distances.values())))}
+        shelter_rank = Case(
+            *(When(shelter_id=shelter_id, then=Value(ranks[distance])) for shelter_id, distance in distances.items()),
+            output_field=IntegerField(),
+        )
+        pets = list(
+            self.filter_queryset(self.get_queryset()).filter(shelter_id__in=distances, status='available')
+            .annotate(shelter_rank=shelter_rank).order_by('shelter_rank', 'pk')[:limit]
+        )
+        data = self.get_serializer(pets, many=True).data
+        for item, pet in zip(data, pets):
+            item['distance_km'] = round(distances[pet.shelter_id], 2)
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Mascotas disponibles más parecidas a esta (tipo, raza, tamaño, edad y refugio); ?limit= hasta 50"""
+        try:
+            pet_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        try:
+            limit = min(50, max(1, int(request.query_params.get('limit', 10))))
+        except ValueError:
+            raise ValidationError({"limit": "Debe ser un número entero."})
+        similar_pets.refresh()
+        pet_ids = similar_pets.similar(pet_id, limit)
+        if pet_ids is None:
+            raise NotFound()
+        pets = {pet.pk: pet for pet in self.get_queryset().filter(pk__in=pet_ids)} if pet_ids else {}
+        return Response(self.get_serializer([pets[pk] for pk in pet_ids if pk in pets], many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Mascotas creadas, modificadas o borradas desde ?cursor= (sin cursor: el catálogo completo por páginas)"""
+        try:
+            changes, cursor, more, reset = read_changes(request.query_params.get('cursor'), settings.PET_CHANGES_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({"cursor": "Cursor no válido."})
+        updated = [pet_id for pet_id, deleted in changes.items() if not deleted]
+        pets = {pet.pk: pet for pet in self.get_queryset().filter(pk__in=updated)} if updated else {}
+        return Response({
+            'cursor': cursor,
+            'more': more,
+            'reset': reset,
+            'updated': self.get_serializer([pets[pet_id] for pet_id in updated if pet_id in pets], many=True).data,
+            # Una mascota modificada y borrada después (lápida aún en otra página) ya cuenta como borrada
+            'deleted': [pet_id for pet_id in changes if pet_id not in pets],
+        })
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """Importa mascotas desde un archivo CSV/NDJSON subido en el campo 'file'"""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"file": "Debes adjuntar un archivo CSV o NDJSON."}, status=400)
+        fmt = request.data.get('format') or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if fmt not in FORMATS:
+            return Response({"format": f"Formato no soportado. Usa uno de {', '.join(FORMATS)}."}, status=400)
+        result = import_pets(codecs.iterdecode(upload, 'utf-8-sig'), fmt)
+        return Response(result, status=201 if result['created'] else 400)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exporta el catálogo completo en streaming (?output=csv|ndjson)"""
+        fmt = request.query_params.get('output', 'ndjson')
+        if fmt not in FORMATS:
+            return Response({"format": f"Formato no soportado. Usa uno de {', '.join(FORMATS)}."}, status=400)
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(render_rows(export_rows(), fmt), content_type=f'{content_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="pets.{fmt}"'
+        return response
+
+    def normalized_photos(self):
+        """Fotos subidas ya procesadas en el pool de imágenes.
+
+        Se procesan antes de escribir nada: si el pool está ocupado (503) no queda
+        una mascota creada o modificada sin sus fotos.
+        """
+        return [normalize_upload_with_hash(photo_file) for photo_file in self.request.FILES.getlist('photos')]
+
+    def add_photos(self, pet, photos):
         if photos:
             if pet.photos.exists():
                 pet.photos.update(is_primary=False)
             
-            for index, photo_file in enumerate(photos):
-                PetPhoto.objects.create(
-                    pet=pet,
-                    photo=photo_file,
-                    is_primary=(index == 0),
-                    order=index
-                )
+            for index, normalized in enumerate(photos):
+                photo = PetPhoto(pet=pet, is_primary=(index == 0), order=index)
+                photo.set_normalized(normalized)
+                photo.save()
+
+    def perform_create(self, serializer):
+        user = self.request.user
+        photos = self.normalized_photos()
+        # Con fotos, la mascota y sus fotos en una transacción (sin fotos basta la de Pet.save)
+        with transaction.atomic() if photos else nullcontext():
+            if user.role == "shelter":
+                try:
+                    shelter = user.shelter
+                except ObjectDoesNotExist:
+                    raise ValidationError("Los usuarios con rol 'shelter' deben tener un refugio asociado. Contacta al administrador.")
+                pet = serializer.save(shelter=shelter, owner=None)
+            elif user.role == "client":
+                pet = serializer.save(owner=user, shelter=None)
+            else:
+                pet = serializer.save()
+            
+            if not pet.owner and not pet.shelter:
+                raise ValidationError("La mascota debe tener un dueño (cliente) o un refugio asociado.")
+            self.add_photos(pet, photos)
     
     def perform_update(self, serializer):
         user = self.request.user
-        instance = self.get_object()
+        instance = serializer.instance
         
         if user.role != "admin":
             validated_data = serializer.validated_data
             if 'owner' in validated_data and validated_data['owner'] != instance.owner:
-                from rest_framework.exceptions import ValidationError
                 raise ValidationError("No puedes cambiar el dueño de la mascota.")
             if 'shelter' in validated_data and validated_data['shelter'] != instance.shelter:
-                from rest_framework.exceptions import ValidationError
                 raise ValidationError("No puedes cambiar el refugio de la mascota.")
         
-        pet = serializer.save()
-        photos = self.request.FILES.getlist('photos')
-        if photos:
-            if pet.photos.exists():
-                pet.photos.update(is_primary=False)
-            
-            for index, photo_file in enumerate(photos):
-                PetPhoto.objects.create(
-                    pet=pet,
-                    photo=photo_file,
-                    is_primary=(index == 0),
-                    order=index
-                )
-
-class AdoptionRequestViewSet(viewsets.ModelViewSet):
+        photos = self.normalized_photos()
+        with transaction.atomic() if photos else nullcontext():
+            pet = serializer.save()
+            self.add_photos(pet, photos)
+
+class PetAsyncReadView(AsyncReadView):
+    """list/retrieve asíncronos de mascotas (misma salida que PetViewSet)"""
+    queryset = PetViewSet.queryset
+    serializer_class = PetSerializer
+    throttle_classes = (RoleRateThrottle,)
+    throttle_scope = 'pets_read'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.kwargs.get('pk') is None:
+            queryset = filter_by_age(queryset, self.request.GET)
+        return queryset
+
+class AdoptionRequestViewSet(QueryBudgetMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = AdoptionRequest.objects.all()
     serializer_class = AdoptionRequestSerializer
+    # create/update/destroy: medidos en autocommit, con lo que se ejecuta al confirmar
+    # (transaction.on_commit): INSERT de PetChange y reindexación, como en PetViewSet
+    query_budget = {
+        'list': 2, 'retrieve': 2, 'create': 12,
+        # update con cambio de estado: transición completa de pets/adoption.py (aprobar = 15)
+        'update': 15, 'partial_update': 15, 'destroy': 7,
+    }
 
     def get_permissions(self):
         if self.action == 'create':
@@ -98,23 +277,37 @@ class AdoptionRequestViewSet(viewsets.ModelViewSet):
         pet = serializer.validated_data.get('pet')
         
         if pet:
-            if pet.owner == user:
-                from rest_framework.exceptions import ValidationError
+            if pet.owner_id == user.pk:
                 raise ValidationError("No puedes solicitar adoptar tu propia mascota.")
             
-            if pet.shelter and pet.shelter.user == user:
-                from rest_framework.exceptions import ValidationError
+            if pet.shelter_id and pet.shelter.user_id == user.pk:
                 raise ValidationError("No puedes solicitar adoptar una mascota de tu propio refugio.")
             
+            if pet.status != 'available':
+                raise ValidationError("Esta mascota ya fue adoptada.")
+
             existing_request = AdoptionRequest.objects.filter(pet=pet, user=user).first()
             if existing_request:
-                from rest_framework.exceptions import ValidationError
                 raise ValidationError(f"Ya tienes una solicitud de adopción para esta mascota (Estado: {existing_request.status}).")
         
         serializer.save(user=user)
 
+    def perform_update(self, serializer):
+        status = serializer.validated_data.pop('status', None)
+        if status is not None and status != serializer.instance.status:
+            pet = serializer.instance.pet
+            user = self.request.user
+            if user.role != "admin" and not (pet.shelter_id and pet.shelter.user_id == user.pk):
+                raise PermissionDenied("Solo el refugio de la mascota o un administrador pueden cambiar el estado.")
+            try:
+                adoption.transition(serializer.instance, status)
+            except adoption.TransitionError as exc:
+                raise ValidationError({"status": str(exc)})
+        serializer.save()
+
     def get_queryset(self):
-        if self.request.user.role == "admin":
-            return AdoptionRequest.objects.all()
-        else:
-            return AdoptionRequest.objects.filter(user=self.request.user)
+        queryset = AdoptionRequest.objects.filter(adoption_request_scope(self.request.user))
+        if self.action in ['update', 'partial_update', 'destroy']:
+            # Los permisos por objeto y la máquina de estados leen pet.shelter.user_id ya unido
+            queryset = queryset.select_related('pet__shelter')
+        return queryset
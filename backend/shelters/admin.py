@@ -1,10 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from config.bulk_actions import ChunkedActionsMixin
 from .models import Shelter
 
 @admin.register(Shelter)
-class ShelterAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'address', 'verified_badge', 'photo_preview', 'shelter_id')
+class ShelterAdmin(ChunkedActionsMixin, admin.ModelAdmin):
+    list_display = ('name', 'user', 'address', 'pet_count', 'available_pet_count', 'verified_badge', 'photo_preview', 'shelter_id')
     list_filter = ('verified', 'user__role')
     search_fields = ('name', 'address', 'user__username', 'user__email')
     readonly_fields = ('photo_preview', 'shelter_id')
@@ -12,6 +13,9 @@ class ShelterAdmin(admin.ModelAdmin):
         ('Información básica', {
             'fields': ('user', 'name', 'address')
         }),
+        ('Ubicación', {
+            'fields': ('latitude', 'longitude')
+        }),
         ('Verificación', {
             'fields': ('verified',)
         }),
@@ -47,12 +51,16 @@ class ShelterAdmin(admin.ModelAdmin):
     
     def verify_shelters(self, request, queryset):
         """Acción para verificar refugios seleccionados"""
-        count = queryset.update(verified=True)
-        self.message_user(request, f'{count} refugio(s) marcado(s) como verificado(s).')
+        self.run_chunked(
+            request, queryset, lambda chunk: chunk.update(verified=True),
+            '{count} refugio(s) marcado(s) como verificado(s).',
+        )
     verify_shelters.short_description = "Verificar refugios seleccionados"
     
     def unverify_shelters(self, request, queryset):
         """Acción para desverificar refugios seleccionados"""
-        count = queryset.update(verified=False)
-        self.message_user(request, f'{count} refugio(s) marcado(s) como no verificado(s).')
+        self.run_chunked(
+            request, queryset, lambda chunk: chunk.update(verified=False),
+            '{count} refugio(s) marcado(s) como no verificado(s).',
+        )
     unverify_shelters.short_description = "Desverificar refugios seleccionados"
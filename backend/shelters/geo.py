@@ -0,0 +1,90 @@
+"""Búsqueda de refugios y mascotas cercanos sin extensiones GIS.
+
+Funciona igual en MySQL y SQLite: primero se filtran en SQL los refugios dentro
+de la caja delimitadora del radio (rango sobre el índice latitude/longitude) y
+después se ordenan los candidatos por distancia real (haversine) en Python.
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distancia en km sobre la esfera entre dos puntos en grados."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """(lat_min, lat_max, [(lng_min, lng_max), ...]) que contiene el círculo del radio.
+
+    Si la caja cruza el antimeridiano se devuelven dos rangos de longitud; cerca de
+    los polos se usa el rango completo.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    lat_min, lat_max = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    if lat_min <= -90 or lat_max >= 90:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    # cos() es menor en el borde más alejado del ecuador: usar el menor da la caja más ancha
+    dlng = dlat / min(math.cos(math.radians(lat_min)), math.cos(math.radians(lat_max)))
+    if dlng >= 180:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    lng_min, lng_max = lng - dlng, lng + dlng
+    if lng_min < -180:
+        return lat_min, lat_max, [(lng_min + 360, 180.0), (-180.0, lng_max)]
+    if lng_max > 180:
+        return lat_min, lat_max, [(lng_min, 180.0), (-180.0, lng_max - 360)]
+    return lat_min, lat_max, [(lng_min, lng_max)]
+
+
+def nearest_shelters(lat, lng, radius_km, limit=None, queryset=None):
+    """Lista de (distancia_km, refugio) dentro del radio, de más cercano a más lejano."""
+    from django.db.models import Q
+    from .models import Shelter
+
+    if queryset is None:
+        queryset = Shelter.objects.all()
+    lat_min, lat_max, lng_ranges = bounding_box(lat, lng, radius_km)
+    lng_filter = Q()
+    for lng_min, lng_max in lng_ranges:
+        lng_filter |= Q(longitude__gte=lng_min, longitude__lte=lng_max)
+    candidates = queryset.filter(lng_filter, latitude__gte=lat_min, latitude__lte=lat_max)
+
+    ranked = []
+    for shelter in candidates:
+        distance = haversine_km(lat, lng, shelter.latitude, shelter.longitude)
+        if distance <= radius_km:
+            ranked.append((distance, shelter))
+    ranked.sort(key=lambda item: (item[0], item[1].pk))
+    return ranked[:limit] if limit else ranked
+
+
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def parse_location(params):
+    """Lee lat, lng, radius (km) y limit de los query params; lanza ValidationError si no son válidos."""
+    from rest_framework.exceptions import ValidationError
+
+    try:
+        lat = float(params['lat'])
+        lng = float(params['lng'])
+    except (KeyError, ValueError):
+        raise ValidationError({"detail": "Los parámetros 'lat' y 'lng' son requeridos y deben ser números."})
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValidationError({"detail": "Coordenadas fuera de rango."})
+    try:
+        radius = float(params.get('radius', DEFAULT_RADIUS_KM))
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValidationError({"detail": "'radius' y 'limit' deben ser números."})
+    if not (0 < radius <= MAX_RADIUS_KM):
+        raise ValidationError({"detail": f"'radius' debe estar entre 0 y {MAX_RADIUS_KM} km."})
+    return lat, lng, radius, max(1, min(limit, MAX_LIMIT))
@@ -0,0 +1,68 @@
+import csv
+import re
+import unicodedata
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shelters.models import Shelter
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+class Command(BaseCommand):
+    help = (
+        "Asigna latitud/longitud a los refugios a partir de un CSV local (name,latitude,longitude) "
+        "de ciudades, barrios o códigos postales que aparezcan en la dirección"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", help="CSV con columnas name,latitude,longitude")
+        parser.add_argument("--overwrite", action="store_true", help="Recalcula también los refugios que ya tienen coordenadas")
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["dataset"], encoding="utf-8-sig", newline="") as fh:
+                places = [
+                    (normalize(row["name"]), float(row["latitude"]), float(row["longitude"]))
+                    for row in csv.DictReader(fh)
+                    if normalize(row.get("name"))
+                ]
+        except (OSError, KeyError, ValueError) as exc:
+            raise CommandError(f"No se pudo leer el dataset: {exc}")
+        # Los nombres más largos primero: "san jose del cabo" gana a "san jose"
+        places.sort(key=lambda place: -len(place[0]))
+        patterns = [(re.compile(rf'\b{re.escape(name)}\b'), lat, lng) for name, lat, lng in places]
+
+        shelters = Shelter.objects.only("id", "address", "latitude", "longitude")
+        if not options["overwrite"]:
+            shelters = shelters.filter(latitude__isnull=True)
+
+        matched, unmatched, batch = 0, 0, []
+        for shelter in shelters.iterator(chunk_size=options["batch_size"]):
+            address = normalize(shelter.address)
+            for pattern, lat, lng in patterns:
+                if pattern.search(address):
+                    shelter.latitude, shelter.longitude = lat, lng
+                    batch.append(shelter)
+                    matched += 1
+                    break
+            else:
+                unmatched += 1
+                self.stdout.write(f"Sin coincidencia: refugio {shelter.pk} ({shelter.address!r})")
+            if len(batch) >= options["batch_size"]:
+                self._save(batch, options["dry_run"])
+                batch = []
+        self._save(batch, options["dry_run"])
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{matched} refugio(s) geocodificado(s), {unmatched} sin coincidencia."))
+
+    def _save(self, batch, dry_run):
+        if batch and not dry_run:
+            Shelter.objects.bulk_update(batch, ["latitude", "longitude"])
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelters', '0003_shelter_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shelter',
+            name='available_pet_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shelter',
+            name='pet_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
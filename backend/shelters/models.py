@@ -1,11 +1,10 @@
 from django.db import models
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 import os
 from django.utils.text import slugify
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
+from config.timestamps import TimestampedQuerySet
+from pets.images import normalize_upload
 
 def shelter_photo_upload_path(instance, filename):
 
@@ -22,6 +21,28 @@ class Shelter(models.Model):
     address = models.TextField(blank=True)
     verified = models.BooleanField(default=False)
     photo = models.ImageField(upload_to=shelter_photo_upload_path, null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    pet_count = models.PositiveIntegerField(default=0, editable=False)
+    available_pet_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TimestampedQuerySet.as_manager()
+
+    # Contadores desnormalizados: solo se modifican con F() (ver pets/signals.py)
+    COUNTER_FIELDS = ('pet_count', 'available_pet_count')
+
+    class Meta:
+        indexes = [
+            # Prefiltro por caja delimitadora en las búsquedas por cercanía (shelters/geo.py)
+            models.Index(fields=['latitude', 'longitude'], name='shelter_lat_lng_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self):
         return self.name
@@ -35,31 +56,12 @@ class Shelter(models.Model):
                 photo_changed = True
             
             if photo_changed:
-                img = Image.open(self.photo)
-                
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                max_width = 1200
-                if img.width > max_width:
-                    ratio = max_width / img.width
-                    new_height = int(img.height * ratio)
-                    img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                
-                output = BytesIO()
-                img.save(output, format='JPEG', quality=85, optimize=True)
-                output.seek(0)
-                
-                self.photo = InMemoryUploadedFile(
-                    output, 'ImageField', 
-                    f"{os.path.splitext(self.photo.name)[0]}.jpg",
-                    'image/jpeg', sys.getsizeof(output), None
-                )
+                self.photo = normalize_upload(self.photo)
         
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS and f.attname not in deferred
+            ]
         super().save(*args, **kwargs)
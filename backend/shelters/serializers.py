@@ -30,3 +30,23 @@ class ShelterSerializer(serializers.ModelSerializer):
         if representation.get('photo_url'):
             representation['photo'] = representation['photo_url']
         return representation
+
+
+class ShelterOverviewSerializer(ShelterSerializer):
+    """Refugio con sus primeras mascotas disponibles (requiere el queryset de ShelterViewSet.overview)"""
+    preview_pets = serializers.SerializerMethodField()
+
+    def get_preview_pets(self, obj):
+        request = self.context.get('request')
+        base_url = get_base_url(request)
+        preview = []
+        for pet in obj.preview_pets:
+            # Misma foto que Pet.primary_photo: la de menor id o, si no hay, la foto antigua de la mascota
+            photo = pet.first_photos[0].photo if pet.first_photos else pet.photo
+            preview.append({
+                'id': pet.id,
+                'name': pet.name,
+                'pet_type': pet.pet_type,
+                'thumbnail_url': f"{base_url}{photo.url}" if photo else None,
+            })
+        return preview
@@ -1,3 +1,130 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from users.models import User
+from .models import Shelter
+from .views import ShelterViewSet
+
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class ShelterQueryBudgetTests(APITestCase):
+    """Cada acción debe quedarse dentro de ShelterViewSet.query_budget sin importar cuántas filas haya"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin')
+        cls.shelters = [
+            Shelter.objects.create(user=User.objects.create_user(username=f'refugio{i}', password='x', role='shelter'), name=f'Refugio {i}')
+            for i in range(10)
+        ]
+        cls.free_user = User.objects.create_user(username='nuevo', password='x', role='shelter')
+
+    def test_list(self):
+        self.assertEqual(self.client.get('/api/shelters/').status_code, 200)
+
+    def test_retrieve(self):
+        self.assertEqual(self.client.get(f'/api/shelters/{self.shelters[0].pk}/').status_code, 200)
+
+    def test_create(self):
+        response = self.client.post('/api/shelters/', {'user': self.free_user.pk, 'name': 'Nuevo'}, format='json', **auth(self.admin))
+        self.assertEqual(response.status_code, 201)
+
+    def test_partial_update(self):
+        response = self.client.patch(f'/api/shelters/{self.shelters[0].pk}/', {'verified': True}, format='json', **auth(self.admin))
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        response = self.client.delete(f'/api/shelters/{self.shelters[0].pk}/', **auth(self.admin))
+        self.assertEqual(response.status_code, 204)
+
+    def test_overview(self):
+        from pets.models import Pet
+        for shelter in self.shelters:
+            for i in range(5):
+                Pet.objects.create(name=f'Mascota {i}', pet_type='dog', shelter=shelter)
+        response = self.client.get('/api/shelters/overview/')
+        self.assertEqual(response.status_code, 200)
+        first = response.json()[0]
+        self.assertEqual(first['available_pet_count'], 5)
+        self.assertEqual(len(first['preview_pets']), ShelterViewSet.preview_size)
+
+
+class ShelterNearbyTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from pets.models import Pet
+        places = {'centro': (19.4326, -99.1332), 'coyoacan': (19.3467, -99.1617), 'puebla': (19.0414, -98.2063)}
+        cls.shelters = {}
+        for name, (lat, lng) in places.items():
+            user = User.objects.create_user(username=f'refugio-{name}', password='x', role='shelter')
+            shelter = Shelter.objects.create(user=user, name=name, latitude=lat, longitude=lng)
+            Pet.objects.create(name=f'Mascota {name}', pet_type='dog', shelter=shelter)
+            cls.shelters[name] = shelter
+        Shelter.objects.create(user=User.objects.create_user(username='sin-coordenadas', password='x'), name='sin coordenadas')
+
+    def test_nearby_shelters_sorted_by_distance_within_radius(self):
+        response = self.client.get('/api/shelters/nearby/', {'lat': 19.40, 'lng': -99.14, 'radius': 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.json()], ['centro', 'coyoacan'])
+        self.assertLess(response.json()[0]['distance_km'], response.json()[1]['distance_km'])
+
+    def test_nearby_pets(self):
+        response = self.client.get('/api/pets/nearby/', {'lat': 19.05, 'lng': -98.2, 'radius': 200, 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.json()], ['Mascota puebla', 'Mascota coyoacan'])
+
+    def test_nearby_pets_are_ranked_and_limited_in_sql(self):
+        from pets.models import Pet
+        extra = [Pet.objects.create(name=f'Puebla {i}', pet_type='dog', shelter=self.shelters['puebla']) for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/pets/nearby/', {'lat': 19.05, 'lng': -98.2, 'radius': 200, 'limit': 3})
+        self.assertEqual([item['name'] for item in response.json()], ['Mascota puebla', 'Puebla 0', 'Puebla 1'])
+        self.assertEqual(response.json()[1]['id'], extra[0].pk)
+        pets_table = f"FROM {connection.ops.quote_name('pets_pet')}"
+        pet_query = next(query['sql'] for query in queries.captured_queries if pets_table in query['sql'])
+        self.assertIn('LIMIT 3', pet_query)
+        response = self.client.get('/api/pets/nearby/', {'lat': -33.4, 'lng': -70.6, 'radius': 10})
+        self.assertEqual(response.json(), [])
+
+    def test_requires_coordinates(self):
+        self.assertEqual(self.client.get('/api/shelters/nearby/').status_code, 400)
+
+    def test_bounding_box_wraps_antimeridian(self):
+        from .geo import bounding_box
+        _, _, ranges = bounding_box(0, 179.9, 50)
+        self.assertEqual(len(ranges), 2)
+
+
+class ShelterAsyncReadViewTests(APITestCase):
+    """/api/async/shelters/: mismo código, cuerpo y Content-Type que ShelterViewSet list/retrieve"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelters = [
+            Shelter.objects.create(user=User.objects.create_user(username=f'refugio{i}', password='x', role='shelter'), name=f'Refugio «{i}»')
+            for i in range(3)
+        ]
+
+    async def assertSameResponse(self, path):
+        expected = await sync_to_async(self.client.get)(f'/api/shelters/{path}')
+        response = await self.async_client.get(f'/api/async/shelters/{path}')
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        for header in ('Content-Type', 'Content-Length'):
+            self.assertEqual(response[header], expected[header], header)
+
+    async def test_list_and_retrieve(self):
+        await self.assertSameResponse('')
+        await self.assertSameResponse(f'{self.shelters[0].pk}/')
+        await self.assertSameResponse('999999/')
+        await Shelter.objects.all().adelete()
+        await self.assertSameResponse('')
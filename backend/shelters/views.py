@@ -1,12 +1,26 @@
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.db.models import Prefetch
 from .models import Shelter
-from .serializers import ShelterSerializer
+from .serializers import ShelterSerializer, ShelterOverviewSerializer
+from .geo import nearest_shelters, parse_location
 from users.permissions import IsAdmin
+from config.async_views import AsyncReadView
+from config.query_budget import QueryBudgetMixin
+from config.conditional import ConditionalGetMixin
 
-class ShelterViewSet(viewsets.ModelViewSet):
+class ShelterViewSet(QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Shelter.objects.all()
     serializer_class = ShelterSerializer
+    # list/retrieve: +1 por la comprobación de config/conditional.py (una sola si responde 304)
+    query_budget = {
+        'list': 2, 'retrieve': 2, 'create': 4,
+        'update': 3, 'partial_update': 3, 'destroy': 4,
+        'overview': 3, 'nearby': 1,
+    }
+    preview_size = 3
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -16,6 +30,41 @@ class ShelterViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated(), IsAdmin()]
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'overview', 'nearby']:
             return [AllowAny()]
         return [IsAuthenticated()]
+
+    @action(detail=False, methods=['get'])
+    def overview(self, request):
+        """Refugios con su número de mascotas disponibles y las primeras mascotas con miniatura.
+
+        Tres consultas en total sin importar cuántos refugios haya: refugios, mascotas
+        (limitadas por refugio con una función de ventana) y la primera foto de cada una.
+        El número de mascotas disponibles sale del contador available_pet_count.
+        """
+        from pets.models import Pet, PetPhoto
+        preview_pets = (
+            Pet.objects.filter(status='available')
+            .order_by('shelter_id', 'id')
+            .prefetch_related(Prefetch('photos', queryset=PetPhoto.objects.order_by('pet_id', 'id')[:1], to_attr='first_photos'))
+        )[:self.preview_size]
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(
+            Prefetch('pets', queryset=preview_pets, to_attr='preview_pets')
+        )
+        serializer = ShelterOverviewSerializer(queryset, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Refugios más cercanos a ?lat=&lng= dentro de ?radius= km, con su distancia"""
+        lat, lng, radius, limit = parse_location(request.query_params)
+        ranked = nearest_shelters(lat, lng, radius, limit, queryset=self.filter_queryset(self.get_queryset()))
+        data = self.get_serializer([shelter for _, shelter in ranked], many=True).data
+        for item, (distance, _) in zip(data, ranked):
+            item['distance_km'] = round(distance, 2)
+        return Response(data)
+
+class ShelterAsyncReadView(AsyncReadView):
+    """list/retrieve asíncronos de refugios (misma salida que ShelterViewSet)"""
+    queryset = ShelterViewSet.queryset
+    serializer_class = ShelterSerializer
@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
+from config.bulk_actions import ChunkedActionsMixin
+from pets import adoption
+from pets.models import AdoptionRequest
 from .models import User
+from .roles import ADMIN_FLAGS, reconcile_queryset, reconcile_user
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ChunkedActionsMixin, UserAdmin):
     fieldsets = (
         (None, {"fields": ("username", "password")}),
         ("Personal info", {"fields": ("first_name", "last_name", "email", "phone")}),
@@ -39,38 +43,50 @@ class CustomUserAdmin(UserAdmin):
     role_badge.short_description = 'Rol'
     
     def save_model(self, request, obj, form, change):
-        """Asignar automáticamente is_staff e is_superuser cuando role=admin"""
-        if obj.role == "admin":
-            obj.is_staff = True
-            obj.is_superuser = True
+        """Mantener role e is_staff/is_superuser coherentes (mismas reglas que reconcile_roles)"""
+        reconcile_user(obj)
         super().save_model(request, obj, form, change)
     
     def make_admin(self, request, queryset):
         """Convertir usuarios seleccionados en administradores"""
-        count = queryset.update(role="admin", is_staff=True, is_superuser=True)
-        self.message_user(request, f'{count} usuario(s) convertido(s) en administrador(es).')
+        self.run_chunked(
+            request, queryset, lambda chunk: chunk.update(**ADMIN_FLAGS),
+            '{count} usuario(s) convertido(s) en administrador(es).',
+        )
     make_admin.short_description = "Convertir en administradores"
     
     def make_staff(self, request, queryset):
-        """Dar permisos de staff a usuarios seleccionados"""
-        count = queryset.update(is_staff=True)
-        self.message_user(request, f'{count} usuario(s) ahora tiene(n) permisos de staff.')
+        """Dar permisos de staff a usuarios seleccionados (un superusuario con staff pasa a admin)"""
+        def apply(chunk):
+            count = chunk.update(is_staff=True)
+            reconcile_queryset(chunk)
+            return count
+        self.run_chunked(request, queryset, apply, '{count} usuario(s) ahora tiene(n) permisos de staff.')
     make_staff.short_description = "Dar permisos de staff"
     
     def remove_staff(self, request, queryset):
         """Quitar permisos de staff a usuarios seleccionados (excepto admins)"""
-        count = queryset.exclude(role="admin").update(is_staff=False, is_superuser=False)
-        self.message_user(request, f'{count} usuario(s) sin permisos de staff.')
+        self.run_chunked(
+            request, queryset, lambda chunk: chunk.exclude(role="admin").update(is_staff=False, is_superuser=False),
+            '{count} usuario(s) sin permisos de staff.',
+        )
     remove_staff.short_description = "Quitar permisos de staff"
     
     def activate_users(self, request, queryset):
         """Activar usuarios seleccionados"""
-        count = queryset.update(is_active=True)
-        self.message_user(request, f'{count} usuario(s) activado(s).')
+        self.run_chunked(
+            request, queryset, lambda chunk: chunk.update(is_active=True),
+            '{count} usuario(s) activado(s).',
+        )
     activate_users.short_description = "Activar usuarios"
     
     def deactivate_users(self, request, queryset):
-        """Desactivar usuarios seleccionados"""
-        count = queryset.update(is_active=False)
-        self.message_user(request, f'{count} usuario(s) desactivado(s).')
+        """Desactivar usuarios seleccionados y rechazar sus solicitudes de adopción pendientes"""
+        def apply(chunk):
+            pending = AdoptionRequest.objects.filter(user__in=chunk.values("pk"), status="pending")
+            return {"count": chunk.update(is_active=False), "rejected": adoption.reject(pending)}
+        self.run_chunked(
+            request, queryset, apply,
+            '{count} usuario(s) desactivado(s), {rejected} solicitud(es) de adopción pendiente(s) rechazada(s).',
+        )
     deactivate_users.short_description = "Desactivar usuarios"
@@ -0,0 +1,24 @@
+"""Hashers de contraseñas con el coste configurable desde settings.
+
+Mismo algoritmo y formato que los de Django (los hashes existentes siguen siendo
+válidos), pero con iteraciones / memoria leídas de ``PASSWORD_*`` en settings.
+Como ``must_update()`` compara esos parámetros con los del hash guardado, al
+cambiar el coste o el hasher preferido las contraseñas se recalculan en el
+siguiente login correcto (``User.check_password``).
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = settings.PASSWORD_ARGON2_TIME_COST
+    memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST
+    parallelism = settings.PASSWORD_ARGON2_PARALLELISM
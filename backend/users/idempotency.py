@@ -0,0 +1,72 @@
+"""Altas idempotentes con la cabecera ``Idempotency-Key``.
+
+Un cliente que reintenta el mismo POST con la misma clave recibe la respuesta
+original (cabecera ``Idempotent-Replayed: true``) sin volver a validar, calcular
+el hash de la contraseña ni insertar nada. La clave se reserva dentro de la misma
+transacción que el alta: si dos reintentos llegan a la vez, el segundo choca con
+la PK (esperando al primero en MySQL) y repite la respuesta ya guardada.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def record_key(request, value):
+    user = request.user.pk if request.user.is_authenticated else ''
+    return hashlib.sha256(f'{request.path}\n{user}\n{value}'.encode()).hexdigest()
+
+
+def fingerprint(data):
+    # HMAC y no sha256 a secas: el cuerpo incluye la contraseña
+    items = sorted((key, str(value)) for key, value in data.items())
+    return salted_hmac('idempotency', repr(items)).hexdigest()
+
+
+def replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        raise ValidationError({HEADER: 'Esta clave de idempotencia ya se usó con otros datos.'})
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+class IdempotentCreateMixin:
+    """create() atómico que además honra Idempotency-Key (opcional)."""
+
+    def create(self, request, *args, **kwargs):
+        value = request.headers.get(HEADER)
+        if not value:
+            with transaction.atomic():
+                return super().create(request, *args, **kwargs)
+        if len(value) > 255:
+            raise ValidationError({HEADER: 'La clave de idempotencia no puede superar 255 caracteres.'})
+
+        key, request_fingerprint = record_key(request, value), fingerprint(request.data)
+        record = IdempotencyKey.objects.filter(pk=key).first()
+        if record is not None:
+            if record.created_at >= timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL):
+                return replay(record, request_fingerprint)
+            record.delete()
+
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(key=key, fingerprint=request_fingerprint)
+                response = super().create(request, *args, **kwargs)
+                record.status_code, record.response = response.status_code, response.data
+                record.save(update_fields=['status_code', 'response'])
+        except IntegrityError:
+            # Otro reintento con la misma clave se adelantó y ya confirmó
+            record = IdempotencyKey.objects.filter(pk=key).first()
+            if record is None:
+                raise
+            return replay(record, request_fingerprint)
+        return response
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Borra las claves de idempotencia más antiguas que IDEMPOTENCY_KEY_TTL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000, help="Filas por DELETE")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+        total = 0
+        while True:
+            # DELETE cortos por lotes para no bloquear la tabla con un borrado enorme
+            keys = list(expired.values_list("pk", flat=True)[:options["batch_size"]])
+            if not keys:
+                break
+            total += IdempotencyKey.objects.filter(pk__in=keys).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"{total} clave(s) de idempotencia borrada(s)."))
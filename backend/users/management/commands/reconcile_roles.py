@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Min
+
+from users.models import User
+from users.roles import ROLE_RULES
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcilia role con is_staff/is_superuser para todos los usuarios "
+        "con UPDATE por lotes de clave primaria (users/roles.py)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo informa, no modifica nada")
+        parser.add_argument("--batch-size", type=int, default=50000, help="Rango de PKs por UPDATE")
+        parser.add_argument("--sample", type=int, default=10, help="Usuarios de ejemplo por regla en el informe")
+
+    def handle(self, *args, **options):
+        self._report_flags()
+        pending = self._report_rules(options["sample"])
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"[dry-run] {pending} usuario(s) se actualizarían."))
+            return
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("Roles y permisos ya son consistentes."))
+            return
+
+        bounds = User.objects.aggregate(low=Min("pk"), high=Max("pk"))
+        for rule in ROLE_RULES:
+            updated = 0
+            # Transacciones cortas (autocommit): cada lote bloquea solo su rango de filas
+            for low in range(bounds["low"], bounds["high"] + 1, options["batch_size"]):
+                updated += User.objects.filter(
+                    rule.condition, pk__gte=low, pk__lt=low + options["batch_size"],
+                ).update(**rule.changes)
+            self.stdout.write(f"{rule.description}: {updated} actualizado(s).")
+
+        remaining = self._report_rules(0, quiet=True)
+        style = self.style.SUCCESS if not remaining else self.style.ERROR
+        self.stdout.write(style(f"Inconsistencias restantes: {remaining}."))
+
+    def _report_flags(self):
+        self.stdout.write("Usuarios por rol / is_staff / is_superuser:")
+        rows = User.objects.values("role", "is_staff", "is_superuser").annotate(total=Count("pk")).order_by("role", "is_staff", "is_superuser")
+        for row in rows:
+            self.stdout.write(f"  {row['role']:<8} staff={row['is_staff']!s:<5} superuser={row['is_superuser']!s:<5} {row['total']}")
+
+    def _report_rules(self, sample, quiet=False):
+        total = 0
+        for rule in ROLE_RULES:
+            count = User.objects.filter(rule.condition).count()
+            total += count
+            if quiet:
+                continue
+            self.stdout.write(f"{rule.description}: {count}")
+            if count and sample:
+                usernames = User.objects.filter(rule.condition).order_by("pk").values_list("username", flat=True)[:sample]
+                self.stdout.write(f"  p. ej.: {', '.join(usernames)}")
+        return total
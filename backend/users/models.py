@@ -25,3 +25,30 @@ class User(AbstractUser):
             'unique': "Un usuario con ese nombre ya existe.",
         },
     )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Valores cargados: pets/signals.py reindexa la búsqueda si cambian username o email
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class IdempotencyKey(models.Model):
+    """Respuesta guardada de una petición con cabecera Idempotency-Key.
+
+    La PK es el sha256 de (ruta, usuario, clave): el reintento se resuelve con una
+    búsqueda por clave primaria de ancho fijo.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+
+    def __str__(self):
+        return self.key
@@ -1,5 +1,27 @@
+from django.db.models import Q
 from rest_framework import permissions
 
+
+def pet_scope(user):
+    """Mascotas que `user` puede editar, como filtro SQL (Pet.objects.filter(pet_scope(user)))."""
+    if user.role == "admin":
+        return Q()
+    if user.role == "shelter":
+        return Q(shelter__user=user)
+    if user.role == "client":
+        return Q(owner=user)
+    return Q(pk__in=[])
+
+
+def adoption_request_scope(user):
+    """Solicitudes que `user` puede ver y editar: las suyas y, si es refugio, las de sus mascotas."""
+    if user.role == "admin":
+        return Q()
+    if user.role == "shelter":
+        return Q(user=user) | Q(pet__shelter__user=user)
+    return Q(user=user)
+
+
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == "admin"
@@ -14,23 +36,18 @@ class IsClient(permissions.BasePermission):
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user.role == "admin" or obj.user == request.user
+        return request.user.role == "admin" or obj.user_id == request.user.pk
 
 class IsPetOwnerOrAdmin(permissions.BasePermission):
+    """Misma regla que pet_scope(); compara ids, sin consultas si `shelter` viene con select_related."""
 
     def has_object_permission(self, request, view, obj):
         if request.user.role == "admin":
             return True
         if request.user.role == "shelter":
-            try:
-                return obj.shelter and obj.shelter.user == request.user
-            except:
-                return False
+            return obj.shelter_id is not None and obj.shelter.user_id == request.user.pk
         if request.user.role == "client":
-            try:
-                return obj.owner == request.user
-            except:
-                return False
+            return obj.owner_id == request.user.pk
         return False
 
 class IsShelterOrClient(permissions.BasePermission):
@@ -39,15 +56,13 @@ class IsShelterOrClient(permissions.BasePermission):
         return request.user.is_authenticated and (request.user.role == "shelter" or request.user.role == "client")
 
 class IsAdoptionRequestOwnerOrAdmin(permissions.BasePermission):
+    """Misma regla que adoption_request_scope(); usa pet__shelter ya unido con select_related."""
 
     def has_object_permission(self, request, view, obj):
         if request.user.role == "admin":
             return True
-        if obj.user == request.user:
+        if obj.user_id == request.user.pk:
             return True
-        if request.user.role == "shelter" and obj.pet.shelter:
-            try:
-                return obj.pet.shelter.user == request.user
-            except:
-                return False
+        if request.user.role == "shelter" and obj.pet.shelter_id is not None:
+            return obj.pet.shelter.user_id == request.user.pk
         return False
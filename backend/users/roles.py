@@ -0,0 +1,44 @@
+"""Acoplamiento entre ``role`` y los flags ``is_staff``/``is_superuser``.
+
+Cada regla se expresa dos veces, una junto a otra: como ``Q`` para arreglar
+muchos usuarios con un UPDATE (manage.py reconcile_roles) y como predicado para
+arreglar una instancia antes de guardarla (CustomUserAdmin.save_model).
+"""
+from collections import namedtuple
+
+from django.db.models import Q
+
+ADMIN_FLAGS = {"role": "admin", "is_staff": True, "is_superuser": True}
+
+RoleRule = namedtuple("RoleRule", "description condition matches changes")
+
+ROLE_RULES = (
+    RoleRule(
+        "superusuarios con staff sin rol admin",
+        Q(is_superuser=True, is_staff=True) & ~Q(role="admin"),
+        lambda user: user.is_superuser and user.is_staff and user.role != "admin",
+        {"role": "admin"},
+    ),
+    RoleRule(
+        "admins sin is_staff/is_superuser",
+        Q(role="admin") & (Q(is_staff=False) | Q(is_superuser=False)),
+        lambda user: user.role == "admin" and not (user.is_staff and user.is_superuser),
+        {"is_staff": True, "is_superuser": True},
+    ),
+)
+
+
+def reconcile_user(user):
+    """Aplica las reglas a una instancia (sin guardarla); devuelve los campos cambiados."""
+    changed = set()
+    for rule in ROLE_RULES:
+        if rule.matches(user):
+            for field, value in rule.changes.items():
+                setattr(user, field, value)
+            changed.update(rule.changes)
+    return changed
+
+
+def reconcile_queryset(queryset):
+    """Aplica las reglas a los usuarios de `queryset` con un UPDATE por regla; devuelve las filas cambiadas."""
+    return sum(queryset.filter(rule.condition).update(**rule.changes) for rule in ROLE_RULES)
@@ -1,3 +1,278 @@
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import override_settings
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.throttling import LocalBucketStore, TokenBucket, local_buckets
+from .hashers import ScryptPasswordHasher
+from shelters.models import Shelter
+from .models import IdempotencyKey, User
+from .roles import reconcile_user
+
+
+def auth(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class UserQueryBudgetTests(APITestCase):
+    """Cada acción debe quedarse dentro de UserViewSet.query_budget sin importar cuántas filas haya"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin')
+        cls.users = [User.objects.create_user(username=f'cliente{i}', password='x') for i in range(10)]
+
+    def test_create_client(self):
+        response = self.client.post('/api/users/', {
+            'username': 'nuevo', 'email': 'nuevo@ejemplo.com', 'password': 'clave1234', 'role': 'client',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_create_shelter(self):
+        response = self.client.post('/api/users/', {
+            'username': 'refugio', 'email': 'refugio@ejemplo.com', 'password': 'clave1234', 'role': 'shelter',
+            'shelter_name': 'Refugio', 'shelter_address': 'Calle 1',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_list(self):
+        self.assertEqual(self.client.get('/api/users/', **auth(self.admin)).status_code, 200)
+
+    def test_retrieve(self):
+        self.assertEqual(self.client.get(f'/api/users/{self.users[0].pk}/', **auth(self.admin)).status_code, 200)
+
+    def test_me(self):
+        self.assertEqual(self.client.get('/api/users/me/', **auth(self.users[0])).status_code, 200)
+
+    def test_partial_update(self):
+        response = self.client.patch(f'/api/users/{self.users[0].pk}/', {'phone': '1234567890'}, format='json', **auth(self.admin))
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        response = self.client.delete(f'/api/users/{self.users[0].pk}/', **auth(self.admin))
+        self.assertEqual(response.status_code, 204)
+
+
+@override_settings(THROTTLE_RATES={'login': {'anon': '2/min'}, 'register': {'anon': '1/hour'}})
+class ThrottleTests(APITestCase):
+    """Token bucket por rol y endpoint (config/throttling.py)"""
+
+    def setUp(self):
+        local_buckets.clear()
+        self.addCleanup(local_buckets.clear)
+        User.objects.create_user(username='cliente', password='clave1234')
+
+    def login(self):
+        return self.client.post('/api/login/', {'username': 'cliente', 'password': 'mala'}, format='json')
+
+    def test_login_throttled_with_retry_after(self):
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 401)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_buckets_are_per_ip(self):
+        self.login(), self.login()
+        self.assertEqual(self.login().status_code, 429)
+        response = self.client.post('/api/login/', {'username': 'cliente', 'password': 'mala'},
+                                    format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 401)
+
+    def test_register_scope_is_separate_from_login(self):
+        self.login(), self.login()
+        data = {'username': 'nuevo', 'email': 'nuevo@ejemplo.com', 'password': 'clave1234'}
+        self.assertEqual(self.client.post('/api/users/', data, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/users/', data, format='json').status_code, 429)
+
+    def test_bucket_refills(self):
+        bucket = TokenBucket(LocalBucketStore(), 'prueba', capacity=2, refill_rate=1)
+        self.assertEqual(bucket.consume(now=100), 0)
+        self.assertEqual(bucket.consume(now=100), 0)
+        self.assertEqual(bucket.consume(now=100), 1)
+        self.assertEqual(bucket.consume(now=100.5), 0.5)
+        self.assertEqual(bucket.consume(now=101), 0)
+
+    def test_shared_bucket_is_atomic_across_workers(self):
+        # Sin el threading.Lock del proceso, cada hilo hace de un worker distinto
+        # contra la misma caché; get() tarda en volver para que las lecturas se solapen
+        cache = caches['default']
+        self.addCleanup(cache.clear)
+        get = cache.get
+
+        def slow_get(*args, **kwargs):
+            value = get(*args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        with mock.patch('config.throttling._lock', nullcontext()), \
+                mock.patch.object(cache, 'get', side_effect=slow_get), \
+                mock.patch('config.throttling.LOCK_WAIT', 5):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                waits = list(pool.map(
+                    lambda _: TokenBucket(cache, 'throttle:prueba', capacity=5, refill_rate=0.001).consume(), range(20),
+                ))
+        self.assertEqual(waits.count(0), 5)
+
+
+@override_settings(THROTTLE_RATES={}, PASSWORD_HASHERS=[
+    'users.hashers.ScryptPasswordHasher',
+    'users.hashers.PBKDF2PasswordHasher',
+])
+class PasswordHashingTests(APITestCase):
+    """Un solo hash por alta y recálculo con el hasher preferido al hacer login"""
+
+    def test_signup_hashes_and_inserts_once(self):
+        data = {'username': 'nuevo', 'email': 'nuevo@ejemplo.com', 'password': 'clave1234'}
+        encode = ScryptPasswordHasher.encode
+        with mock.patch.object(ScryptPasswordHasher, 'encode', autospec=True, side_effect=encode) as hashed, \
+                CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.post('/api/users/', data, format='json').status_code, 201)
+        self.assertEqual(hashed.call_count, 1)
+        self.assertEqual(sum(q['sql'].startswith('INSERT') for q in queries.captured_queries), 1)
+        self.assertTrue(User.objects.get(username='nuevo').password.startswith('scrypt$'))
+
+    def test_login_upgrades_legacy_hash(self):
+        user = User.objects.create(username='antiguo', password=make_password('clave1234', hasher='pbkdf2_sha256'))
+        response = self.client.post('/api/login/', {'username': 'antiguo', 'password': 'clave1234'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('clave1234'))
+
+    def test_update_hashes_password(self):
+        admin = User.objects.create_user(username='admin', password='x', role='admin')
+        user = User.objects.create_user(username='cliente', password='vieja1234')
+        response = self.client.patch(f'/api/users/{user.pk}/', {'password': 'nueva1234'}, format='json', **auth(admin))
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('nueva1234'))
+
+
+@override_settings(THROTTLE_RATES={}, QUERY_BUDGET_MODE='raise')
+class IdempotentSignupTests(APITestCase):
+    """Alta atómica de refugios y reintentos con Idempotency-Key"""
+
+    data = {
+        'username': 'refugio', 'email': 'refugio@ejemplo.com', 'password': 'clave1234', 'role': 'shelter',
+        'shelter_name': 'Refugio', 'shelter_address': 'Calle 1',
+    }
+
+    def signup(self, data=None, key='clave-1'):
+        return self.client.post('/api/users/', data or self.data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self.signup()
+        self.assertEqual(first.status_code, 201)
+        with mock.patch.object(ScryptPasswordHasher, 'encode') as encode:
+            second = self.signup()
+        encode.assert_not_called()
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(User.objects.filter(username='refugio').count(), 1)
+        self.assertEqual(Shelter.objects.filter(user__username='refugio').count(), 1)
+
+    def test_same_key_with_other_data_is_rejected(self):
+        self.signup()
+        response = self.signup({**self.data, 'username': 'otro', 'email': 'otro@ejemplo.com'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(username='otro').exists())
+
+    def test_validation_errors_are_not_stored(self):
+        self.assertEqual(self.signup({**self.data, 'shelter_name': ''}).status_code, 400)
+        self.assertEqual(self.signup().status_code, 201)
+
+    def test_shelter_failure_rolls_back_user(self):
+        with mock.patch.object(Shelter.objects, 'create', side_effect=DatabaseError('fallo')):
+            with self.assertRaises(DatabaseError):
+                self.signup()
+        self.assertFalse(User.objects.filter(username='refugio').exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class ReconcileRolesTests(APITestCase):
+    """manage.py reconcile_roles aplica las reglas de users/roles.py con UPDATE por lotes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_user(username='super', password='x', is_staff=True, is_superuser=True)
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin')
+        cls.clients = [User.objects.create_user(username=f'cliente{i}', password='x') for i in range(5)]
+
+    def roles(self):
+        return dict(User.objects.values_list('username', 'role'))
+
+    def test_dry_run_reports_without_changes(self):
+        before = self.roles()
+        out = StringIO()
+        call_command('reconcile_roles', '--dry-run', stdout=out)
+        self.assertIn('2 usuario(s) se actualizarían', out.getvalue())
+        self.assertEqual(self.roles(), before)
+
+    def test_reconciles_in_batches(self):
+        out = StringIO()
+        call_command('reconcile_roles', '--batch-size', '2', stdout=out)
+        self.assertIn('Inconsistencias restantes: 0', out.getvalue())
+        self.superuser.refresh_from_db()
+        self.admin.refresh_from_db()
+        self.assertEqual(self.superuser.role, 'admin')
+        self.assertTrue(self.admin.is_staff and self.admin.is_superuser)
+        self.assertFalse(User.objects.filter(role='client', is_staff=True).exists())
+
+    def test_reconcile_user_matches_command(self):
+        user = User(username='nuevo', role='admin')
+        self.assertEqual(reconcile_user(user), {'is_staff', 'is_superuser'})
+        self.assertEqual(reconcile_user(user), set())
+
+
+class AdminUserActionTests(APITestCase):
+    """Acciones masivas de CustomUserAdmin: por lotes y con sus efectos secundarios"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from pets.models import AdoptionRequest, Pet
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin', is_staff=True, is_superuser=True)
+        cls.superuser = User.objects.create_user(username='super', password='x', is_superuser=True)
+        cls.clients = [User.objects.create_user(username=f'cliente{i}', password='x') for i in range(3)]
+        cls.pet = Pet.objects.create(name='Luna', pet_type='cat', owner=cls.admin)
+        for user in cls.clients:
+            AdoptionRequest.objects.create(pet=cls.pet, user=user)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def run_action(self, action, users):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('admin:users_user_changelist'),
+                {'action': action, '_selected_action': [user.pk for user in users]}, follow=True,
+            )
+
+    @override_settings(BULK_ACTION_BATCH_SIZE=1)
+    def test_make_staff_reconciles_roles(self):
+        response = self.run_action('make_staff', [self.superuser, self.clients[0]])
+        self.assertContains(response, '2 usuario(s) ahora tiene(n) permisos de staff.')
+        self.superuser.refresh_from_db()
+        self.assertEqual(self.superuser.role, 'admin')
+        self.assertEqual(User.objects.get(pk=self.clients[0].pk).role, 'client')
+
+    @override_settings(BULK_ACTION_BATCH_SIZE=2)
+    def test_deactivate_rejects_pending_requests(self):
+        response = self.run_action('deactivate_users', self.clients[:2])
+        self.assertContains(response, '2 usuario(s) desactivado(s), 2 solicitud(es) de adopción pendiente(s) rechazada(s).')
+        self.assertEqual(User.objects.filter(is_active=False).count(), 2)
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.pending_request_count, 1)
@@ -2,13 +2,22 @@ from rest_framework import viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenObtainPairView
 from .models import User
 from .serializers import UserSerializer
 from .permissions import IsAdmin
+from .idempotency import IdempotentCreateMixin
+from config.streaming import StreamingListMixin
+from config.query_budget import QueryBudgetMixin
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(QueryBudgetMixin, StreamingListMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    query_budget = {
+        'list': 2, 'retrieve': 2, 'create': 8, 'me': 1,
+        'update': 3, 'partial_update': 3, 'destroy': 9,
+    }
+    throttle_scope = {'create': 'register'}
     
     def get_permissions(self):
         if self.action == 'create':
@@ -41,3 +50,8 @@ class UserViewSet(viewsets.ModelViewSet):
     def me(self, request):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
+
+
+class LoginView(TokenObtainPairView):
+    """Login JWT con límite de intentos por IP (o por usuario si ya viene autenticado)"""
+    throttle_scope = 'login'
@@ -20,7 +20,6 @@ export default function Pets() {
     age_unit: "years",
     size: "",
     description: "",
-    status: "available",
   });
   const [petPhotos, setPetPhotos] = useState([]);
   const [photoPreviews, setPhotoPreviews] = useState([]);
@@ -124,7 +123,6 @@ export default function Pets() {
       }
       if (petForm.size) formData.append('size', petForm.size);
       if (petForm.description) formData.append('description', petForm.description);
-      formData.append('status', petForm.status);
       
       petPhotos.forEach((photo) => {
         formData.append('photos', photo);
@@ -151,7 +149,6 @@ export default function Pets() {
         age_unit: "years",
         size: "",
         description: "",
-        status: "available",
       });
     } catch (err) {
       console.error("Error al guardar la mascota:", err);
@@ -296,7 +293,6 @@ export default function Pets() {
                 age_unit: "years",
                 size: "",
                 description: "",
-                status: "available",
               });
               setShowPetForm(true);
             }}
@@ -399,19 +395,6 @@ export default function Pets() {
                 rows="3"
               />
             </label>
-            <label>
-              Estado
-              <select
-                value={petForm.status}
-                onChange={(e) =>
-                  setPetForm((prev) => ({ ...prev, status: e.target.value }))
-                }
-              >
-                <option value="available">Disponible</option>
-                <option value="adopted">Adoptado</option>
-                <option value="pending">Pendiente</option>
-              </select>
-            </label>
             <label>
               Fotos de la mascota {!editingPet && "*"} (puedes subir varias)
               <input
@@ -612,7 +595,6 @@ export default function Pets() {
                           age_unit: pet.age_unit || "years",
                           size: pet.size || "",
                           description: pet.description || "",
-                          status: pet.status,
                         });
                         setShowPetForm(true);
                       }}